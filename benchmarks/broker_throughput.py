@@ -0,0 +1,163 @@
+"""Broker bytes and publish/consume rates of the task message settings.
+
+Publishes ``add`` messages (one per task) and ``add_many`` messages (one
+per chunk) with the default settings (JSON, results stored) and with the
+lean ones (``TASK_LEAN_MESSAGES=1``: msgpack, compressed batches, no stored
+result), then drains each queue, decoding every message and storing its
+result in the result backend as a worker would. Start a local Redis, e.g.
+``docker compose up redis``, then run::
+
+    python benchmarks/broker_throughput.py --tasks 20000
+
+``--broker memory:// --backend cache+memory://`` runs it without Redis.
+Message bytes are the size of the queued messages at rest in the broker,
+result bytes the size of the result metas written to the backend.
+"""
+
+import argparse
+import json
+import time
+import uuid
+from datetime import UTC
+from datetime import datetime
+
+from celery import Celery
+from kombu import Queue
+
+CONFIGS = {
+    "json": {
+        "serializer": "json",
+        "compression": None,
+        "ignore_result": False,
+    },
+    "lean": {
+        "serializer": "msgpack",
+        "compression": "zlib",
+        "ignore_result": True,
+    },
+}
+ADD = "rd_project.rd_task.tasks.add"
+ADD_MANY = "rd_project.rd_task.tasks.add_many"
+
+
+def _messages(workload, tasks, chunk_size):
+    ids = [str(uuid.uuid4()) for _ in range(tasks)]
+    if workload == "add":
+        return [
+            (ADD, (task_id, i, i, "add"), 2 * i)
+            for i, task_id in enumerate(ids)
+        ]
+    return [
+        (ADD_MANY, (ids[i : i + chunk_size],), len(ids[i : i + chunk_size]))
+        for i in range(0, tasks, chunk_size)
+    ]
+
+
+def _publish(app, queue, messages, config, batched):
+    start = time.perf_counter()
+    with app.producer_or_acquire() as producer:
+        for name, args, _ in messages:
+            app.send_task(
+                name,
+                args,
+                queue=queue,
+                producer=producer,
+                serializer=config["serializer"],
+                compression=config["compression"] if batched else None,
+                ignore_result=config["ignore_result"],
+            )
+    return time.perf_counter() - start
+
+
+def _queued_bytes(app, queue):
+    with app.connection_for_read() as connection:
+        channel = connection.default_channel
+        if connection.transport.driver_type == "redis":
+            return sum(map(len, channel.client.lrange(queue, 0, -1)))
+        # The in-memory transport keeps the envelopes Redis would store.
+        return sum(
+            len(json.dumps(message)) for message in channel.queues[queue].queue
+        )
+
+
+def _consume(app, queue, messages, config):
+    expected = [result for _, _, result in messages]
+    stats = {"result_bytes": 0, "consumed": 0}
+
+    def on_message(body, message):
+        task_id = message.headers["id"]
+        result = expected[stats["consumed"]]
+        if not config["ignore_result"]:
+            meta = {
+                "status": "SUCCESS",
+                "result": result,
+                "traceback": None,
+                "children": [],
+                "date_done": datetime.now(UTC).isoformat(),
+                "task_id": task_id,
+            }
+            stats["result_bytes"] += len(app.backend.encode(meta))
+            app.backend.store_result(task_id, result, "SUCCESS")
+        message.ack()
+        stats["consumed"] += 1
+
+    start = time.perf_counter()
+    with (
+        app.connection_for_read() as connection,
+        connection.Consumer(
+            Queue(queue),
+            callbacks=[on_message],
+            accept=["json", "msgpack"],
+        ),
+    ):
+        while stats["consumed"] < len(messages):
+            connection.drain_events(timeout=10)
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def run(app, name, workload, tasks, chunk_size):
+    config = CONFIGS[name]
+    queue = f"benchmark.{name}.{workload}"
+    messages = _messages(workload, tasks, chunk_size)
+    with app.connection_for_write() as connection:
+        Queue(queue)(connection.default_channel).declare()
+    publish_seconds = _publish(
+        app, queue, messages, config, batched=workload == "add_many"
+    )
+    message_bytes = _queued_bytes(app, queue)
+    consumed = _consume(app, queue, messages, config)
+    return {
+        "config": name,
+        "workload": workload,
+        "tasks": tasks,
+        "messages": len(messages),
+        "message_bytes": message_bytes,
+        "result_bytes": consumed["result_bytes"],
+        "bytes_per_task": round(
+            (message_bytes + consumed["result_bytes"]) / tasks, 1
+        ),
+        "published_per_second": round(len(messages) / publish_seconds),
+        "consumed_per_second": round(len(messages) / consumed["seconds"]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--broker", default="redis://localhost:6379/0")
+    parser.add_argument("--backend", default="redis://localhost:6379/0")
+    parser.add_argument("--tasks", type=int, default=20000)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+    app = Celery("broker_throughput", broker=args.broker, backend=args.backend)
+    for workload in ("add", "add_many"):
+        for name in CONFIGS:
+            print(
+                json.dumps(
+                    run(app, name, workload, args.tasks, args.chunk_size)
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
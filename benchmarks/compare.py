@@ -0,0 +1,49 @@
+"""Compare two benchmark result files written by the benchmark suite.
+
+python benchmarks/compare.py .benchmarks/old.json .benchmarks/new.json
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+
+def _key(benchmark):
+    return (benchmark["name"], json.dumps(benchmark["params"], sort_keys=True))
+
+
+def _load(path):
+    data = json.loads(Path(path).read_text())
+    return {_key(benchmark): benchmark for benchmark in data["benchmarks"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Relative slowdown reported as a regression.",
+    )
+    args = parser.parse_args()
+    old, new = _load(args.old), _load(args.new)
+    regressions = 0
+    for key in sorted(old.keys() & new.keys()):
+        before, after = old[key], new[key]
+        change = after["median_seconds"] / before["median_seconds"] - 1
+        queries = (
+            after["queries_per_operation"] - before["queries_per_operation"]
+        )
+        regression = change > args.threshold or queries > 0
+        regressions += regression
+        print(
+            f"{'!' if regression else ' '} {key[0]} {key[1]}: "
+            f"{change:+.1%} time, {queries:+.2f} queries/op"
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,142 @@
+"""Benchmark harness.
+
+Benchmarks use the ``bench`` fixture, which runs a callable for a number of
+rounds and records its wall time and the SQL queries it issues. At the end
+of the session every measurement is written as JSON to ``BENCHMARK_OUTPUT``
+(by default ``.benchmarks/<timestamp>.json``) so that runs can be compared
+with ``python benchmarks/compare.py old.json new.json``.
+"""
+
+import contextlib
+import json
+import os
+import platform
+import statistics
+import time
+from dataclasses import dataclass
+from dataclasses import field
+from datetime import UTC
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+RESULTS = []
+
+
+@dataclass
+class Measurement:
+    name: str
+    params: dict
+    operations: int
+    times: list = field(default_factory=list)
+    queries: int = 0
+    result: Any = field(default=None, repr=False)
+
+    @property
+    def seconds(self):
+        return statistics.median(self.times)
+
+    @property
+    def queries_per_operation(self):
+        return self.queries / self.operations
+
+    def rate(self, operations=None):
+        operations = operations or self.operations
+        return operations / self.seconds if self.seconds else float("inf")
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "params": self.params,
+            "operations": self.operations,
+            "queries": self.queries,
+            "rounds": len(self.times),
+            "min_seconds": min(self.times),
+            "median_seconds": self.seconds,
+            "mean_seconds": statistics.mean(self.times),
+            "operations_per_second": self.rate(),
+            "queries_per_operation": self.queries_per_operation,
+        }
+
+
+@pytest.fixture(autouse=True)
+def _no_rate_limit(settings):
+    # Benchmarks submit tasks far faster than any client is allowed to.
+    settings.API_RATE_LIMIT_ENABLED = False
+
+
+@pytest.fixture
+def bench(request):
+    """Measure ``func``, recording the result under the test's name.
+
+    ``setup`` runs before every round and is not timed; ``operations`` is
+    the number of operations one call of ``func`` performs. The query count
+    is the one of the first round; pass ``count_queries=False`` for code
+    that does not touch the database.
+    """
+
+    def _bench(
+        func,
+        *,
+        rounds=1,
+        operations=1,
+        setup=None,
+        count_queries=True,
+        **params,
+    ):
+        callspec = getattr(request.node, "callspec", None)
+        measurement = Measurement(
+            name=request.node.originalname,
+            params={**(callspec.params if callspec else {}), **params},
+            operations=operations,
+        )
+        for round_ in range(rounds):
+            if setup is not None:
+                setup()
+            queries = (
+                CaptureQueriesContext(connection)
+                if count_queries
+                else contextlib.nullcontext([])
+            )
+            with queries as captured:
+                start = time.perf_counter()
+                measurement.result = func()
+                measurement.times.append(time.perf_counter() - start)
+            if round_ == 0:
+                measurement.queries = len(captured)
+        RESULTS.append(measurement)
+        print(
+            f"\n{measurement.name} {measurement.params}: "
+            f"{measurement.rate():.1f} ops/s, "
+            f"{measurement.queries_per_operation:.2f} queries/op"
+        )
+        return measurement
+
+    return _bench
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if not RESULTS:
+        return
+    output = Path(
+        os.getenv(
+            "BENCHMARK_OUTPUT",
+            f".benchmarks/{datetime.now(UTC):%Y%m%dT%H%M%S}.json",
+        )
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps(
+            {
+                "created_at": datetime.now(UTC).isoformat(),
+                "python": platform.python_version(),
+                "database": connection.vendor,
+                "benchmarks": [result.as_dict() for result in RESULTS],
+            },
+            indent=2,
+        )
+    )
@@ -0,0 +1,84 @@
+"""Concurrent load test comparing the WSGI and the ASGI task endpoints.
+
+Start both servers, e.g. with ``docker compose up web web_asgi``, then run::
+
+    python benchmarks/loadtest.py --requests 2000 --concurrency 200
+
+Every client creates a task and polls its status once, which is the
+traffic pattern of the API. The script only uses the standard library.
+"""
+
+import argparse
+import json
+import statistics
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+TARGETS = {
+    "wsgi": "http://localhost:8000/api/tasks/",
+    "asgi": "http://localhost:8001/api/async/tasks/",
+}
+
+
+def _request(url, data=None):
+    body = json.dumps(data).encode() if data is not None else None
+    request = urllib.request.Request(  # noqa: S310
+        url, data=body, headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request, timeout=60) as response:  # noqa: S310
+        return json.loads(response.read())
+
+
+def _create_and_poll(base_url, status_suffix, i):
+    start = time.perf_counter()
+    task = _request(base_url, {"a": i, "b": i})
+    _request(f"{base_url}{task['id']}/{status_suffix}")
+    return time.perf_counter() - start
+
+
+def run(name, base_url, requests, concurrency):
+    status_suffix = "status/" if name == "asgi" else ""
+    errors = 0
+    latencies = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [
+            pool.submit(_create_and_poll, base_url, status_suffix, i)
+            for i in range(requests)
+        ]
+        for future in futures:
+            try:
+                latencies.append(future.result())
+            except Exception:
+                errors += 1
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "target": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1)
+        if latencies
+        else None,
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1)
+        if latencies
+        else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--wsgi-url", default=TARGETS["wsgi"])
+    parser.add_argument("--asgi-url", default=TARGETS["asgi"])
+    args = parser.parse_args()
+    for name, url in (("wsgi", args.wsgi_url), ("asgi", args.asgi_url)):
+        print(json.dumps(run(name, url, args.requests, args.concurrency)))
+
+
+if __name__ == "__main__":
+    main()
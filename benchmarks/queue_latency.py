@@ -0,0 +1,75 @@
+"""End-to-end latency of high priority tasks while a bulk backlog drains.
+
+Start the stack with ``docker compose up``, then run::
+
+    python benchmarks/queue_latency.py --backlog 50000 --samples 200
+
+The script measures the time from creating a task to its completion, as
+reported by the long-poll endpoint, first on an idle system and then right
+after submitting a bulk backlog. With dedicated queues the two p99 values
+should stay close. It only uses the standard library.
+"""
+
+import argparse
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from loadtest import _request
+
+
+def _complete(base_url, priority, i):
+    start = time.perf_counter()
+    task = _request(
+        f"{base_url}tasks/", {"a": i, "b": i, "priority": priority}
+    )
+    status = _request(f"{base_url}async/tasks/{task['id']}/wait/?timeout=60")
+    if status["status"] == "PENDING":
+        raise TimeoutError(task["id"])
+    return time.perf_counter() - start
+
+
+def _sample(base_url, priority, samples, concurrency):
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(
+            pool.map(
+                lambda i: _complete(base_url, priority, i), range(samples)
+            )
+        )
+    return {
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1),
+    }
+
+
+def _submit_backlog(base_url, size, batch_size):
+    for start in range(0, size, batch_size):
+        _request(
+            f"{base_url}tasks/bulk/",
+            [{"a": i, "b": i} for i in range(start, start + batch_size)],
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://localhost:8001/api/")
+    parser.add_argument("--backlog", type=int, default=50000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--priority", default="high")
+    args = parser.parse_args()
+    idle = _sample(args.url, args.priority, args.samples, args.concurrency)
+    print(json.dumps({"backlog": 0, "priority": args.priority, **idle}))
+    _submit_backlog(args.url, args.backlog, args.batch_size)
+    busy = _sample(args.url, args.priority, args.samples, args.concurrency)
+    print(
+        json.dumps(
+            {"backlog": args.backlog, "priority": args.priority, **busy}
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from rd_project.rd_task.models import Task
+from rd_project.rd_task.models import TaskResult
+
+SIZES = [100, 1_000, 10_000]
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+def create_tasks(size, results_per_task=1):
+    tasks = Task.objects.bulk_create(Task(a=i, b=i) for i in range(size))
+    TaskResult.objects.bulk_create(
+        TaskResult(task=task, result=task.a + task.b)
+        for task in tasks
+        for _ in range(results_per_task)
+    )
+    return tasks
+
+
+@pytest.mark.django_db
+def test_task_create(api_client, bench, mocker):
+    mocker.patch("rd_project.rd_task.dispatch.dispatch_task")
+    operations = 200
+
+    def create():
+        for i in range(operations):
+            api_client.post("/api/tasks/", {"a": i, "b": i}, format="json")
+
+    bench(create, operations=operations)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", SIZES)
+def test_task_list(api_client, bench, size):
+    create_tasks(size)
+
+    measurement = bench(lambda: api_client.get("/api/tasks/"), rounds=5)
+
+    assert measurement.result.status_code == 200
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("results", [1, 100, 1_000])
+def test_task_detail(api_client, bench, results):
+    (task,) = create_tasks(1, results_per_task=results)
+    url = f"/api/tasks/{task.pk}/"
+
+    bench(
+        lambda: api_client.get(url), rounds=5, setup=cache.clear, cache="cold"
+    )
+    bench(lambda: api_client.get(url), rounds=5, cache="warm")
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("results", [1_000, 100_000])
+def test_task_results_page(api_client, bench, results):
+    (task,) = create_tasks(1, results_per_task=results)
+    url = f"/api/tasks/{task.pk}/results/"
+
+    bench(lambda: api_client.get(url), rounds=5)
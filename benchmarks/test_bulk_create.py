@@ -0,0 +1,46 @@
+import pytest
+from rest_framework.test import APIClient
+
+from rd_project.rd_task.dispatch import relay_outbox
+
+SIZE = 1000
+
+
+@pytest.mark.django_db
+class TestBulkCreateThroughput:
+    @pytest.fixture
+    def api_client(self):
+        return APIClient()
+
+    @pytest.fixture(autouse=True)
+    def no_broker(self, mocker):
+        mocker.patch("rd_project.rd_task.dispatch.dispatch_task")
+        mocker.patch("rd_project.rd_task.dispatch.dispatch_tasks")
+
+    def test_bulk_vs_single_create(self, api_client, bench):
+        data = [{"a": i, "b": i} for i in range(SIZE)]
+
+        def single():
+            for item in data:
+                api_client.post("/api/tasks/", item, format="json")
+
+        def bulk():
+            api_client.post("/api/tasks/bulk/", data, format="json")
+
+        single_run = bench(single, operations=SIZE, path="single")
+        bulk_run = bench(bulk, operations=SIZE, path="bulk")
+
+        assert bulk_run.queries < single_run.queries
+        assert bulk_run.seconds < single_run.seconds
+
+    def test_relay_outbox(self, api_client, bench):
+        data = [{"a": i, "b": i} for i in range(SIZE)]
+
+        bench(
+            relay_outbox,
+            operations=SIZE,
+            setup=lambda: api_client.post(
+                "/api/tasks/bulk/", data, format="json"
+            ),
+            rounds=3,
+        )
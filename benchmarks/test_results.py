@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from rd_project.rd_task.models import Task
+from rd_project.rd_task.models import TaskResult
+from rd_project.rd_task.retention import compact_results
+
+SIZES = [1_000, 100_000]
+
+
+def table_bytes():
+    """On-disk size of the TaskResult table and its indexes, if known."""
+    table = TaskResult._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            # A partitioned table has no storage of its own.
+            cursor.execute(
+                "SELECT coalesce(sum(pg_total_relation_size(relid)), 0) "
+                "FROM pg_partition_tree(%s)",
+                [table],
+            )
+            return int(cursor.fetchone()[0])
+        if connection.vendor == "sqlite":
+            try:
+                cursor.execute(
+                    "SELECT sum(pgsize) FROM dbstat WHERE tbl_name = %s",
+                    [table],
+                )
+            except Exception:
+                return None
+            return cursor.fetchone()[0]
+    return None
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", SIZES)
+def test_detail_before_and_after_compaction(bench, size):
+    task = Task.objects.create(a=1, b=1)
+    TaskResult.objects.bulk_create(
+        (TaskResult(task=task, result=2) for _ in range(size)),
+        batch_size=5000,
+    )
+    TaskResult.objects.update(created_at=timezone.now() - timedelta(days=60))
+    TaskResult.objects.create(task=task, result=2)
+    client = APIClient()
+    url = f"/api/tasks/{task.pk}/"
+
+    bench(
+        lambda: client.get(url),
+        rounds=3,
+        setup=cache.clear,
+        phase="before",
+        rows=TaskResult.objects.count(),
+        table_bytes=table_bytes(),
+    )
+    bench(
+        lambda: compact_results(timezone.now() - timedelta(days=30)),
+        operations=size,
+        phase="compaction",
+    )
+    measurement = bench(
+        lambda: client.get(url),
+        rounds=3,
+        setup=cache.clear,
+        phase="after",
+        rows=TaskResult.objects.count(),
+        table_bytes=table_bytes(),
+    )
+
+    assert measurement.result.status_code == 200
+    assert task.rollup.count == size
@@ -0,0 +1,54 @@
+import random
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from rd_project.celery import app as celery_app
+from rd_project.rd_task.models import Task
+from rd_project.rd_task.models import TaskSchedule
+from rd_project.rd_task.schedulers import ScheduleHeap
+from rd_project.rd_task.schedulers import TaskScheduleScheduler
+
+TICKS = 60
+
+
+@pytest.mark.parametrize("size", [1_000, 10_000, 100_000])
+def test_schedule_heap_tick_latency(size, bench):
+    rng = random.Random(size)
+    heap = ScheduleHeap()
+    for i in range(size):
+        heap.push(i, i, rng.uniform(0, 3600), rng.randint(60, 3600))
+    seconds = iter(range(TICKS))
+
+    tick = bench(
+        lambda: heap.pop_due(next(seconds)),
+        rounds=TICKS,
+        count_queries=False,
+    )
+
+    print(f"max {max(tick.times) * 1e6:.0f}us per tick")
+    assert len(heap) == size
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", [1_000, 10_000])
+def test_scheduler_tick(size, settings, mocker, bench):
+    settings.TASK_SCHEDULER = "engine"
+    dispatch = mocker.patch("rd_project.rd_task.schedulers.dispatch_task_ids")
+    now = timezone.now()
+    schedules = TaskSchedule.objects.bulk_create(
+        TaskSchedule(
+            scheduled_at=now + timedelta(seconds=i % 120 - 60), interval=300
+        )
+        for i in range(size)
+    )
+    Task.objects.bulk_create(
+        Task(schedule=schedule, a=1, b=1) for schedule in schedules
+    )
+
+    load = bench(lambda: TaskScheduleScheduler(app=celery_app), step="load")
+    bench(load.result.tick_schedules, step="first_tick")
+
+    assert len(load.result.schedule_heap) == size
+    assert len(dispatch.call_args.args[0]) > 0
@@ -0,0 +1,83 @@
+import pytest
+from rest_framework.test import APIClient
+from rest_framework.test import APIRequestFactory
+
+from rd_project.api.serializers import TaskListSerializer
+from rd_project.api.serializers import TaskScheduleListSerializer
+from rd_project.api.serializers import TaskScheduleSerializer
+from rd_project.api.serializers import TaskSerializer
+from rd_project.rd_task.models import Task
+from rd_project.rd_task.models import TaskSchedule
+
+SIZE = 1_000
+
+SERIALIZERS = {
+    serializer_class.__name__: serializer_class
+    for serializer_class in (
+        TaskSerializer,
+        TaskListSerializer,
+        TaskScheduleSerializer,
+        TaskScheduleListSerializer,
+    )
+}
+
+
+@pytest.fixture
+def context():
+    return {"request": APIRequestFactory().get("/api/")}
+
+
+def create_schedules(size):
+    schedules = TaskSchedule.objects.bulk_create(
+        TaskSchedule(scheduled_at="2022-02-20T14:24:34Z", interval=30)
+        for _ in range(size)
+    )
+    Task.objects.bulk_create(
+        Task(a=i, b=i, schedule=schedule)
+        for i, schedule in enumerate(schedules)
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "serializer", ["TaskSerializer", "TaskListSerializer"]
+)
+def test_task_list_serializer(bench, context, serializer):
+    serializer_class = SERIALIZERS[serializer]
+    tasks = list(Task.objects.bulk_create(Task(a=i, b=i) for i in range(SIZE)))
+
+    bench(
+        lambda: serializer_class(tasks, many=True, context=context).data,
+        rounds=5,
+        operations=SIZE,
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "serializer", ["TaskScheduleSerializer", "TaskScheduleListSerializer"]
+)
+def test_task_schedule_list_serializer(bench, context, serializer):
+    serializer_class = SERIALIZERS[serializer]
+    create_schedules(SIZE)
+    schedules = list(TaskSchedule.objects.select_related("task"))
+
+    bench(
+        lambda: serializer_class(schedules, many=True, context=context).data,
+        rounds=5,
+        operations=SIZE,
+    )
+
+
+@pytest.mark.django_db
+def test_task_schedule_list_api(bench, settings):
+    settings.API_MAX_PAGE_SIZE = SIZE
+    create_schedules(SIZE)
+    client = APIClient()
+
+    measurement = bench(
+        lambda: client.get("/api/task-schedules/", {"page_size": SIZE}),
+        rounds=5,
+    )
+
+    assert measurement.result.status_code == 200
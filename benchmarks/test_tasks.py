@@ -0,0 +1,133 @@
+import json
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+
+from rd_project.api.serializers import CreateUpdateTaskScheduleSerializer
+from rd_project.celery import app
+from rd_project.rd_task.models import Task
+from rd_project.rd_task.models import TaskSchedule
+from rd_project.rd_task.sweeper import sweep_stale_tasks
+from rd_project.rd_task.tasks import add
+from rd_project.rd_task.tasks import add_many
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("fast_path", [False, True])
+def test_add(bench, settings, fast_path):
+    settings.TASK_WORKER_FAST_PATH = fast_path
+    operations = 200
+    tasks = Task.objects.bulk_create(Task(a=i, b=i) for i in range(operations))
+
+    def run():
+        for task in tasks:
+            add.apply(args=(str(task.id), task.a, task.b))
+
+    bench(run, operations=operations)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", [100, 1_000, 10_000])
+def test_add_many(bench, size):
+    ids = [
+        str(task.id)
+        for task in Task.objects.bulk_create(
+            Task(a=i, b=i) for i in range(size)
+        )
+    ]
+
+    bench(lambda: add_many.apply(args=(ids,)), operations=size)
+
+
+@pytest.mark.django_db
+def test_schedule_celery_beat_task(bench):
+    operations = 100
+    schedules = []
+    for i in range(operations):
+        schedule = TaskSchedule.objects.create(
+            scheduled_at=timezone.now(), interval=10 + i % 10
+        )
+        Task.objects.create(schedule=schedule, a=i, b=i)
+        schedules.append(schedule)
+
+    def schedule_all():
+        for schedule in schedules:
+            schedule.schedule_celery_beat_task()
+
+    def update_all():
+        for schedule in schedules:
+            schedule.update_celery_beat_task()
+
+    bench(schedule_all, operations=operations, step="schedule")
+    bench(update_all, operations=operations, step="update")
+
+
+def schedule_items(size):
+    return [
+        {
+            "a": i,
+            "b": i,
+            "scheduled_at": "2022-02-22T14:14:14Z",
+            "interval": 10 + i % 10,
+        }
+        for i in range(size)
+    ]
+
+
+@pytest.mark.django_db
+def test_create_schedules_one_by_one(bench):
+    items = schedule_items(100)
+
+    def create():
+        for item in items:
+            serializer = CreateUpdateTaskScheduleSerializer(data=item)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+
+    bench(create, operations=len(items))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("size", [1_000, 10_000])
+def test_import_schedules(bench, size, tmp_path):
+    source = tmp_path / "schedules.ndjson"
+    source.write_text("\n".join(json.dumps(i) for i in schedule_items(size)))
+
+    bench(
+        lambda: call_command(
+            "import_schedules", str(source), stdout=StringIO()
+        ),
+        operations=size,
+    )
+
+    assert TaskSchedule.objects.count() == size
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("finished", [10_000, 100_000])
+def test_sweep_stale_tasks(bench, mocker, finished):
+    mocker.patch.object(app, "send_task")
+    stale = 100
+    then = timezone.now() - timedelta(hours=1)
+    Task.objects.bulk_create(
+        (
+            Task(
+                a=i,
+                b=i,
+                status=Task.PENDING if i < stale else Task.SUCCESS,
+            )
+            for i in range(finished + stale)
+        ),
+        batch_size=10_000,
+    )
+    Task.objects.update(created_at=then, updated_at=then)
+    with connection.cursor() as cursor:
+        # Without statistics SQLite prefers the schedule index.
+        cursor.execute("ANALYZE")
+
+    # The cost should follow the stale tasks, not the finished rows.
+    bench(lambda: sweep_stale_tasks(age=60), operations=stale)
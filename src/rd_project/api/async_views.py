@@ -0,0 +1,190 @@
+"""Async variants of the task endpoints, meant to be served over ASGI.
+
+While a request waits on the database, the cache or the broker, the event
+loop keeps serving other requests instead of holding a whole worker.
+"""
+
+import json
+import logging
+import math
+import time
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404
+from django.http import JsonResponse
+from django.http import StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+from django.views.decorators.http import require_POST
+
+from rd_project.rd_task.dispatch import BACKEND_OUTBOX
+from rd_project.rd_task.dispatch import adispatch_task
+from rd_project.rd_task.dispatch import enqueue_task
+from rd_project.rd_task.models import Task
+from rd_project.rd_task.notifications import subscribe
+
+from .cache import aadd_task_detail
+from .cache import aget_task_detail
+from .cache import with_absolute_url
+from .serializers import TaskSerializer
+from .throttling import TaskCreateThrottle
+from .throttling import is_overloaded
+
+logger = logging.getLogger(__name__)
+
+
+async def _get_task(queryset, pk):
+    try:
+        return await queryset.aget(pk=pk)
+    except Task.DoesNotExist as error:
+        raise Http404("No Task matches the given query.") from error
+
+
+@transaction.atomic
+def _create_outbox_task(data):
+    task = Task.objects.create(**data)
+    enqueue_task(task)
+    return task
+
+
+def _timeout(request, maximum):
+    try:
+        timeout = float(request.GET.get("timeout", maximum))
+    except ValueError:
+        timeout = maximum
+    return min(max(timeout, 0), maximum)
+
+
+def _refuse_task(request):
+    """Response refusing a submission, or ``None`` to accept it."""
+    throttle = TaskCreateThrottle()
+    if not throttle.allow_request(request, None):
+        response = JsonResponse(
+            {"detail": "Request was throttled."}, status=429
+        )
+        response["Retry-After"] = str(math.ceil(throttle.wait()))
+        return response
+    if is_overloaded():
+        response = JsonResponse(
+            {"detail": "Too many tasks are waiting, retry later."},
+            status=503,
+        )
+        response["Retry-After"] = str(settings.API_ADMISSION_RETRY_AFTER)
+        return response
+    return None
+
+
+@csrf_exempt
+@require_POST
+async def task_create(request):
+    refused = await sync_to_async(_refuse_task)(request)
+    if refused is not None:
+        return refused
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"detail": "JSON parse error."}, status=400)
+    serializer = TaskSerializer(data=data, context={"request": request})
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+    if settings.TASK_DISPATCH_BACKEND == BACKEND_OUTBOX:
+        task = await sync_to_async(_create_outbox_task)(
+            serializer.validated_data
+        )
+    else:
+        # Autocommit: the task is visible to workers before the publish.
+        task = await Task.objects.acreate(**serializer.validated_data)
+        await adispatch_task(task)
+    return JsonResponse(
+        TaskSerializer(task, context={"request": request}).data, status=201
+    )
+
+
+@require_GET
+async def task_detail(request, pk):
+    data = await aget_task_detail(pk)
+    if data is None:
+        task = await _get_task(Task.objects.with_latest_results(), pk)
+        data = await aadd_task_detail(task)
+    return JsonResponse(with_absolute_url(data, request))
+
+
+@require_GET
+async def task_status(request, pk):
+    task = await _get_task(Task.objects.only("id", "status"), pk)
+    return JsonResponse({"id": str(task.id), "status": task.status})
+
+
+@require_GET
+async def task_wait(request, pk):
+    """Long-poll until the task has finished or the timeout has passed."""
+    timeout = _timeout(request, settings.TASK_WAIT_MAX_TIMEOUT)
+    async with subscribe([pk]) as subscription:
+        task = await _get_task(Task.objects.only("id", "status"), pk)
+        status = task.status
+        if status == Task.PENDING:
+            notification = await subscription.get(timeout)
+            if notification is not None:
+                _, status = notification
+    return JsonResponse({"id": str(task.id), "status": status})
+
+
+def _sse(task_id, status):
+    data = json.dumps({"id": task_id, "status": status})
+    return f"event: task\ndata: {data}\n\n"
+
+
+async def _task_events(task_ids, timeout):
+    deadline = time.monotonic() + timeout
+    async with subscribe(task_ids) as subscription:
+        pending = set()
+        async for task_id, status in Task.objects.filter(
+            pk__in=task_ids
+        ).values_list("id", "status"):
+            if status == Task.PENDING:
+                pending.add(str(task_id))
+            else:
+                yield _sse(str(task_id), status)
+        while pending and (remaining := deadline - time.monotonic()) > 0:
+            notification = await subscription.get(remaining)
+            if notification is None:
+                break
+            task_id, status = notification
+            if task_id in pending:
+                pending.discard(task_id)
+                yield _sse(task_id, status)
+    yield "event: end\ndata: {}\n\n"
+
+
+@require_GET
+async def task_events(request):
+    """Stream a server-sent event for every listed task once it finishes.
+
+    The task ids are passed as ``?ids=<id>,<id>``; the stream ends when all
+    of them have finished or the timeout has passed.
+    """
+    task_ids = [
+        task_id for task_id in request.GET.get("ids", "").split(",") if task_id
+    ]
+    try:
+        task_ids = [str(uuid.UUID(task_id)) for task_id in task_ids]
+    except ValueError:
+        return JsonResponse({"ids": "Invalid task id."}, status=400)
+    if not task_ids or len(task_ids) > settings.TASK_EVENTS_MAX_IDS:
+        return JsonResponse(
+            {
+                "ids": f"Between 1 and {settings.TASK_EVENTS_MAX_IDS} "
+                "task ids are required."
+            },
+            status=400,
+        )
+    timeout = _timeout(request, settings.TASK_EVENTS_MAX_TIMEOUT)
+    response = StreamingHttpResponse(
+        _task_events(task_ids, timeout), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,49 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from rd_project.rd_task.cache import task_detail_key
+
+from .serializers import TaskSerializer
+
+
+def serialize_task_detail(task):
+    """Serialize a task for the detail view with request independent URLs."""
+    return TaskSerializer(
+        task, context={"request": None, "show_results": True}
+    ).data
+
+
+def get_task_detail(task_id):
+    return cache.get(task_detail_key(task_id))
+
+
+def add_task_detail(task):
+    """Cache a payload read by the API unless the entry is already taken.
+
+    An entry invalidated by the worker stays taken for a few seconds, so a
+    request that read the row before the worker committed cannot cache a
+    stale payload.
+    """
+    data = serialize_task_detail(task)
+    cache.add(
+        task_detail_key(task.id), data, settings.TASK_DETAIL_CACHE_TIMEOUT
+    )
+    return data
+
+
+async def aget_task_detail(task_id):
+    return await cache.aget(task_detail_key(task_id))
+
+
+async def aadd_task_detail(task):
+    # The results summary is aggregated with a query.
+    data = await sync_to_async(serialize_task_detail)(task)
+    await cache.aadd(
+        task_detail_key(task.id), data, settings.TASK_DETAIL_CACHE_TIMEOUT
+    )
+    return data
+
+
+def with_absolute_url(data, request):
+    return {**data, "url": request.build_absolute_uri(data["url"])}
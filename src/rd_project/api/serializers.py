@@ -1,10 +1,16 @@
 import logging
 
+from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
 from rest_framework import serializers
 
+from rd_project.rd_task.export import EXPORT_FORMATS
 from rd_project.rd_task.models import Task
 from rd_project.rd_task.models import TaskResult
 from rd_project.rd_task.models import TaskSchedule
+from rd_project.rd_task.operations import ADD
+from rd_project.rd_task.operations import operation_choices
 
 logger = logging.getLogger(__name__)
 
@@ -26,9 +32,11 @@ class TaskSerializer(serializers.HyperlinkedModelSerializer):
         fields = (
             "url",
             "id",
+            "operation",
             "a",
             "b",
             "is_scheduled",
+            "priority",
             "status",
             "failed_message",
             "celery_task_id",
@@ -51,49 +59,140 @@ class TaskSerializer(serializers.HyperlinkedModelSerializer):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         if kwargs.get("context", {}).get("show_results"):
-            self.fields["results"] = TaskResultSerializer(many=True)
+            self.fields["results"] = serializers.SerializerMethodField()
+            self.fields["results_summary"] = (
+                serializers.SerializerMethodField()
+            )
 
     def get_is_scheduled(self, obj):
         return obj.schedule_id is not None
 
+    def get_results(self, obj):
+        return TaskResultSerializer(obj.latest_results(), many=True).data
+
+    def get_results_summary(self, obj):
+        summary = obj.get_results_summary()
+        if summary["last_run_at"] is not None:
+            summary["last_run_at"] = (
+                serializers.DateTimeField().to_representation(
+                    summary["last_run_at"]
+                )
+            )
+        return summary
+
+
+class BulkTaskListSerializer(serializers.ListSerializer):
+    def create(self, validated_data):
+        tasks = [Task(**item) for item in validated_data]
+        with transaction.atomic():
+            return Task.objects.bulk_create(
+                tasks, batch_size=settings.TASK_BULK_BATCH_SIZE
+            )
+
+
+class BulkTaskSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Task
+        fields = ["operation", "a", "b", "priority"]
+        list_serializer_class = BulkTaskListSerializer
+        # Bulk jobs go to their own queue unless asked otherwise.
+        extra_kwargs = {"priority": {"default": Task.LOW}}
+
+
+class TaskExportSerializer(serializers.Serializer):
+    export_format = serializers.ChoiceField(
+        choices=sorted(EXPORT_FORMATS), default="ndjson"
+    )
+    status = serializers.ChoiceField(
+        choices=Task.STATUS_CHOICES, required=False
+    )
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+
 
 class CreateUpdateTaskScheduleSerializer(
     serializers.HyperlinkedModelSerializer
 ):
+    operation = serializers.ChoiceField(
+        choices=operation_choices(), default=ADD
+    )
     a = serializers.IntegerField()
     b = serializers.IntegerField()
+    priority = serializers.ChoiceField(
+        choices=Task.PRIORITY_CHOICES, default=Task.NORMAL
+    )
 
     class Meta:
         model = TaskSchedule
         fields = [
+            "operation",
             "a",
             "b",
+            "priority",
             "scheduled_at",
             "interval",
+            "misfire_policy",
         ]
 
+    def validate_misfire_policy(self, value):
+        # DatabaseScheduler runs missed runs once whatever the policy; only
+        # the schedule engine skips or catches up.
+        if (
+            value != TaskSchedule.COALESCE
+            and settings.TASK_SCHEDULER != "engine"
+        ):
+            raise serializers.ValidationError(
+                f'"{value}" needs TASK_SCHEDULER=engine; beat only '
+                "coalesces missed runs."
+            )
+        return value
+
+    @transaction.atomic
     def create(self, validated_data):
         schedule = TaskSchedule.objects.create(
             scheduled_at=validated_data["scheduled_at"],
             interval=validated_data["interval"],
+            misfire_policy=validated_data.get(
+                "misfire_policy", TaskSchedule.COALESCE
+            ),
         )
         Task.objects.create(
-            schedule=schedule, a=validated_data["a"], b=validated_data["b"]
+            schedule=schedule,
+            operation=validated_data["operation"],
+            a=validated_data["a"],
+            b=validated_data["b"],
+            priority=validated_data["priority"],
         )
         schedule.schedule_celery_beat_task()
         return schedule
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         instance.scheduled_at = validated_data["scheduled_at"]
         instance.interval = validated_data["interval"]
+        instance.misfire_policy = validated_data.get(
+            "misfire_policy", instance.misfire_policy
+        )
         instance.save()
+        instance.task.operation = validated_data["operation"]
         instance.task.a = validated_data["a"]
         instance.task.b = validated_data["b"]
+        instance.task.priority = validated_data["priority"]
         instance.task.save()
         instance.update_celery_beat_task()
         return instance
 
 
+class BulkTaskScheduleListSerializer(serializers.ListSerializer):
+    def create(self, validated_data):
+        return TaskSchedule.bulk_create_schedules(validated_data)
+
+
+class BulkTaskScheduleSerializer(CreateUpdateTaskScheduleSerializer):
+    class Meta(CreateUpdateTaskScheduleSerializer.Meta):
+        list_serializer_class = BulkTaskScheduleListSerializer
+
+
 class TaskScheduleSerializer(serializers.HyperlinkedModelSerializer):
     task = TaskSerializer()
 
@@ -104,6 +203,7 @@ class TaskScheduleSerializer(serializers.HyperlinkedModelSerializer):
             "task",
             "scheduled_at",
             "interval",
+            "misfire_policy",
             "created_at",
             "updated_at",
         ]
@@ -114,3 +214,67 @@ class TaskScheduleSerializer(serializers.HyperlinkedModelSerializer):
                 "lookup_field": "pk",
             }
         }
+
+
+class LightweightListSerializer(serializers.BaseSerializer):
+    """Read-only serializer for list pages that skips DRF field machinery.
+
+    It produces the same output as its ``ModelSerializer`` counterpart, but
+    builds every row as a plain dict and reverses the detail URL once per
+    page instead of once per object.
+    """
+
+    datetime_field = serializers.DateTimeField()
+    list_view_name = None
+
+    def detail_url(self, pk):
+        url_prefix = getattr(self, "_url_prefix", None)
+        if url_prefix is None:
+            url_prefix = reverse(self.list_view_name)
+            request = self.context.get("request")
+            if request is not None:
+                url_prefix = request.build_absolute_uri(url_prefix)
+            self._url_prefix = url_prefix
+        return f"{url_prefix}{pk}/"
+
+    def datetime(self, value):
+        return self.datetime_field.to_representation(value)
+
+
+class TaskListSerializer(LightweightListSerializer):
+    list_view_name = "api:tasks-list"
+
+    def to_representation(self, instance):
+        return {
+            "url": self.detail_url(instance.pk),
+            "id": str(instance.pk),
+            "operation": instance.operation,
+            "a": instance.a,
+            "b": instance.b,
+            "is_scheduled": instance.schedule_id is not None,
+            "priority": instance.priority,
+            "status": instance.status,
+            "failed_message": instance.failed_message,
+            "celery_task_id": instance.celery_task_id,
+            "created_at": self.datetime(instance.created_at),
+            "updated_at": self.datetime(instance.updated_at),
+        }
+
+
+class TaskScheduleListSerializer(LightweightListSerializer):
+    list_view_name = "api:taskschedules-list"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.task_serializer = TaskListSerializer(context=self.context)
+
+    def to_representation(self, instance):
+        return {
+            "url": self.detail_url(instance.pk),
+            "task": self.task_serializer.to_representation(instance.task),
+            "scheduled_at": self.datetime(instance.scheduled_at),
+            "interval": instance.interval,
+            "misfire_policy": instance.misfire_policy,
+            "created_at": self.datetime(instance.created_at),
+            "updated_at": self.datetime(instance.updated_at),
+        }
@@ -0,0 +1,212 @@
+"""Per-client rate limiting and admission control of task submissions.
+
+Clients get a token bucket per scope, sized and refilled from the DRF rate
+of the scope (``"100/min"`` holds 100 tokens and refills 100 per minute).
+The buckets live in Redis when ``API_RATE_LIMIT_URL`` is set, updated by a
+single Lua script so every web process shares them; otherwise each process
+keeps its own, which is what the tests use.
+
+Admission control rejects submissions with a 503 while the backlog is over
+``API_ADMISSION_MAX_PENDING`` pending tasks or ``API_ADMISSION_MAX_QUEUED``
+broker messages. The backlog is measured at most once per
+``API_ADMISSION_CHECK_INTERVAL`` seconds per process, so an accepted
+request normally pays for one Redis round trip and no query.
+"""
+
+import logging
+import math
+import threading
+import time
+
+import redis
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from rd_project.celery import app
+from rd_project.rd_task.autoscale import queue_length
+from rd_project.rd_task.models import Task
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "throttle:"
+
+# Returns the seconds to wait for a token, 0 when one was taken. Redis'
+# clock is used so that every web host refills the buckets alike.
+BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local time = redis.call("TIME")
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "updated_at")
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call("HSET", KEYS[1], "tokens", tokens, "updated_at", now)
+redis.call("EXPIRE", KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+_bucket_script = None
+_local_lock = threading.Lock()
+_local_buckets = {}
+
+
+def _redis_take_token(key, rate, capacity):
+    global _bucket_script
+    if _bucket_script is None:
+        _bucket_script = redis.Redis.from_url(
+            settings.API_RATE_LIMIT_URL
+        ).register_script(BUCKET_SCRIPT)
+    return float(_bucket_script(keys=[key], args=[rate, capacity]))
+
+
+def _local_take_token(key, rate, capacity):
+    now = time.monotonic()
+    with _local_lock:
+        tokens, updated_at = _local_buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        _local_buckets[key] = (tokens, now)
+    return wait
+
+
+def take_token(key, rate, capacity):
+    """Take a token from the bucket ``key``.
+
+    Returns 0 when a token was taken, otherwise the seconds until the next
+    one. When Redis is unreachable requests are let through.
+    """
+    if not settings.API_RATE_LIMIT_URL:
+        return _local_take_token(key, rate, capacity)
+    try:
+        return _redis_take_token(KEY_PREFIX + key, rate, capacity)
+    except redis.RedisError:
+        logger.warning("Rate limiting is unavailable", exc_info=True)
+        return 0.0
+
+
+def parse_rate(rate):
+    """Refill rate per second and capacity of a ``"<tokens>/<period>"``."""
+    tokens, period = rate.split("/")
+    seconds = {"s": 1, "m": 60, "h": 3600, "d": 86400}[period[0]]
+    return int(tokens) / seconds, int(tokens)
+
+
+def reset_local_buckets():
+    with _local_lock:
+        _local_buckets.clear()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttles a client once its bucket for ``scope`` is empty."""
+
+    scope = None
+
+    def __init__(self):
+        self._wait = None
+
+    def get_rate(self):
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        if rate is None:
+            return None
+        return parse_rate(rate)
+
+    def get_client(self, request):
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            return f"user:{user.pk}"
+        return f"ip:{self.get_ident(request)}"
+
+    def allow_request(self, request, view):
+        rate = self.get_rate()
+        if not settings.API_RATE_LIMIT_ENABLED or rate is None:
+            return True
+        self._wait = take_token(
+            f"{self.scope}:{self.get_client(request)}", *rate
+        )
+        return not self._wait
+
+    def wait(self):
+        return self._wait
+
+
+class TaskCreateThrottle(TokenBucketThrottle):
+    scope = "tasks"
+
+
+class TaskBulkThrottle(TokenBucketThrottle):
+    scope = "tasks_bulk"
+
+
+class Overloaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many tasks are waiting, retry later."
+    default_code = "overloaded"
+
+    def __init__(self, wait):
+        super().__init__()
+        # DRF's exception handler turns ``wait`` into ``Retry-After``.
+        self.wait = math.ceil(wait)
+
+
+_backlog = {"checked_at": None, "overloaded": False}
+
+
+def _pending_over(limit):
+    # Counting stops at the limit, so a huge backlog costs no more.
+    pending = Task.objects.filter(
+        status=Task.PENDING, schedule__isnull=True
+    ).order_by()
+    return pending[: limit + 1].count() > limit
+
+
+def _queued_over(limit):
+    try:
+        queued = queue_length(app, settings.TASK_PRIORITY_QUEUES.values())
+    except Exception:
+        logger.warning("Could not read the queue length", exc_info=True)
+        return False
+    return queued > limit
+
+
+def is_overloaded():
+    """Whether the backlog is over the admission limits, cached briefly."""
+    now = time.monotonic()
+    checked_at = _backlog["checked_at"]
+    if (
+        checked_at is not None
+        and now - checked_at < settings.API_ADMISSION_CHECK_INTERVAL
+    ):
+        return _backlog["overloaded"]
+    max_pending = settings.API_ADMISSION_MAX_PENDING
+    max_queued = settings.API_ADMISSION_MAX_QUEUED
+    overloaded = bool(
+        (max_pending and _pending_over(max_pending))
+        or (max_queued and _queued_over(max_queued))
+    )
+    if overloaded:
+        logger.warning("Rejecting task submissions, the backlog is full")
+    _backlog.update(checked_at=now, overloaded=overloaded)
+    return overloaded
+
+
+def reset_admission():
+    _backlog.update(checked_at=None, overloaded=False)
+
+
+def check_admission():
+    if is_overloaded():
+        raise Overloaded(settings.API_ADMISSION_RETRY_AFTER)
@@ -2,7 +2,14 @@ from django.urls import include
 from django.urls import path
 from rest_framework.routers import DefaultRouter
 
+from .async_views import task_create
+from .async_views import task_detail
+from .async_views import task_events
+from .async_views import task_status
+from .async_views import task_wait
+from .views import ResultStoreStatsView
 from .views import TaskScheduleViewSet
+from .views import TaskStatsView
 from .views import TaskViewSet
 
 app_name = "api"
@@ -15,4 +22,35 @@ router.register(
 
 urlpatterns = [
     path("api/", include(router.urls)),
+    path(
+        "api/result-store/",
+        ResultStoreStatsView.as_view(),
+        name="result-store",
+    ),
+    path("api/stats/", TaskStatsView.as_view(), name="stats"),
+    path(
+        "api/async/tasks/",
+        task_create,
+        name="async-tasks-create",
+    ),
+    path(
+        "api/async/tasks/events/",
+        task_events,
+        name="async-tasks-events",
+    ),
+    path(
+        "api/async/tasks/<uuid:pk>/",
+        task_detail,
+        name="async-tasks-detail",
+    ),
+    path(
+        "api/async/tasks/<uuid:pk>/status/",
+        task_status,
+        name="async-tasks-status",
+    ),
+    path(
+        "api/async/tasks/<uuid:pk>/wait/",
+        task_wait,
+        name="async-tasks-wait",
+    ),
 ]
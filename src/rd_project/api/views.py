@@ -1,21 +1,51 @@
 import logging
 
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.mixins import CreateModelMixin
 from rest_framework.mixins import DestroyModelMixin
 from rest_framework.mixins import ListModelMixin
 from rest_framework.mixins import RetrieveModelMixin
 from rest_framework.mixins import UpdateModelMixin
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet
 
+from rd_project.rd_task.cache import invalidate_task_detail
+from rd_project.rd_task.dispatch import DISPATCH_MODES
+from rd_project.rd_task.dispatch import enqueue_task
+from rd_project.rd_task.dispatch import enqueue_tasks
+from rd_project.rd_task.export import EXPORT_FORMATS
+from rd_project.rd_task.export import export_rows
 from rd_project.rd_task.models import Task
+from rd_project.rd_task.models import TaskResult
 from rd_project.rd_task.models import TaskSchedule
-from rd_project.rd_task.tasks import add
+from rd_project.rd_task.result_store import stats as result_store_stats
+from rd_project.rd_task.stats import is_reconciled
+from rd_project.rd_task.stats import stats as task_stats
+from rd_project.rd_task.tasks import reconcile_task_stats
 
+from .cache import add_task_detail
+from .cache import get_task_detail
+from .cache import with_absolute_url
+from .parsers import NDJSONParser
+from .serializers import BulkTaskScheduleSerializer
+from .serializers import BulkTaskSerializer
 from .serializers import CreateUpdateTaskScheduleSerializer
+from .serializers import TaskExportSerializer
+from .serializers import TaskListSerializer
+from .serializers import TaskResultSerializer
+from .serializers import TaskScheduleListSerializer
 from .serializers import TaskScheduleSerializer
 from .serializers import TaskSerializer
+from .throttling import TaskBulkThrottle
+from .throttling import TaskCreateThrottle
+from .throttling import check_admission
 
 logger = logging.getLogger(__name__)
 
@@ -29,17 +59,25 @@ class TaskScheduleViewSet(
     GenericViewSet,
 ):
     lookup_field = "pk"
-    queryset = TaskSchedule.objects.all().order_by("-created_at")
+    queryset = (
+        TaskSchedule.objects.all()
+        .select_related("task")
+        .order_by("-created_at", "-id")
+    )
     serializer_class = TaskScheduleSerializer
 
     def get_serializer_class(self):
         if self.action == "create":
             return CreateUpdateTaskScheduleSerializer
+        if self.action == "list":
+            return TaskScheduleListSerializer
         return TaskScheduleSerializer
 
     def perform_destroy(self, instance):
+        task_id = instance.task.id
         instance.delete_celery_beat_task()
         instance.delete()
+        invalidate_task_detail(task_id)
 
     def create(self, request, *args, **kwargs):
         serializer = CreateUpdateTaskScheduleSerializer(data=request.data)
@@ -59,12 +97,35 @@ class TaskScheduleViewSet(
         )
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
+        invalidate_task_detail(instance.task.id)
         return Response(
             TaskScheduleSerializer(
                 serializer.instance, context={"request": request}
             ).data,
         )
 
+    @action(
+        detail=False,
+        methods=["post"],
+        parser_classes=[JSONParser, NDJSONParser],
+    )
+    def bulk(self, request):
+        serializer = BulkTaskScheduleSerializer(
+            data=request.data,
+            many=True,
+            allow_empty=False,
+            max_length=settings.TASK_BULK_MAX_SIZE,
+        )
+        serializer.is_valid(raise_exception=True)
+        schedules = serializer.save()
+        return Response(
+            {
+                "count": len(schedules),
+                "ids": [str(schedule.id) for schedule in schedules],
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
 
 class TaskViewSet(
     ListModelMixin,
@@ -73,20 +134,107 @@ class TaskViewSet(
     GenericViewSet,
 ):
     lookup_field = "pk"
-    queryset = (
-        Task.objects.all()
-        .prefetch_related("results")
-        .prefetch_related("schedule")
-        .order_by("-created_at")
-    )
+    queryset = Task.objects.all().order_by("-created_at", "-id")
     serializer_class = TaskSerializer
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "retrieve":
+            queryset = queryset.with_latest_results()
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return TaskListSerializer
+        return TaskSerializer
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         if self.action == "retrieve":
             context["show_results"] = True
         return context
 
+    def get_throttles(self):
+        if self.action == "create":
+            return [TaskCreateThrottle()]
+        if self.action == "bulk":
+            return [TaskBulkThrottle()]
+        return super().get_throttles()
+
+    def retrieve(self, request, *args, **kwargs):
+        data = get_task_detail(kwargs[self.lookup_field])
+        if data is None:
+            data = add_task_detail(self.get_object())
+        return Response(with_absolute_url(data, request))
+
+    def create(self, request, *args, **kwargs):
+        check_admission()
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
-        task = serializer.save()
-        add.delay(str(task.id), task.a, task.b)
+        with transaction.atomic():
+            task = serializer.save()
+            enqueue_task(task)
+
+    @action(
+        detail=False,
+        methods=["post"],
+        parser_classes=[JSONParser, NDJSONParser],
+    )
+    def bulk(self, request):
+        mode = request.query_params.get("dispatch")
+        if mode is not None and mode not in DISPATCH_MODES:
+            raise ValidationError(
+                {"dispatch": f"Must be one of: {', '.join(DISPATCH_MODES)}."}
+            )
+        check_admission()
+        serializer = BulkTaskSerializer(
+            data=request.data,
+            many=True,
+            allow_empty=False,
+            max_length=settings.TASK_BULK_MAX_SIZE,
+        )
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            tasks = serializer.save()
+            enqueue_tasks(tasks, mode=mode)
+        return Response(
+            {"count": len(tasks), "ids": [str(task.id) for task in tasks]},
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(detail=True, methods=["get"])
+    def results(self, request, *args, **kwargs):
+        task = self.get_object()
+        page = self.paginate_queryset(TaskResult.objects.filter(task=task))
+        return self.get_paginated_response(
+            TaskResultSerializer(page, many=True).data
+        )
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        serializer = TaskExportSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        filters = dict(serializer.validated_data)
+        export_format = filters.pop("export_format")
+        content_type, writer = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(
+            writer(export_rows(**filters)), content_type=content_type
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="tasks.{export_format}"'
+        )
+        return response
+
+
+class ResultStoreStatsView(APIView):
+    def get(self, request, *args, **kwargs):
+        return Response(result_store_stats())
+
+
+class TaskStatsView(APIView):
+    def get(self, request, *args, **kwargs):
+        if not is_reconciled():
+            # The cache was emptied; count once instead of serving zeros.
+            reconcile_task_stats()
+        return Response(task_stats())
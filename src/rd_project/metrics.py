@@ -0,0 +1,259 @@
+"""In-process metrics exposed in the Prometheus text format.
+
+Every thread records into its own shard, so recording a value never takes
+a lock; the shards are only summed when the metrics are rendered. Each
+process (web server, Celery worker child) has its own registry.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+from django.http import HttpResponse
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+COUNTER = "counter"
+HISTOGRAM = "histogram"
+
+
+class Metric:
+    def __init__(self, name, kind, help_text, labels, buckets=None):
+        self.name = name
+        self.kind = kind
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = defaultdict(dict)
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def inc(self, metric, labels, value=1):
+        values = self._shard()[metric.name]
+        values[labels] = values.get(labels, 0) + value
+
+    def observe(self, metric, labels, value):
+        values = self._shard()[metric.name]
+        series = values.get(labels)
+        if series is None:
+            # One count per bucket plus +Inf, then the sum.
+            series = values[labels] = [0] * (len(metric.buckets) + 2)
+        series[bisect_left(metric.buckets, value)] += 1
+        series[-1] += value
+
+    def collect(self, metric):
+        totals = {}
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for labels, value in list(shard.get(metric.name, {}).items()):
+                if metric.kind == COUNTER:
+                    totals[labels] = totals.get(labels, 0) + value
+                else:
+                    total = totals.setdefault(labels, [0] * len(value))
+                    for i, count in enumerate(value):
+                        total[i] += count
+        return totals
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for labels, value in sorted(self.collect(metric).items()):
+                label_pairs = list(zip(metric.labels, labels, strict=True))
+                if metric.kind == COUNTER:
+                    lines.append(
+                        f"{metric.name}{_labels(label_pairs)} {value}"
+                    )
+                    continue
+                cumulative = 0
+                bounds = [*map(str, metric.buckets), "+Inf"]
+                for bound, count in zip(bounds, value, strict=False):
+                    cumulative += count
+                    lines.append(
+                        f"{metric.name}_bucket"
+                        f"{_labels([*label_pairs, ('le', bound)])} {cumulative}"
+                    )
+                lines.append(
+                    f"{metric.name}_sum{_labels(label_pairs)} {value[-1]}"
+                )
+                lines.append(
+                    f"{metric.name}_count{_labels(label_pairs)} {cumulative}"
+                )
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._shards_lock:
+            for shard in self._shards:
+                shard.clear()
+
+
+def _escape(value):
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+    )
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return (
+        "{"
+        + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+        + "}"
+    )
+
+
+class QueryCounter:
+    """``connection.execute_wrapper`` counting queries and their time."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+registry = Registry()
+
+http_requests = registry.register(
+    Metric(
+        "http_requests_total",
+        COUNTER,
+        "HTTP requests handled.",
+        ("view", "method", "status"),
+    )
+)
+http_request_duration = registry.register(
+    Metric(
+        "http_request_duration_seconds",
+        HISTOGRAM,
+        "HTTP request latency.",
+        ("view", "method"),
+        LATENCY_BUCKETS,
+    )
+)
+http_request_queries = registry.register(
+    Metric(
+        "http_request_db_queries",
+        HISTOGRAM,
+        "SQL queries per sampled HTTP request.",
+        ("view",),
+        QUERY_BUCKETS,
+    )
+)
+http_request_query_duration = registry.register(
+    Metric(
+        "http_request_db_duration_seconds",
+        HISTOGRAM,
+        "Time spent in SQL queries per sampled HTTP request.",
+        ("view",),
+        LATENCY_BUCKETS,
+    )
+)
+celery_task_duration = registry.register(
+    Metric(
+        "celery_task_duration_seconds",
+        HISTOGRAM,
+        "Celery task run time.",
+        ("task", "state"),
+        LATENCY_BUCKETS,
+    )
+)
+celery_task_queries = registry.register(
+    Metric(
+        "celery_task_db_queries",
+        HISTOGRAM,
+        "SQL queries per sampled Celery task run.",
+        ("task",),
+        QUERY_BUCKETS,
+    )
+)
+celery_task_query_duration = registry.register(
+    Metric(
+        "celery_task_db_duration_seconds",
+        HISTOGRAM,
+        "Time spent in SQL queries per sampled Celery task run.",
+        ("task",),
+        LATENCY_BUCKETS,
+    )
+)
+celery_publish_duration = registry.register(
+    Metric(
+        "celery_publish_duration_seconds",
+        HISTOGRAM,
+        "Time spent publishing Celery messages to the broker.",
+        ("task",),
+        LATENCY_BUCKETS,
+    )
+)
+
+
+def metrics_view(request):
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_http_server(port, host="0.0.0.0"):  # noqa: S104
+    """Serve the metrics of the current process from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,63 @@
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction
+from asgiref.sync import markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+
+from . import metrics
+
+
+class MetricsMiddleware:
+    """Record the latency and, for sampled requests, the SQL queries.
+
+    Query counting only applies to synchronous views: async views run their
+    queries on another thread's connection.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        if random.random() < settings.METRICS_SAMPLE_RATE:
+            queries = metrics.QueryCounter()
+            with connection.execute_wrapper(queries):
+                response = self.get_response(request)
+        else:
+            queries = None
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - start, queries)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, seconds, queries=None):
+        match = request.resolver_match
+        view = match.view_name if match else "<unresolved>"
+        metrics.registry.inc(
+            metrics.http_requests,
+            (view, request.method, str(response.status_code)),
+        )
+        metrics.registry.observe(
+            metrics.http_request_duration, (view, request.method), seconds
+        )
+        if queries is not None:
+            metrics.registry.observe(
+                metrics.http_request_queries, (view,), queries.count
+            )
+            metrics.registry.observe(
+                metrics.http_request_query_duration, (view,), queries.seconds
+            )
@@ -18,13 +18,19 @@ class TaskResultAdmin(admin.TabularInline):
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
     search_fields = ["id"]
-    list_filter = ["status"]
+    list_filter = ["status", "operation", "priority"]
+    # Facet counts and the unfiltered total scan the whole table; the
+    # counts are served by /api/stats/.
+    show_facets = admin.ShowFacets.NEVER
+    show_full_result_count = False
     inlines = [TaskResultAdmin]
     list_display = [
         "id",
+        "operation",
         "a",
         "b",
         "status",
+        "priority",
         "updated_at",
     ]
 
@@ -34,9 +40,11 @@ class TaskAdmin(admin.ModelAdmin):
             {
                 "fields": (
                     "id",
+                    "operation",
                     "a",
                     "b",
                     "status",
+                    "priority",
                     "failed_message",
                 )
             },
@@ -56,4 +64,11 @@ class TaskAdmin(admin.ModelAdmin):
 
 @admin.register(TaskSchedule)
 class TaskScheduleAdmin(admin.ModelAdmin):
-    list_display = ["id", "task", "scheduled_at", "interval", "updated_at"]
+    list_display = [
+        "id",
+        "task",
+        "scheduled_at",
+        "interval",
+        "misfire_policy",
+        "updated_at",
+    ]
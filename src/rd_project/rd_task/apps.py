@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class RdTaskConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "rd_project.rd_task"
+
+    def ready(self):
+        from . import signals  # noqa: F401, PLC0415
@@ -0,0 +1,299 @@
+"""Autoscaling of a Celery worker pool from queue depth and task latency.
+
+Every ``TASK_AUTOSCALE_INTERVAL`` seconds the controller samples the
+messages waiting in the worker's queues, the age of the oldest pending task
+routed to them, how many messages the worker completes per second and how
+many of its processes are busy. ``AutoscalePolicy`` turns a sample into a
+pool size, which ``CeleryPool`` applies with the ``pool_grow`` and
+``pool_shrink`` remote control commands. The pool grows as soon as a backlog
+builds up and shrinks one step at a time, at most once per
+``TASK_AUTOSCALE_COOLDOWN`` seconds, while processes sit idle.
+
+``simulate`` replays a workload against a modelled pool so a policy can be
+tried without a broker, see ``manage.py autoscale_workers --simulate``.
+"""
+
+import logging
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+def queue_length(app, queues):
+    """Messages waiting in ``queues`` on the broker of ``app``."""
+    total = 0
+    with app.connection_for_read() as connection:
+        channel = connection.default_channel
+        for queue in queues:
+            try:
+                total += channel.queue_declare(
+                    queue=queue, passive=True
+                ).message_count
+            except connection.channel_errors:
+                # Redis drops the list of an empty queue.
+                channel = connection.channel()
+    return total
+
+
+@dataclass(frozen=True)
+class Sample:
+    queue_length: int
+    oldest_pending_age: float
+    throughput: float
+    busy: int
+    pool_size: int
+
+
+@dataclass(frozen=True)
+class AutoscalePolicy:
+    min_size: int
+    max_size: int
+    target_latency: float
+    step: int = 1
+
+    def desired_size(self, sample):
+        """Pool size that drains the backlog within ``target_latency``.
+
+        With a backlog, the pool needs enough extra processes to complete
+        the waiting messages within the target latency on top of its
+        current load, and at least one more step once pending tasks are
+        older than the target. Without a backlog, it sheds one step while
+        that many processes are idle.
+        """
+        size = sample.pool_size
+        if sample.queue_length:
+            if sample.throughput > 0 and size:
+                per_process = sample.throughput / size
+                desired = size + math.ceil(
+                    sample.queue_length / (per_process * self.target_latency)
+                )
+            else:
+                desired = size + self.step
+            if sample.oldest_pending_age > self.target_latency:
+                desired = max(desired, size + self.step)
+        elif sample.busy <= size - self.step:
+            desired = size - self.step
+        else:
+            desired = size
+        return max(self.min_size, min(self.max_size, desired))
+
+
+class Autoscaler:
+    """Applies a policy to a pool, growing at once and shrinking slowly."""
+
+    def __init__(self, policy, pool, cooldown, clock=time.monotonic):
+        self.policy = policy
+        self.pool = pool
+        self.cooldown = cooldown
+        self.clock = clock
+        self._last_resize = None
+
+    def tick(self):
+        """Sample the pool once and resize it; returns the new size."""
+        sample = self.pool.sample()
+        if sample is None:
+            return None
+        desired = self.policy.desired_size(sample)
+        now = self.clock()
+        if desired < sample.pool_size and (
+            self._last_resize is not None
+            and now - self._last_resize < self.cooldown
+        ):
+            desired = sample.pool_size
+        if desired != sample.pool_size:
+            logger.info(
+                "Resizing pool from %s to %s processes (%s)",
+                sample.pool_size,
+                desired,
+                sample,
+            )
+            self.pool.resize(sample.pool_size, desired)
+            self._last_resize = now
+        return desired
+
+
+class CeleryPool:
+    """A running worker, sampled and resized through remote control."""
+
+    def __init__(self, app, worker, queues, clock=time.monotonic):
+        self.app = app
+        self.worker = worker
+        self.queues = list(queues)
+        self.priorities = [
+            priority
+            for priority, queue in settings.TASK_PRIORITY_QUEUES.items()
+            if queue in self.queues
+        ]
+        self.clock = clock
+        self._completed = None
+
+    def queue_length(self):
+        return queue_length(self.app, self.queues)
+
+    def oldest_pending_age(self):
+        created_at = (
+            Task.objects.filter(
+                status=Task.PENDING,
+                schedule__isnull=True,
+                priority__in=self.priorities,
+            )
+            .order_by("created_at")
+            .values_list("created_at", flat=True)
+            .first()
+        )
+        if created_at is None:
+            return 0.0
+        return (timezone.now() - created_at).total_seconds()
+
+    def _throughput(self, completed):
+        now = self.clock()
+        previous, self._completed = self._completed, (now, completed)
+        if previous is None or completed < previous[1]:
+            # First sample, or the worker restarted.
+            return 0.0
+        elapsed = now - previous[0]
+        return (completed - previous[1]) / elapsed if elapsed else 0.0
+
+    def sample(self):
+        inspect = self.app.control.inspect([self.worker])
+        stats = (inspect.stats() or {}).get(self.worker)
+        active = (inspect.active() or {}).get(self.worker)
+        if stats is None or active is None:
+            logger.warning("Worker %s did not reply", self.worker)
+            return None
+        return Sample(
+            queue_length=self.queue_length(),
+            oldest_pending_age=self.oldest_pending_age(),
+            throughput=self._throughput(sum(stats["total"].values())),
+            busy=len(active),
+            pool_size=len(stats["pool"]["processes"]),
+        )
+
+    def resize(self, current, target):
+        destination = [self.worker]
+        if target > current:
+            self.app.control.pool_grow(
+                target - current, destination=destination
+            )
+        else:
+            self.app.control.pool_shrink(
+                current - target, destination=destination
+            )
+
+
+def bursty_workload(
+    duration, base_rate, burst_rate, burst_every, burst_length
+):
+    """Messages arriving per second: a steady rate with periodic bursts."""
+    return [
+        burst_rate if second % burst_every < burst_length else base_rate
+        for second in range(duration)
+    ]
+
+
+class SimulatedPool:
+    """A pool of processes each completing one message per ``service_time``.
+
+    Time advances one second per ``step``; the autoscaler reads the
+    simulated clock, so a run takes no wall time.
+    """
+
+    def __init__(self, size, service_time):
+        self.size = size
+        self.service_time = service_time
+        self.now = 0
+        self.waiting = deque()
+        self.latencies = []
+        self.completed = 0
+        self._capacity = 0.0
+        self._window = deque(maxlen=10)
+        self._busy = 0
+
+    def clock(self):
+        return self.now
+
+    def step(self, arrivals):
+        if arrivals:
+            self.waiting.append([self.now, arrivals])
+        self._capacity += self.size / self.service_time
+        served = 0
+        while self.waiting and self._capacity >= 1:
+            arrived_at, count = self.waiting[0]
+            take = min(count, int(self._capacity))
+            self.latencies.append((self.now - arrived_at, take))
+            self._capacity -= take
+            served += take
+            if take == count:
+                self.waiting.popleft()
+            else:
+                self.waiting[0][1] -= take
+        if not self.waiting:
+            # Idle processes do not bank capacity for later.
+            self._capacity = min(self._capacity, 1.0)
+        self.completed += served
+        self._window.append(served)
+        self._busy = min(self.size, math.ceil(served * self.service_time))
+        self.now += 1
+
+    def sample(self):
+        waiting = sum(count for _, count in self.waiting)
+        return Sample(
+            queue_length=waiting,
+            oldest_pending_age=(
+                self.now - self.waiting[0][0] if self.waiting else 0.0
+            ),
+            throughput=sum(self._window) / max(len(self._window), 1),
+            busy=self._busy,
+            pool_size=self.size,
+        )
+
+    def resize(self, current, target):
+        self.size = target
+
+
+def _percentile(latencies, fraction):
+    total = sum(count for _, count in latencies)
+    seen = 0
+    for latency, count in sorted(latencies):
+        seen += count
+        if seen >= total * fraction:
+            return latency
+    return 0
+
+
+def simulate(policy, workload, service_time, interval, cooldown):
+    """Replay ``workload`` through an autoscaled ``SimulatedPool``.
+
+    Returns the latency percentiles in seconds, the largest backlog and the
+    process-seconds spent, the cost of the run.
+    """
+    pool = SimulatedPool(policy.min_size, service_time)
+    autoscaler = Autoscaler(policy, pool, cooldown, clock=pool.clock)
+    process_seconds = 0
+    max_queue = 0
+    max_size = pool.size
+    for arrivals in workload:
+        pool.step(arrivals)
+        process_seconds += pool.size
+        max_queue = max(max_queue, pool.sample().queue_length)
+        if pool.now % interval == 0:
+            autoscaler.tick()
+            max_size = max(max_size, pool.size)
+    return {
+        "completed": pool.completed,
+        "backlog": pool.sample().queue_length,
+        "p50_latency": _percentile(pool.latencies, 0.5),
+        "p95_latency": _percentile(pool.latencies, 0.95),
+        "max_latency": _percentile(pool.latencies, 1.0),
+        "max_queue": max_queue,
+        "max_size": max_size,
+        "process_seconds": process_seconds,
+    }
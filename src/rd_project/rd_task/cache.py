@@ -0,0 +1,25 @@
+"""Keys and invalidation of the task detail payloads cached by the API.
+
+The payloads are built and read by ``rd_project.api.cache``; the worker
+only drops them once it has updated a task. A dropped entry is replaced by
+a short-lived empty marker rather than deleted: the API only caches with
+``cache.add``, so a request that read the row before the update cannot
+store its stale payload until the marker expires.
+"""
+
+from django.core.cache import cache
+
+# Seconds an invalidated payload cannot be cached again, long enough for a
+# request that read the row before the update to finish.
+INVALIDATION_TIMEOUT = 5
+
+
+def task_detail_key(task_id):
+    return f"task-detail:{task_id}"
+
+
+def invalidate_task_detail(*task_ids):
+    cache.set_many(
+        {task_detail_key(task_id): None for task_id in task_ids},
+        INVALIDATION_TIMEOUT,
+    )
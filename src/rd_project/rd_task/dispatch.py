@@ -0,0 +1,198 @@
+import logging
+from collections import defaultdict
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from celery import group
+from django.conf import settings
+from django.db import transaction
+
+from .cache import invalidate_task_detail
+from .models import Task
+from .models import TaskOutbox
+from .notifications import publish_task_done
+from .notifications import publish_tasks_done
+from .result_store import get_result
+from .result_store import get_results
+from .tasks import add
+from .tasks import add_many
+
+logger = logging.getLogger(__name__)
+
+DISPATCH_BATCH = "batch"
+DISPATCH_CHUNKS = "chunks"
+DISPATCH_MODES = (DISPATCH_BATCH, DISPATCH_CHUNKS)
+
+BACKEND_DIRECT = "direct"
+BACKEND_OUTBOX = "outbox"
+
+
+def task_args(task):
+    return (str(task.id), task.a, task.b, task.operation)
+
+
+def _complete_from_store(task, result):
+    # Completed like the worker would, including for the readers of the
+    # cached detail and the waiting clients.
+    task.mark_as_successfull(result=result)
+    invalidate_task_detail(task.id)
+    publish_task_done(task)
+
+
+def dispatch_task(task):
+    """Publish a task, or complete it right away from the result store."""
+    result = get_result(task.operation, task.a, task.b)
+    if result is not None:
+        _complete_from_store(task, result)
+        return None
+    return add.apply_async(task_args(task), queue=task.queue)
+
+
+async def adispatch_task(task):
+    """Async counterpart of ``dispatch_task``.
+
+    Celery has no asyncio publisher, so the publish runs in the thread pool
+    (not the thread the ORM is bound to) and the event loop stays free
+    while the broker round trip is in flight.
+    """
+    result = await sync_to_async(get_result)(task.operation, task.a, task.b)
+    if result is not None:
+        await sync_to_async(_complete_from_store)(task, result)
+        return None
+    return await sync_to_async(add.apply_async, thread_sensitive=False)(
+        task_args(task), queue=task.queue
+    )
+
+
+def dispatch_task_ids(task_ids, chunk_size=None, queue=None, expires=None):
+    """Publish one ``add_many`` message per chunk of task ids.
+
+    Workers drop the messages still queued ``expires`` seconds later.
+    """
+    if not task_ids:
+        return None
+    chunk_size = chunk_size or settings.TASK_DISPATCH_CHUNK_SIZE
+    return group(
+        add_many.s(task_ids[i : i + chunk_size])
+        for i in range(0, len(task_ids), chunk_size)
+    ).apply_async(
+        queue=queue,
+        expires=expires,
+        compression=settings.TASK_BATCH_COMPRESSION,
+    )
+
+
+def complete_from_result_store(tasks):
+    """Complete the tasks with a stored result and return the others."""
+    by_operation = defaultdict(list)
+    for task in tasks:
+        by_operation[task.operation].append(task)
+    done = []
+    results = []
+    for operation, batch in by_operation.items():
+        stored = get_results(operation, [(task.a, task.b) for task in batch])
+        for task in batch:
+            if (task.a, task.b) in stored:
+                done.append(task)
+                results.append(stored[task.a, task.b])
+    if not done:
+        return tasks
+    Task.bulk_mark_as_successfull(done, results)
+    done_ids = {task.id for task in done}
+    invalidate_task_detail(*done_ids)
+    publish_tasks_done(done)
+    return [task for task in tasks if task.id not in done_ids]
+
+
+def dispatch_tasks(tasks, mode=None, chunk_size=None):
+    """Publish many tasks as chunked groups instead of a message per row.
+
+    ``batch`` sends one ``add_many`` message per chunk, which the worker
+    processes with a constant number of queries. ``chunks`` sends
+    ``add.chunks`` messages that still run ``add`` once per task. Tasks are
+    grouped by priority and each group goes to its own queue; one group
+    result is returned per queue.
+    """
+    mode = mode or settings.TASK_DISPATCH_MODE
+    if mode not in DISPATCH_MODES:
+        raise ValueError(f"Unknown dispatch mode: {mode}")
+    chunk_size = chunk_size or settings.TASK_DISPATCH_CHUNK_SIZE
+    by_queue = defaultdict(list)
+    for task in complete_from_result_store(tasks):
+        by_queue[task.queue].append(task)
+    results = []
+    for queue, queued in by_queue.items():
+        if mode == DISPATCH_BATCH:
+            result = dispatch_task_ids(
+                [str(task.id) for task in queued], chunk_size, queue=queue
+            )
+        else:
+            result = (
+                add.chunks([task_args(task) for task in queued], chunk_size)
+                .group()
+                .apply_async(
+                    queue=queue, compression=settings.TASK_BATCH_COMPRESSION
+                )
+            )
+        results.append(result)
+    return results
+
+
+def enqueue_task(task):
+    """Hand a task saved in the current transaction over for dispatch."""
+    enqueue_tasks([task])
+
+
+def enqueue_tasks(tasks, mode=None):
+    """Hand tasks saved in the current transaction over for dispatch.
+
+    The ``outbox`` backend writes one outbox row per task in the same
+    transaction, so a task is never committed without its dispatch and
+    ``relay_outbox`` publishes it afterwards. The ``direct`` backend
+    publishes once the transaction commits, so workers never look up a task
+    that is not visible yet, but a failed publish leaves it pending.
+    """
+    backend = settings.TASK_DISPATCH_BACKEND
+    if backend == BACKEND_OUTBOX:
+        TaskOutbox.objects.bulk_create(
+            (TaskOutbox(task=task, mode=mode or "") for task in tasks),
+            batch_size=settings.TASK_BULK_BATCH_SIZE,
+        )
+    elif backend == BACKEND_DIRECT:
+        if len(tasks) == 1 and mode is None:
+            transaction.on_commit(partial(dispatch_task, tasks[0]))
+        else:
+            transaction.on_commit(partial(dispatch_tasks, tasks, mode=mode))
+    else:
+        raise ValueError(f"Unknown dispatch backend: {backend}")
+
+
+def relay_outbox(batch_size=None):
+    """Publish one batch of outbox rows and return how many were relayed.
+
+    The rows are locked with ``SKIP LOCKED`` so several relays can run side
+    by side, and deleted in the transaction that published them: a failed
+    publish rolls back and the batch is retried. A crash between the
+    publish and the commit sends the batch again, which the workers ignore
+    for tasks that already finished.
+    """
+    batch_size = batch_size or settings.TASK_OUTBOX_BATCH_SIZE
+    with transaction.atomic():
+        entries = list(
+            TaskOutbox.objects.select_for_update(
+                skip_locked=True, of=("self",)
+            )
+            .select_related("task")
+            .order_by("id")[:batch_size]
+        )
+        if not entries:
+            return 0
+        by_mode = defaultdict(list)
+        for entry in entries:
+            by_mode[entry.mode].append(entry.task)
+        for mode, tasks in by_mode.items():
+            dispatch_tasks(tasks, mode=mode or None)
+        TaskOutbox.objects.filter(
+            id__in=[entry.id for entry in entries]
+        ).delete()
+    return len(entries)
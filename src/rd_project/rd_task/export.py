@@ -0,0 +1,82 @@
+import csv
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import OuterRef
+from django.db.models import Subquery
+
+from .models import Task
+from .models import TaskResult
+
+EXPORT_FIELDS = (
+    "id",
+    "operation",
+    "a",
+    "b",
+    "status",
+    "failed_message",
+    "celery_task_id",
+    "created_at",
+    "updated_at",
+    "result",
+    "result_created_at",
+)
+
+
+class Echo:
+    """File-like object that returns what is written instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(status=None, created_after=None, created_before=None):
+    """Iterate over the tasks and their latest result as tuples.
+
+    Rows are fetched in chunks through a server-side cursor (where the
+    database supports it), so memory does not grow with the table size.
+    """
+    latest_result = TaskResult.objects.filter(task=OuterRef("pk")).order_by(
+        "-created_at"
+    )
+    queryset = Task.objects.all()
+    if status:
+        queryset = queryset.filter(status=status)
+    if created_after:
+        queryset = queryset.filter(created_at__gte=created_after)
+    if created_before:
+        queryset = queryset.filter(created_at__lt=created_before)
+    return (
+        queryset.annotate(
+            result=Subquery(latest_result.values("result")[:1]),
+            result_created_at=Subquery(latest_result.values("created_at")[:1]),
+        )
+        .order_by("created_at", "id")
+        .values_list(*EXPORT_FIELDS)
+        .iterator(chunk_size=settings.TASK_EXPORT_CHUNK_SIZE)
+    )
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield (
+            json.dumps(
+                dict(zip(EXPORT_FIELDS, row, strict=True)),
+                cls=DjangoJSONEncoder,
+            )
+            + "\n"
+        )
+
+
+def iter_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", iter_ndjson),
+    "csv": ("text/csv", iter_csv),
+}
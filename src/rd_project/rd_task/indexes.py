@@ -0,0 +1,36 @@
+"""Index migrations that do not block writes on PostgreSQL.
+
+A plain ``AddIndex`` holds a lock that blocks writes to the table for the
+whole index build. On PostgreSQL ``AddIndexConcurrently`` builds it with
+``CREATE INDEX CONCURRENTLY`` instead; other databases get a plain
+``AddIndex``. A migration using it must set ``atomic = False``.
+"""
+
+from django.contrib.postgres import operations
+from django.db.migrations import AddIndex
+
+
+class AddIndexConcurrently(operations.AddIndexConcurrently):
+    def database_forwards(
+        self, app_label, schema_editor, from_state, to_state
+    ):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        else:
+            AddIndex.database_forwards(
+                self, app_label, schema_editor, from_state, to_state
+            )
+
+    def database_backwards(
+        self, app_label, schema_editor, from_state, to_state
+    ):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        else:
+            AddIndex.database_backwards(
+                self, app_label, schema_editor, from_state, to_state
+            )
@@ -0,0 +1,132 @@
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from rd_project.celery import app
+from rd_project.rd_task.autoscale import AutoscalePolicy
+from rd_project.rd_task.autoscale import Autoscaler
+from rd_project.rd_task.autoscale import CeleryPool
+from rd_project.rd_task.autoscale import bursty_workload
+from rd_project.rd_task.autoscale import simulate
+
+
+class Command(BaseCommand):
+    help = "Resize a Celery worker pool to its queue depth and latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--worker", help="Node name of the worker, e.g. celery@host."
+        )
+        parser.add_argument(
+            "--queue",
+            action="append",
+            dest="queues",
+            help="Queue consumed by the worker, may be repeated.",
+        )
+        parser.add_argument(
+            "--min", type=int, default=settings.TASK_AUTOSCALE_MIN
+        )
+        parser.add_argument(
+            "--max", type=int, default=settings.TASK_AUTOSCALE_MAX
+        )
+        parser.add_argument(
+            "--target-latency",
+            type=float,
+            default=settings.TASK_AUTOSCALE_TARGET_LATENCY,
+            help="Seconds a message may wait before the pool grows.",
+        )
+        parser.add_argument(
+            "--step", type=int, default=settings.TASK_AUTOSCALE_STEP
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.TASK_AUTOSCALE_INTERVAL,
+            help="Seconds between two samples.",
+        )
+        parser.add_argument(
+            "--cooldown",
+            type=float,
+            default=settings.TASK_AUTOSCALE_COOLDOWN,
+            help="Seconds between a resize and the next shrink.",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Sample and resize once."
+        )
+        parser.add_argument(
+            "--simulate",
+            action="store_true",
+            help=(
+                "Replay a bursty workload against a modelled pool and "
+                "compare the policy with fixed pools of --min and --max."
+            ),
+        )
+        parser.add_argument("--duration", type=int, default=3600)
+        parser.add_argument("--service-time", type=float, default=0.5)
+        parser.add_argument("--base-rate", type=int, default=2)
+        parser.add_argument("--burst-rate", type=int, default=30)
+        parser.add_argument("--burst-every", type=int, default=600)
+        parser.add_argument("--burst-length", type=int, default=60)
+
+    def handle(self, *args, **options):
+        policy = AutoscalePolicy(
+            min_size=options["min"],
+            max_size=options["max"],
+            target_latency=options["target_latency"],
+            step=options["step"],
+        )
+        if options["simulate"]:
+            self.simulate(policy, options)
+            return
+        if not options["worker"]:
+            raise CommandError("--worker is required.")
+        queues = options["queues"] or [
+            settings.TASK_PRIORITY_QUEUES["high"],
+            settings.TASK_PRIORITY_QUEUES["normal"],
+        ]
+        autoscaler = Autoscaler(
+            policy,
+            CeleryPool(app, options["worker"], queues),
+            options["cooldown"],
+        )
+        while True:
+            size = autoscaler.tick()
+            if options["once"]:
+                self.stdout.write(f"Pool size: {size}")
+                break
+            time.sleep(options["interval"])
+
+    def simulate(self, policy, options):
+        # Every simulated resize would be logged otherwise.
+        logging.getLogger("rd_project.rd_task.autoscale").setLevel(
+            logging.WARNING
+        )
+        workload = bursty_workload(
+            options["duration"],
+            options["base_rate"],
+            options["burst_rate"],
+            options["burst_every"],
+            options["burst_length"],
+        )
+        runs = {
+            "autoscaled": policy,
+            f"fixed-{policy.min_size}": AutoscalePolicy(
+                policy.min_size, policy.min_size, policy.target_latency
+            ),
+            f"fixed-{policy.max_size}": AutoscalePolicy(
+                policy.max_size, policy.max_size, policy.target_latency
+            ),
+        }
+        for name, run_policy in runs.items():
+            report = simulate(
+                run_policy,
+                workload,
+                options["service_time"],
+                max(int(options["interval"]), 1),
+                options["cooldown"],
+            )
+            self.stdout.write(json.dumps({"pool": name, **report}))
@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from rd_project.rd_task.partitions import ensure_partitions
+from rd_project.rd_task.retention import compact_results
+
+
+class Command(BaseCommand):
+    help = "Fold old task results into per-task rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.TASK_RESULT_RETENTION_DAYS,
+            help="Compact the results older than this many days.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.TASK_RESULT_COMPACTION_BATCH_SIZE,
+        )
+
+    def handle(self, *args, **options):
+        ensure_partitions()
+        if not options["days"]:
+            self.stdout.write("Retention is disabled.")
+            return
+        compacted = compact_results(
+            cutoff=timezone.now() - timedelta(days=options["days"]),
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(f"Compacted {compacted} results.")
@@ -0,0 +1,47 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.utils.dateparse import parse_datetime
+
+from rd_project.rd_task.export import EXPORT_FORMATS
+from rd_project.rd_task.export import export_rows
+from rd_project.rd_task.models import Task
+
+
+def _datetime(value):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise CommandError(f"Invalid datetime: {value}")
+    return parsed
+
+
+class Command(BaseCommand):
+    help = "Stream every task with its latest result as NDJSON or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format", choices=sorted(EXPORT_FORMATS), default="ndjson"
+        )
+        parser.add_argument(
+            "--status", choices=[choice for choice, _ in Task.STATUS_CHOICES]
+        )
+        parser.add_argument("--created-after", type=_datetime)
+        parser.add_argument("--created-before", type=_datetime)
+        parser.add_argument(
+            "--output", help="File to write to. Defaults to stdout."
+        )
+
+    def handle(self, *args, **options):
+        _, writer = EXPORT_FORMATS[options["format"]]
+        rows = export_rows(
+            status=options["status"],
+            created_after=options["created_after"],
+            created_before=options["created_before"],
+        )
+        if options["output"]:
+            with Path(options["output"]).open("w", newline="") as output:
+                output.writelines(writer(rows))
+        else:
+            for chunk in writer(rows):
+                self.stdout.write(chunk, ending="")
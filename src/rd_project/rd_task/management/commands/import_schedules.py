@@ -0,0 +1,78 @@
+import csv
+import itertools
+import json
+import sys
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import transaction
+
+from rd_project.api.serializers import BulkTaskScheduleSerializer
+
+
+def _read_rows(stream, input_format):
+    if input_format == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                raise CommandError(f"Invalid JSON line: {error}") from error
+
+
+class Command(BaseCommand):
+    help = (
+        "Create task schedules in bulk from NDJSON or CSV rows with the "
+        "fields of the schedule API (scheduled_at, interval, a, b, "
+        "operation, priority)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="File to read, - for stdin.")
+        parser.add_argument(
+            "--format", choices=["ndjson", "csv"], default="ndjson"
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=settings.TASK_BULK_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        if options["input"] == "-":
+            count, seconds = self.import_rows(sys.stdin, options)
+        else:
+            with Path(options["input"]).open(newline="") as stream:
+                count, seconds = self.import_rows(stream, options)
+        rate = count / seconds if seconds else 0
+        self.stdout.write(
+            f"Imported {count} schedules in {seconds:.2f}s "
+            f"({rate:.0f} schedules/s)."
+        )
+
+    def import_rows(self, stream, options):
+        """Import every row in one transaction, validated batch by batch."""
+        rows = _read_rows(stream, options["format"])
+        count = 0
+        start = time.perf_counter()
+        with transaction.atomic():
+            while batch := list(itertools.islice(rows, options["batch_size"])):
+                serializer = BulkTaskScheduleSerializer(data=batch, many=True)
+                if not serializer.is_valid():
+                    errors = serializer.errors
+                    # Newer DRF versions key the errors by row index.
+                    if not isinstance(errors, dict):
+                        errors = dict(enumerate(errors))
+                    row, errors = next(
+                        (row, errors)
+                        for row, errors in errors.items()
+                        if errors
+                    )
+                    raise CommandError(
+                        f"Row {count + row + 1} is invalid: {errors}"
+                    )
+                count += len(serializer.save())
+        return count, time.perf_counter() - start
@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from rd_project.rd_task.dispatch import relay_outbox
+
+
+class Command(BaseCommand):
+    help = "Publish the task outbox to the broker in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=settings.TASK_OUTBOX_BATCH_SIZE
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.TASK_OUTBOX_POLL_INTERVAL,
+            help="Seconds to sleep when the outbox is drained.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the outbox and exit instead of polling.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        total = 0
+        while True:
+            relayed = relay_outbox(batch_size)
+            total += relayed
+            if relayed < batch_size:
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+        self.stdout.write(f"Relayed {total} tasks.")
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:50
+
+from django.db import migrations, models
+
+from rd_project.rd_task.indexes import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ('rd_task', '0001_initial'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='task',
+            index=models.Index(fields=['-created_at', '-id'], name='task_created_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='taskschedule',
+            index=models.Index(fields=['-created_at', '-id'], name='taskschedule_created_id_idx'),
+        ),
+    ]
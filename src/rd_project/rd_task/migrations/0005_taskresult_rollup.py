@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:08
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rd_task', '0004_task_priority'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskResultRollup',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+                ('count', models.PositiveBigIntegerField(default=0)),
+                ('total', models.BigIntegerField(default=0)),
+                ('minimum', models.BigIntegerField(blank=True, null=True)),
+                ('maximum', models.BigIntegerField(blank=True, null=True)),
+                ('first_result_at', models.DateTimeField(blank=True, null=True)),
+                ('last_result_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='taskresult',
+            index=models.Index(fields=['task', '-created_at'], name='taskresult_task_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='taskresultrollup',
+            name='task',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rollup', to='rd_task.task'),
+        ),
+    ]
@@ -0,0 +1,114 @@
+"""Partition the ``TaskResult`` table by month of ``created_at``.
+
+PostgreSQL only: on other databases the migration does nothing. A
+partitioned table's primary key has to contain the partition key, so it
+becomes ``(id, created_at)``; ``id`` stays a random UUID.
+
+The table is renamed and copied into the new one in a single transaction,
+which holds an exclusive lock on it until the copy and the index rebuilds
+are done: workers cannot store results nor the API read them meanwhile.
+Stop the workers and expect API downtime proportional to the table size;
+compacting old results first (``compact_results``) shortens it. The README
+describes a batched copy for tables too large for that, after which the
+migration is applied with ``--fake``.
+"""
+
+import re
+
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+from rd_project.rd_task.partitions import DEFAULT_PARTITION
+from rd_project.rd_task.partitions import TABLE
+from rd_project.rd_task.partitions import add_months
+from rd_project.rd_task.partitions import create_partitions
+from rd_project.rd_task.partitions import month_start
+
+PRIMARY_KEY = f"{TABLE}_pkey"
+
+
+def _definitions(cursor, table):
+    """Index and foreign key definitions of ``table``, but its primary key."""
+    cursor.execute(
+        "SELECT pg_get_indexdef(indexrelid) FROM pg_index "
+        "WHERE indrelid = to_regclass(%s) AND NOT indisprimary",
+        [table],
+    )
+    indexes = [definition for (definition,) in cursor.fetchall()]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+        [table],
+    )
+    return indexes, cursor.fetchall()
+
+
+def _rebuild(cursor, partitioned):
+    source = f"{TABLE}_old"
+    cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{source}"')
+    indexes, foreign_keys = _definitions(cursor, source)
+    cursor.execute(
+        f'CREATE TABLE "{TABLE}" (LIKE "{source}" INCLUDING DEFAULTS)'
+        + (" PARTITION BY RANGE (created_at)" if partitioned else "")
+    )
+    if partitioned:
+        cursor.execute(f'SELECT min(created_at), max(created_at) FROM "{source}"')  # noqa: S608
+        first, last = cursor.fetchone()
+        now = timezone.now()
+        create_partitions(
+            cursor,
+            min(first or now, now),
+            add_months(
+                month_start(max(last or now, now)),
+                settings.TASK_RESULT_PARTITIONS_AHEAD + 1,
+            ),
+        )
+        cursor.execute(
+            f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{TABLE}" DEFAULT'
+        )
+    cursor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{source}"')  # noqa: S608
+    # Dropping the old table (and its partitions) frees the index and
+    # constraint names for the new one.
+    cursor.execute(f'DROP TABLE "{source}"')
+    primary_key = "id, created_at" if partitioned else "id"
+    cursor.execute(
+        f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{PRIMARY_KEY}" '
+        f"PRIMARY KEY ({primary_key})"
+    )
+    for definition in indexes:
+        cursor.execute(
+            re.sub(
+                rf' ON (ONLY )?(\S+\.)?"?{source}"? ',
+                f' ON "{TABLE}" ',
+                definition,
+                count=1,
+            )
+        )
+    for name, definition in foreign_keys:
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{name}" {definition}')
+
+
+def partition(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        _rebuild(cursor, partitioned=True)
+
+
+def unpartition(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        _rebuild(cursor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rd_task", "0005_taskresult_rollup"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
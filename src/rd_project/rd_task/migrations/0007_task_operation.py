@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:15
+
+import rd_project.rd_task.operations
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rd_task', '0006_partition_taskresult'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='operation',
+            field=models.CharField(choices=rd_project.rd_task.operations.operation_choices, default='add', help_text='Name of the operation applied to a and b.', max_length=32),
+        ),
+        migrations.AlterField(
+            model_name='taskresult',
+            name='result',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
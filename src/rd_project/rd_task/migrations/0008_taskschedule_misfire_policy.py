@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rd_task', '0007_task_operation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskschedule',
+            name='misfire_policy',
+            field=models.CharField(choices=[('coalesce', 'Run missed runs once'), ('skip', 'Skip missed runs'), ('catch_up', 'Catch up on missed runs')], default='coalesce', help_text='What to do with the runs missed during an outage.', max_length=10),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:37
+
+from django.db import migrations, models
+
+from rd_project.rd_task.indexes import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ('rd_task', '0009_task_status_idx'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='task',
+            index=models.Index(condition=models.Q(('schedule__isnull', True), ('status', 'PENDING')), fields=['created_at', 'id'], name='task_pending_created_idx'),
+        ),
+    ]
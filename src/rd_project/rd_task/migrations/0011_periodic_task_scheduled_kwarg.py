@@ -0,0 +1,41 @@
+"""Pass ``scheduled`` to the ``add`` runs of existing beat entries.
+
+The worker counts a scheduled run as a rerun in the status counters instead
+of a pending task that finished.
+"""
+
+import json
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def set_scheduled(apps, schema_editor, scheduled=True):
+    TaskSchedule = apps.get_model("rd_task", "TaskSchedule")
+    PeriodicTask = apps.get_model("django_celery_beat", "PeriodicTask")
+    PeriodicTasks = apps.get_model("django_celery_beat", "PeriodicTasks")
+    updated = PeriodicTask.objects.filter(
+        id__in=TaskSchedule.objects.filter(
+            periodic_task__isnull=False
+        ).values("periodic_task")
+    ).update(kwargs=json.dumps({"scheduled": True}) if scheduled else "{}")
+    if updated:
+        # Tell beat to reload its entries, as PeriodicTasks.update_changed.
+        PeriodicTasks.objects.update_or_create(
+            ident=1, defaults={"last_update": timezone.now()}
+        )
+
+
+def unset_scheduled(apps, schema_editor):
+    set_scheduled(apps, schema_editor, scheduled=False)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_celery_beat", "0019_alter_periodictasks_options"),
+        ("rd_task", "0010_task_pending_created_idx"),
+    ]
+
+    operations = [
+        migrations.RunPython(set_scheduled, unset_scheduled),
+    ]
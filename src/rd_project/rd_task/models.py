@@ -1,14 +1,29 @@
 import json
 import logging
 import uuid
+from collections import Counter
 
+from django.conf import settings
 from django.db import models
+from django.db import transaction
+from django.utils import timezone
 from django_celery_beat.models import IntervalSchedule
 from django_celery_beat.models import PeriodicTask
+from django_celery_beat.models import PeriodicTasks
+
+from .operations import ADD
+from .operations import operation_choices
+from .stats import record_created
+from .stats import record_finished
 
 logger = logging.getLogger(__name__)
 
 
+def _combine(function, *values):
+    values = [value for value in values if value is not None]
+    return function(values) if values else None
+
+
 class BaseModel(models.Model):
     id = models.UUIDField(
         primary_key=True,
@@ -24,6 +39,14 @@ class BaseModel(models.Model):
 
 class TaskSchedule(BaseModel, models.Model):
     TASK_ADD = "rd_project.rd_task.tasks.add"
+    COALESCE = "coalesce"
+    SKIP = "skip"
+    CATCH_UP = "catch_up"
+    MISFIRE_POLICY_CHOICES = [
+        (COALESCE, "Run missed runs once"),
+        (SKIP, "Skip missed runs"),
+        (CATCH_UP, "Catch up on missed runs"),
+    ]
     # task = models.ForeignKey(
     #     Task, on_delete=models.CASCADE, related_name="schedule"
     # )
@@ -43,38 +66,222 @@ class TaskSchedule(BaseModel, models.Model):
     interval = models.IntegerField(
         help_text=("The interval in seconds for periodic tasks")
     )
+    misfire_policy = models.CharField(
+        max_length=10,
+        choices=MISFIRE_POLICY_CHOICES,
+        default=COALESCE,
+        help_text="What to do with the runs missed during an outage.",
+    )
 
-    def schedule_celery_beat_task(self):
-        interval_schedule, _ = IntervalSchedule.objects.get_or_create(
-            every=self.interval, period=IntervalSchedule.SECONDS
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["-created_at", "-id"],
+                name="taskschedule_created_id_idx",
+            ),
+        ]
+
+    def task_args(self):
+        return [
+            str(self.task.id),
+            self.task.a,
+            self.task.b,
+            self.task.operation,
+        ]
+
+    @staticmethod
+    def task_kwargs():
+        # Tells the worker the run is scheduled, for the status counters.
+        return json.dumps({"scheduled": True})
+
+    @classmethod
+    def run_expires(cls, misfire_policy, interval):
+        """Seconds after which a queued run is stale and dropped by workers.
+
+        Runs later than ``TASK_SCHEDULER_MISFIRE_GRACE`` seconds, or one
+        interval if longer, are misfired. Catching up keeps the last
+        ``TASK_SCHEDULER_CATCH_UP_MAX`` runs instead.
+        """
+        expires = max(interval, settings.TASK_SCHEDULER_MISFIRE_GRACE)
+        if misfire_policy == cls.CATCH_UP:
+            expires = max(
+                expires, interval * settings.TASK_SCHEDULER_CATCH_UP_MAX
+            )
+        return expires
+
+    @staticmethod
+    def interval_schedules(intervals):
+        """Map every interval, in seconds, to an ``IntervalSchedule``.
+
+        Interval rows are shared between schedules; the missing ones are
+        created with a single query.
+        """
+        intervals = set(intervals)
+        found = {}
+        for interval_schedule in IntervalSchedule.objects.filter(
+            every__in=intervals, period=IntervalSchedule.SECONDS
+        ).order_by("id"):
+            found.setdefault(interval_schedule.every, interval_schedule)
+        found.update(
+            (interval_schedule.every, interval_schedule)
+            for interval_schedule in IntervalSchedule.objects.bulk_create(
+                IntervalSchedule(every=every, period=IntervalSchedule.SECONDS)
+                for every in intervals - found.keys()
+            )
         )
+        return found
 
-        periodic_task = PeriodicTask.objects.create(
-            interval=interval_schedule,
+    def build_periodic_task(self):
+        return PeriodicTask(
+            interval=self.interval_schedule,
             name=f"task-{self.task.id}-scheduled",
             task=self.TASK_ADD,
-            args=json.dumps([str(self.task.id), self.task.a, self.task.b]),
+            args=json.dumps(self.task_args()),
+            queue=self.task.queue,
+            kwargs=self.task_kwargs(),
             start_time=self.scheduled_at,
+            expire_seconds=self.run_expires(
+                self.misfire_policy, self.interval
+            ),
             enabled=True,
         )
-        self.interval_schedule = interval_schedule
+
+    def schedule_celery_beat_task(self):
+        if settings.TASK_SCHEDULER != "beat":
+            # TaskScheduleScheduler reads the schedule itself.
+            return None
+        self.interval_schedule = self.interval_schedules([self.interval])[
+            self.interval
+        ]
+        periodic_task = self.build_periodic_task()
+        periodic_task.save()
         self.periodic_task = periodic_task
-        self.save()
+        self.save(
+            update_fields=["interval_schedule", "periodic_task", "updated_at"]
+        )
         return periodic_task
 
+    @classmethod
+    def bulk_create_schedules(cls, items, batch_size=None):
+        """Create schedules with their tasks and beat entries in bulk.
+
+        ``items`` are dicts with the ``scheduled_at``, ``interval`` and
+        ``misfire_policy`` of the schedule and the ``operation``, ``a``,
+        ``b`` and ``priority`` of its task. Rows are inserted with
+        ``bulk_create``, interval rows are looked up once for the whole
+        batch and beat is told to reload once.
+        """
+        batch_size = batch_size or settings.TASK_BULK_BATCH_SIZE
+        schedules = []
+        tasks = []
+        for item in items:
+            schedule = cls(
+                scheduled_at=item["scheduled_at"],
+                interval=item["interval"],
+                misfire_policy=item.get("misfire_policy", cls.COALESCE),
+            )
+            schedules.append(schedule)
+            tasks.append(
+                Task(
+                    schedule=schedule,
+                    operation=item.get("operation", ADD),
+                    a=item["a"],
+                    b=item["b"],
+                    priority=item.get("priority", Task.NORMAL),
+                )
+            )
+        with transaction.atomic():
+            if settings.TASK_SCHEDULER == "beat":
+                intervals = cls.interval_schedules(
+                    schedule.interval for schedule in schedules
+                )
+                for schedule in schedules:
+                    schedule.interval_schedule = intervals[schedule.interval]
+                periodic_tasks = PeriodicTask.objects.bulk_create(
+                    (schedule.build_periodic_task() for schedule in schedules),
+                    batch_size=batch_size,
+                )
+                for schedule, periodic_task in zip(
+                    schedules, periodic_tasks, strict=True
+                ):
+                    schedule.periodic_task = periodic_task
+                # bulk_create skips the signal bumping it for every row.
+                PeriodicTasks.update_changed()
+            cls.objects.bulk_create(schedules, batch_size=batch_size)
+            Task.objects.bulk_create(tasks, batch_size=batch_size)
+        return schedules
+
+    def _release_interval_schedule(self, interval_schedule):
+        """Delete an interval row no other schedule or beat entry uses."""
+        in_use = (
+            PeriodicTask.objects.filter(interval=interval_schedule).exists()
+            or type(self)
+            .objects.filter(interval_schedule=interval_schedule)
+            .exclude(pk=self.pk)
+            .exists()
+        )
+        if not in_use:
+            interval_schedule.delete()
+
     def update_celery_beat_task(self):
-        self.interval_schedule.every = self.interval
-        self.interval_schedule.save()
-        self.periodic_task.scheduled_at = self.scheduled_at
-        self.periodic_task.args = json.dumps(
-            [str(self.task.id), self.task.a, self.task.b]
+        if self.periodic_task is None:
+            return
+        previous = self.interval_schedule
+        if previous.every != self.interval:
+            # Interval rows are shared, so point to another one.
+            self.interval_schedule = self.interval_schedules([self.interval])[
+                self.interval
+            ]
+            self.periodic_task.interval = self.interval_schedule
+        self.periodic_task.start_time = self.scheduled_at
+        self.periodic_task.args = json.dumps(self.task_args())
+        self.periodic_task.kwargs = self.task_kwargs()
+        self.periodic_task.queue = self.task.queue
+        self.periodic_task.expire_seconds = self.run_expires(
+            self.misfire_policy, self.interval
         )
         self.periodic_task.save()
+        if self.interval_schedule != previous:
+            self.save(update_fields=["interval_schedule", "updated_at"])
+            self._release_interval_schedule(previous)
 
     def delete_celery_beat_task(self):
         # self.task.delete()
+        if self.periodic_task is None:
+            return
         self.periodic_task.delete()
-        self.interval_schedule.delete()
+        self._release_interval_schedule(self.interval_schedule)
+
+
+class TaskQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        for status, count in Counter(obj.status for obj in objs).items():
+            record_created(count, status)
+        return objs
+
+    def runnable(self, celery_task_id=None):
+        """Scheduled tasks, and one-off tasks that have not run yet.
+
+        With ``celery_task_id``, pending tasks stamped by the sweeper for
+        another message are left out.
+        """
+        pending = models.Q(status=Task.PENDING)
+        if celery_task_id is not None:
+            pending &= models.Q(celery_task_id__in=["", celery_task_id])
+        return self.filter(models.Q(schedule__isnull=False) | pending)
+
+    def with_latest_results(self):
+        """Load the rollup and the latest results shown by the detail view."""
+        return self.select_related("rollup").prefetch_related(
+            models.Prefetch(
+                "results",
+                queryset=TaskResult.objects.order_by("-created_at", "-id")[
+                    : settings.TASK_DETAIL_RESULTS_LIMIT
+                ],
+                to_attr="prefetched_latest_results",
+            )
+        )
 
 
 class Task(BaseModel, models.Model):
@@ -86,6 +293,14 @@ class Task(BaseModel, models.Model):
         (SUCCESS, "Success"),
         (FAILED, "Failed"),
     ]
+    HIGH = "high"
+    NORMAL = "normal"
+    LOW = "low"
+    PRIORITY_CHOICES = [
+        (HIGH, "High"),
+        (NORMAL, "Normal"),
+        (LOW, "Low"),
+    ]
 
     schedule = models.OneToOneField(
         "rd_task.TaskSchedule",
@@ -94,6 +309,12 @@ class Task(BaseModel, models.Model):
         on_delete=models.CASCADE,
         related_name="task",
     )
+    operation = models.CharField(
+        max_length=32,
+        choices=operation_choices,
+        default=ADD,
+        help_text="Name of the operation applied to a and b.",
+    )
     a = models.IntegerField()
     b = models.IntegerField()
     status = models.CharField(
@@ -101,33 +322,279 @@ class Task(BaseModel, models.Model):
     )
     failed_message = models.CharField(max_length=255, blank=True)
     celery_task_id = models.CharField(max_length=255, blank=True)
+    priority = models.CharField(
+        max_length=10,
+        choices=PRIORITY_CHOICES,
+        default=NORMAL,
+        help_text="Selects the Celery queue the task is dispatched to.",
+    )
+
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["-created_at", "-id"], name="task_created_id_idx"
+            ),
+            models.Index(fields=["status"], name="task_status_idx"),
+            # Pending one-off tasks only, so finding the oldest ones never
+            # walks the finished rows.
+            models.Index(
+                fields=["created_at", "id"],
+                condition=models.Q(status="PENDING", schedule__isnull=True),
+                name="task_pending_created_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Task {self.id} - {self.status}"
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if adding:
+            record_created(status=self.status)
+
+    def is_runnable(self, celery_task_id=None):
+        if self.schedule_id is not None:
+            return True
+        if celery_task_id is not None and self.celery_task_id not in (
+            "",
+            celery_task_id,
+        ):
+            # Stamped by the sweeper for another message.
+            return False
+        return self.status == self.PENDING
+
+    @property
+    def queue(self):
+        return settings.TASK_PRIORITY_QUEUES[self.priority]
+
+    def latest_results(self):
+        if hasattr(self, "prefetched_latest_results"):
+            return self.prefetched_latest_results
+        return list(
+            self.results.order_by("-created_at", "-id")[
+                : settings.TASK_DETAIL_RESULTS_LIMIT
+            ]
+        )
+
+    def get_results_summary(self):
+        """Count, min, max and latest of every result, compacted ones included."""
+        summary = self.results.order_by().aggregate(
+            count=models.Count("id"),
+            minimum=models.Min("result"),
+            maximum=models.Max("result"),
+        )
+        try:
+            rollup = self.rollup
+        except TaskResultRollup.DoesNotExist:
+            rollup = None
+        if rollup is not None:
+            summary["count"] += rollup.count
+            summary["minimum"] = _combine(
+                min, summary["minimum"], rollup.minimum
+            )
+            summary["maximum"] = _combine(
+                max, summary["maximum"], rollup.maximum
+            )
+        latest = self.latest_results()
+        summary["last_result"] = latest[0].result if latest else None
+        summary["last_run_at"] = latest[0].created_at if latest else None
+        return summary
+
     def set_celery_task_id(self, _id, commit=True):
         self.celery_task_id = _id
-        commit and self.save()
+        commit and self.save(update_fields=["celery_task_id", "updated_at"])
 
     def mark_as_successfull(self, result, commit=True):
-        self.status = self.SUCCESS
+        previous, self.status = self.status, self.SUCCESS
         TaskResult.objects.create(task=self, result=result)
-        commit and self.save()
+        commit and self.save(
+            update_fields=["status", "celery_task_id", "updated_at"]
+        )
+        record_finished(self.SUCCESS, [previous])
 
     def mark_as_failed(self, failed_message, commit=True):
         self.failed_message = failed_message
-        self.status = self.FAILED
-        commit and self.save()
+        previous, self.status = self.status, self.FAILED
+        commit and self.save(
+            update_fields=[
+                "status",
+                "failed_message",
+                "celery_task_id",
+                "updated_at",
+            ]
+        )
+        record_finished(self.FAILED, [previous])
+
+    @classmethod
+    def status_counts(cls):
+        """Number of tasks in every status, counted on the table."""
+        return dict(
+            cls.objects.order_by()
+            .values_list("status")
+            .annotate(count=models.Count("id"))
+        )
+
+    @classmethod
+    def complete(cls, task_id, result, celery_task_id="", scheduled=False):
+        """Mark a runnable task as successful and store its result.
+
+        Unlike ``mark_as_successfull`` the task is never loaded: one
+        conditional update, which skips finished one-off tasks and messages
+        meant for another run, then the insert of the result. As in
+        ``mark_as_successfull`` the two are not wrapped in a transaction;
+        the update goes first so a redelivered message never stores a
+        second result. Returns whether the task was updated.
+
+        The previous status is not read back: a one-off task was pending,
+        and a ``scheduled`` run is counted as a rerun that leaves the
+        status counters as they are. The first run of a schedule, or one
+        that succeeds after a failure, is corrected by the next
+        reconciliation.
+        """
+        updated = (
+            cls.objects.runnable(celery_task_id)
+            .filter(id=task_id)
+            .update(
+                status=cls.SUCCESS,
+                celery_task_id=celery_task_id,
+                updated_at=timezone.now(),
+            )
+        )
+        if not updated:
+            return False
+        TaskResult.objects.create(task_id=task_id, result=result)
+        record_finished(
+            cls.SUCCESS, [cls.SUCCESS if scheduled else cls.PENDING]
+        )
+        return True
+
+    @classmethod
+    def fail(cls, task_id, failed_message, celery_task_id="", scheduled=False):
+        """Mark a runnable task as failed without loading it.
+
+        Guarded and counted like ``complete``.
+        """
+        updated = (
+            cls.objects.runnable(celery_task_id)
+            .filter(id=task_id)
+            .update(
+                status=cls.FAILED,
+                failed_message=str(failed_message)[:255],
+                celery_task_id=celery_task_id,
+                updated_at=timezone.now(),
+            )
+        )
+        if updated:
+            record_finished(
+                cls.FAILED, [cls.FAILED if scheduled else cls.PENDING]
+            )
+        return updated
+
+    @classmethod
+    def bulk_mark_as_successfull(cls, tasks, results, celery_task_id=""):
+        now = timezone.now()
+        previous = [task.status for task in tasks]
+        task_results = []
+        for task, result in zip(tasks, results, strict=True):
+            task.status = cls.SUCCESS
+            task.celery_task_id = celery_task_id
+            task.updated_at = now
+            task_results.append(TaskResult(task=task, result=result))
+        with transaction.atomic():
+            TaskResult.objects.bulk_create(
+                task_results, batch_size=settings.TASK_BULK_BATCH_SIZE
+            )
+            cls.objects.bulk_update(
+                tasks,
+                ["status", "celery_task_id", "updated_at"],
+                batch_size=settings.TASK_BULK_BATCH_SIZE,
+            )
+        record_finished(cls.SUCCESS, previous)
+        return task_results
+
+    @classmethod
+    def bulk_mark_as_failed(cls, tasks, failed_message, celery_task_id=""):
+        now = timezone.now()
+        previous = [task.status for task in tasks]
+        for task in tasks:
+            task.status = cls.FAILED
+            task.failed_message = failed_message
+            task.celery_task_id = celery_task_id
+            task.updated_at = now
+        cls.objects.bulk_update(
+            tasks,
+            ["status", "failed_message", "celery_task_id", "updated_at"],
+            batch_size=settings.TASK_BULK_BATCH_SIZE,
+        )
+        record_finished(cls.FAILED, previous)
+
+
+class TaskOutbox(models.Model):
+    """A task saved for dispatch, published by ``relay_outbox``.
+
+    Rows use the sequential default primary key so the relay publishes them
+    in the order they were written.
+    """
+
+    task = models.ForeignKey(
+        "Task", on_delete=models.CASCADE, related_name="outbox_entries"
+    )
+    mode = models.CharField(max_length=10, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.task_id} - {self.created_at}"
 
 
 class TaskResult(BaseModel, models.Model):
     task = models.ForeignKey(
         "Task", on_delete=models.CASCADE, related_name="results"
     )
-    result = models.IntegerField(null=True, blank=True)
+    result = models.BigIntegerField(null=True, blank=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["task", "-created_at"],
+                name="taskresult_task_created_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.task_id} - {self.result}"
+
+
+class TaskResultRollup(BaseModel, models.Model):
+    """Aggregate of the results compacted away by ``compact_results``."""
+
+    task = models.OneToOneField(
+        "Task", on_delete=models.CASCADE, related_name="rollup"
+    )
+    count = models.PositiveBigIntegerField(default=0)
+    total = models.BigIntegerField(default=0)
+    minimum = models.BigIntegerField(null=True, blank=True)
+    maximum = models.BigIntegerField(null=True, blank=True)
+    first_result_at = models.DateTimeField(null=True, blank=True)
+    last_result_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.task_id} - {self.count} results"
+
+    def add(self, result, created_at):
+        self.count += 1
+        if result is not None:
+            self.total += result
+            self.minimum = (
+                result if self.minimum is None else min(self.minimum, result)
+            )
+            self.maximum = (
+                result if self.maximum is None else max(self.maximum, result)
+            )
+        if self.first_result_at is None or created_at < self.first_result_at:
+            self.first_result_at = created_at
+        if self.last_result_at is None or created_at > self.last_result_at:
+            self.last_result_at = created_at
@@ -0,0 +1,143 @@
+"""Task completion notifications.
+
+The worker publishes the final status of a task on a per task channel and
+the waiting API requests subscribe to the channels of the tasks they wait
+for. Redis pub/sub is used when ``TASK_NOTIFICATIONS_URL`` is set, otherwise
+the notifications are delivered in-process, which only works when the
+worker runs in the same process as the API (eager Celery, tests).
+"""
+
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+
+import redis
+import redis.asyncio
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "task-done:"
+
+_redis_client = None
+_async_redis_client = None
+_local_lock = threading.Lock()
+_local_listeners = defaultdict(set)
+
+
+def task_channel(task_id):
+    return f"{CHANNEL_PREFIX}{task_id}"
+
+
+def _get_redis():
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.TASK_NOTIFICATIONS_URL)
+    return _redis_client
+
+
+def _get_async_redis():
+    global _async_redis_client
+    if _async_redis_client is None:
+        _async_redis_client = redis.asyncio.Redis.from_url(
+            settings.TASK_NOTIFICATIONS_URL
+        )
+    return _async_redis_client
+
+
+def publish_tasks_done(tasks):
+    """Notify the waiting clients that the given tasks have finished."""
+    if not tasks:
+        return
+    if settings.TASK_NOTIFICATIONS_URL:
+        try:
+            with _get_redis().pipeline(transaction=False) as pipe:
+                for task in tasks:
+                    pipe.publish(task_channel(task.id), task.status)
+                pipe.execute()
+        except redis.RedisError:
+            # Clients still see the status once their wait times out.
+            logger.exception("Could not publish task notifications")
+        return
+    with _local_lock:
+        for task in tasks:
+            for listener in _local_listeners.get(str(task.id), ()):
+                listener.notify(str(task.id), task.status)
+
+
+def publish_task_done(task):
+    publish_tasks_done([task])
+
+
+class LocalSubscription:
+    def __init__(self, task_ids):
+        self.task_ids = [str(task_id) for task_id in task_ids]
+        self.loop = None
+        self.queue = None
+
+    def notify(self, task_id, status):
+        self.loop.call_soon_threadsafe(
+            self.queue.put_nowait, (task_id, status)
+        )
+
+    async def __aenter__(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        with _local_lock:
+            for task_id in self.task_ids:
+                _local_listeners[task_id].add(self)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        with _local_lock:
+            for task_id in self.task_ids:
+                _local_listeners[task_id].discard(self)
+                if not _local_listeners[task_id]:
+                    del _local_listeners[task_id]
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except TimeoutError:
+            return None
+
+
+class RedisSubscription:
+    def __init__(self, task_ids):
+        self.channels = [task_channel(task_id) for task_id in task_ids]
+        self.pubsub = None
+
+    async def __aenter__(self):
+        self.pubsub = _get_async_redis().pubsub()
+        await self.pubsub.subscribe(*self.channels)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.pubsub.aclose()
+
+    async def get(self, timeout):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while (remaining := deadline - loop.time()) > 0:
+            message = await self.pubsub.get_message(
+                ignore_subscribe_messages=True, timeout=remaining
+            )
+            if message is not None and message["type"] == "message":
+                channel = message["channel"].decode()
+                return (
+                    channel.removeprefix(CHANNEL_PREFIX),
+                    message["data"].decode(),
+                )
+        return None
+
+
+def subscribe(task_ids):
+    """Subscribe to the completion of tasks.
+
+    Use as an async context manager and subscribe *before* reading the
+    current status, so a task finishing in between is not missed.
+    """
+    if settings.TASK_NOTIFICATIONS_URL:
+        return RedisSubscription(task_ids)
+    return LocalSubscription(task_ids)
@@ -0,0 +1,63 @@
+"""Registry of the operations a task can run on its operands.
+
+Every operation has a scalar implementation, used for single tasks and
+small batches, and a vectorized one taking NumPy ``int64`` arrays, used
+by ``add_many`` from ``TASK_VECTORIZE_THRESHOLD`` tasks on. Register new
+operations with ``register``; both implementations must return the same
+values for the same operands.
+"""
+
+import operator
+from dataclasses import dataclass
+
+import numpy as np
+from django.conf import settings
+
+ADD = "add"
+
+
+@dataclass(frozen=True)
+class Operation:
+    name: str
+    label: str
+    scalar: object
+    vectorized: object
+
+    def compute(self, a, b):
+        return self.scalar(a, b)
+
+    def compute_many(self, a, b):
+        """Compute a homogeneous batch, as a list of Python ints."""
+        if len(a) >= settings.TASK_VECTORIZE_THRESHOLD:
+            return self.vectorized(
+                np.asarray(a, dtype=np.int64), np.asarray(b, dtype=np.int64)
+            ).tolist()
+        return [self.scalar(x, y) for x, y in zip(a, b, strict=True)]
+
+
+OPERATIONS = {}
+
+
+def register(name, label, scalar, vectorized):
+    OPERATIONS[name] = Operation(name, label, scalar, vectorized)
+    return OPERATIONS[name]
+
+
+def get_operation(name):
+    try:
+        return OPERATIONS[name]
+    except KeyError:
+        raise ValueError(f"Unknown operation: {name}") from None
+
+
+def operation_choices():
+    return [
+        (operation.name, operation.label) for operation in OPERATIONS.values()
+    ]
+
+
+register(ADD, "Add", operator.add, np.add)
+register("subtract", "Subtract", operator.sub, np.subtract)
+register("multiply", "Multiply", operator.mul, np.multiply)
+register("maximum", "Maximum", max, np.maximum)
+register("minimum", "Minimum", min, np.minimum)
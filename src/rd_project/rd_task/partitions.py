@@ -0,0 +1,106 @@
+"""Monthly range partitions of the ``TaskResult`` table on PostgreSQL.
+
+Migration ``0006`` turns the table into one partitioned by ``created_at``,
+with one partition per month and a default partition for anything outside
+them. ``ensure_partitions`` creates the coming months ahead of time so the
+default partition stays empty; a month can only be attached while no row
+of its range sits in the default partition. On other databases every
+function here is a no-op.
+"""
+
+import logging
+from datetime import UTC
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connection as default_connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+TABLE = "rd_task_taskresult"
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1, tzinfo=UTC)
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=UTC)
+
+
+def partition_name(month):
+    return f"{TABLE}_{month:%Y%m}"
+
+
+def is_partitioned(connection=default_connection):
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table "
+            "WHERE partrelid = to_regclass(%s)",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def create_partitions(cursor, start, end):
+    """Create the missing monthly partitions covering ``[start, end)``."""
+    month = month_start(start)
+    while month < end:
+        next_month = add_months(month, 1)
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS "{partition_name(month)}" '
+            f'PARTITION OF "{TABLE}" '
+            f"FOR VALUES FROM ('{month.isoformat()}') "
+            f"TO ('{next_month.isoformat()}')"
+        )
+        month = next_month
+
+
+def ensure_partitions(months_ahead=None, connection=default_connection):
+    """Create the partitions of the current and the coming months."""
+    if not is_partitioned(connection):
+        return
+    if months_ahead is None:
+        months_ahead = settings.TASK_RESULT_PARTITIONS_AHEAD
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        create_partitions(
+            cursor, now, add_months(month_start(now), months_ahead + 1)
+        )
+
+
+def drop_empty_partitions(before, connection=default_connection):
+    """Drop the monthly partitions ending before ``before`` with no rows.
+
+    Returns the names of the dropped partitions.
+    """
+    if not is_partitioned(connection):
+        return []
+    dropped = []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = to_regclass(%s) "
+            "ORDER BY child.relname",
+            [TABLE],
+        )
+        for (name,) in cursor.fetchall():
+            if name == DEFAULT_PARTITION:
+                continue
+            month = datetime.strptime(name[-6:], "%Y%m").replace(tzinfo=UTC)
+            if add_months(month, 1) > before:
+                continue
+            cursor.execute(f'SELECT EXISTS (SELECT 1 FROM "{name}")')  # noqa: S608
+            if cursor.fetchone()[0]:
+                continue
+            cursor.execute(f'DROP TABLE "{name}"')
+            dropped.append(name)
+    if dropped:
+        logger.info("Dropped empty result partitions: %s", dropped)
+    return dropped
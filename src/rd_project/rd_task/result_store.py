@@ -0,0 +1,85 @@
+"""Content-addressed store of computed results.
+
+Results are keyed on the operation and its operands, so identical
+submissions can be completed without going through the broker. The store
+lives in its own cache alias; entries expire after ``RESULT_STORE_TIMEOUT``
+seconds and the local-memory backend additionally evicts the least
+recently used entries past ``RESULT_STORE_MAX_ENTRIES``.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+
+HITS_KEY = "result-store:hits"
+MISSES_KEY = "result-store:misses"
+
+
+def _cache():
+    return caches[settings.RESULT_STORE_CACHE]
+
+
+def result_key(operation, *operands):
+    return ":".join(["result", operation, *map(str, operands)])
+
+
+def _count(key, delta):
+    if not delta:
+        return
+    cache = _cache()
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key, delta)
+
+
+def get_result(operation, *operands):
+    if not settings.RESULT_STORE_ENABLED:
+        return None
+    result = _cache().get(result_key(operation, *operands))
+    _count(HITS_KEY if result is not None else MISSES_KEY, 1)
+    return result
+
+
+def get_results(operation, operands_list):
+    """Look up many results at once, returned as ``{operands: result}``."""
+    if not settings.RESULT_STORE_ENABLED or not operands_list:
+        return {}
+    keys = {
+        result_key(operation, *operands): tuple(operands)
+        for operands in operands_list
+    }
+    found = _cache().get_many(keys)
+    _count(HITS_KEY, len(found))
+    _count(MISSES_KEY, len(keys) - len(found))
+    return {keys[key]: result for key, result in found.items()}
+
+
+def set_result(operation, operands, result):
+    if settings.RESULT_STORE_ENABLED:
+        _cache().set(result_key(operation, *operands), result)
+
+
+def set_results(operation, operands_list, results):
+    if settings.RESULT_STORE_ENABLED and operands_list:
+        _cache().set_many(
+            {
+                result_key(operation, *operands): result
+                for operands, result in zip(
+                    operands_list, results, strict=True
+                )
+            }
+        )
+
+
+def stats():
+    counters = _cache().get_many([HITS_KEY, MISSES_KEY])
+    hits = counters.get(HITS_KEY, 0)
+    misses = counters.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        "enabled": settings.RESULT_STORE_ENABLED,
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / lookups if lookups else None,
+    }
@@ -0,0 +1,107 @@
+"""Retention of ``TaskResult`` history.
+
+Periodic schedules store a result on every run, forever. Results older
+than ``TASK_RESULT_RETENTION_DAYS`` are folded into one
+``TaskResultRollup`` per task (count, sum, min, max and time range) and
+deleted. The latest result of every task is always kept, so the detail
+view and the export still show it.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists
+from django.db.models import OuterRef
+from django.utils import timezone
+
+from .cache import invalidate_task_detail
+from .models import TaskResult
+from .models import TaskResultRollup
+from .partitions import drop_empty_partitions
+from .partitions import ensure_partitions
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_FIELDS = [
+    "count",
+    "total",
+    "minimum",
+    "maximum",
+    "first_result_at",
+    "last_result_at",
+    "updated_at",
+]
+
+
+def retention_cutoff():
+    days = settings.TASK_RESULT_RETENTION_DAYS
+    if not days:
+        return None
+    return timezone.now() - timedelta(days=days)
+
+
+def _merge_rollups(rows):
+    task_ids = {task_id for _, task_id, _, _ in rows}
+    existing = TaskResultRollup.objects.select_for_update().in_bulk(
+        task_ids, field_name="task_id"
+    )
+    created = {}
+    for _, task_id, result, created_at in rows:
+        rollup = existing.get(task_id) or created.setdefault(
+            task_id, TaskResultRollup(task_id=task_id)
+        )
+        rollup.add(result, created_at)
+    now = timezone.now()
+    for rollup in existing.values():
+        rollup.updated_at = now
+    TaskResultRollup.objects.bulk_create(created.values())
+    TaskResultRollup.objects.bulk_update(existing.values(), ROLLUP_FIELDS)
+
+
+def compact_results(cutoff=None, batch_size=None):
+    """Fold the results created before ``cutoff`` into per-task rollups.
+
+    Works in batches of ``batch_size`` rows, one transaction each, and
+    returns the number of results compacted.
+    """
+    cutoff = cutoff or retention_cutoff()
+    if cutoff is None:
+        return 0
+    batch_size = batch_size or settings.TASK_RESULT_COMPACTION_BATCH_SIZE
+    newer = TaskResult.objects.filter(
+        task=OuterRef("task"), created_at__gt=OuterRef("created_at")
+    )
+    candidates = (
+        TaskResult.objects.filter(created_at__lt=cutoff)
+        .filter(Exists(newer))
+        .order_by()
+        .values_list("id", "task_id", "result", "created_at")
+    )
+    compacted = 0
+    while True:
+        with transaction.atomic():
+            rows = list(candidates[:batch_size])
+            if not rows:
+                break
+            _merge_rollups(rows)
+            # The created_at bound lets PostgreSQL prune recent partitions.
+            TaskResult.objects.filter(
+                id__in=[row[0] for row in rows], created_at__lt=cutoff
+            ).delete()
+        # Cached details may list results that were just compacted.
+        invalidate_task_detail(*{row[1] for row in rows})
+        compacted += len(rows)
+    logger.info("Compacted %s task results older than %s", compacted, cutoff)
+    return compacted
+
+
+def maintain_results():
+    """Create upcoming partitions, compact old results, drop empty months."""
+    ensure_partitions()
+    cutoff = retention_cutoff()
+    compacted = compact_results(cutoff)
+    if cutoff is not None:
+        drop_empty_partitions(cutoff)
+    return compacted
@@ -0,0 +1,314 @@
+"""Celery beat scheduler for ``TaskSchedule`` rows.
+
+``django_celery_beat``'s ``DatabaseScheduler`` needs one ``PeriodicTask`` per
+schedule and re-reads all of them whenever one changes. This scheduler
+reads ``TaskSchedule`` directly instead: schedules are loaded incrementally
+(by ``updated_at``) into a min-heap keyed on their next run time and every
+tick dispatches all the due runs as ``add_many`` batches.
+
+Runs missed while beat was down, or while a tick was late, follow the
+``misfire_policy`` of their schedule: ``coalesce`` runs once, ``skip`` waits
+for the next run and ``catch_up`` replays up to
+``TASK_SCHEDULER_CATCH_UP_MAX`` runs, dispatched in batches of at most
+``TASK_SCHEDULER_CATCH_UP_RATE`` runs per second.
+
+Enable it with ``TASK_SCHEDULER=engine`` and run beat with
+``--scheduler rd_project.rd_task.schedulers:TaskScheduleScheduler``.
+"""
+
+import heapq
+import itertools
+import logging
+import math
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from celery import beat
+from django.conf import settings
+
+from .dispatch import dispatch_task_ids
+from .models import Task
+from .models import TaskSchedule
+
+logger = logging.getLogger(__name__)
+
+REMOVED = object()
+
+
+def next_run_after(start, interval, now):
+    """First run of a schedule starting at ``start`` that is after ``now``."""
+    if start > now:
+        return start
+    return start + (math.floor((now - start) / interval) + 1) * interval
+
+
+def first_run(start, interval, now, last_run=None):
+    """Run time of a schedule when it is loaded.
+
+    A schedule that never ran yet gets its latest missed run right away,
+    the others resume with the first run after ``last_run``, which is in
+    the past if runs were missed meanwhile.
+    """
+    if start > now:
+        return start
+    if last_run is not None:
+        return next_run_after(start, interval, last_run)
+    return start + math.floor((now - start) / interval) * interval
+
+
+class ScheduleHeap:
+    """Min-heap of schedules keyed on their next run time.
+
+    Updated and removed schedules are invalidated lazily: their old heap
+    entries are marked as removed and skipped once they reach the top.
+    """
+
+    def __init__(self, catch_up_max=0):
+        self.catch_up_max = catch_up_max
+        self._heap = []
+        self._entries = {}
+        self._catch_up = {}
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def push(
+        self,
+        schedule_id,
+        task_id,
+        next_run,
+        interval,
+        misfire_policy=TaskSchedule.COALESCE,
+    ):
+        # Missed runs still to catch up on survive a reload.
+        self._invalidate(schedule_id)
+        self._push(schedule_id, task_id, next_run, interval, misfire_policy)
+
+    def _push(self, schedule_id, task_id, next_run, interval, misfire_policy):
+        entry = [
+            next_run,
+            next(self._counter),
+            schedule_id,
+            task_id,
+            interval,
+            misfire_policy,
+        ]
+        self._entries[schedule_id] = entry
+        heapq.heappush(self._heap, entry)
+
+    def _invalidate(self, schedule_id):
+        entry = self._entries.pop(schedule_id, None)
+        if entry is not None:
+            entry[2] = REMOVED
+
+    def remove(self, schedule_id):
+        self._catch_up.pop(schedule_id, None)
+        self._invalidate(schedule_id)
+
+    def run_expires(self, schedule_id):
+        """Seconds after which a queued run of the schedule is stale."""
+        _, _, _, _, interval, misfire_policy = self._entries[schedule_id]
+        return TaskSchedule.run_expires(misfire_policy, interval)
+
+    def next_run(self):
+        while self._heap and self._heap[0][2] is REMOVED:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now, limit=None):
+        """Return ``(schedule_id, task_id)`` of the due runs, oldest first.
+
+        Each returned schedule is pushed back with its next run time. Runs
+        missed while nothing was ticking are handled by the misfire policy:
+        ``coalesce`` returns them once, ``skip`` not at all and
+        ``catch_up`` once plus up to ``catch_up_max`` runs left for
+        ``pop_catch_up``.
+        """
+        due = []
+        while (limit is None or len(due) < limit) and (
+            (next_run := self.next_run()) is not None and next_run <= now
+        ):
+            _, _, schedule_id, task_id, interval, misfire_policy = (
+                heapq.heappop(self._heap)
+            )
+            runs = math.floor((now - next_run) / interval) + 1
+            if misfire_policy != TaskSchedule.SKIP or runs == 1:
+                due.append((schedule_id, task_id))
+            if misfire_policy == TaskSchedule.CATCH_UP and runs > 1:
+                missed = self._catch_up.get(schedule_id, (task_id, 0))[1]
+                self._catch_up[schedule_id] = (
+                    task_id,
+                    min(missed + runs - 1, self.catch_up_max),
+                )
+            self._push(
+                schedule_id,
+                task_id,
+                next_run_after(next_run, interval, now),
+                interval,
+                misfire_policy,
+            )
+        return due
+
+    @property
+    def catch_up_runs(self):
+        return sum(runs for _, runs in self._catch_up.values())
+
+    def pop_catch_up(self, limit):
+        """Return up to ``limit`` missed runs as rounds of distinct tasks.
+
+        Schedules take turns: a schedule with runs left goes back to the
+        end of the line after each run.
+        """
+        rounds = []
+        taken = 0
+        while self._catch_up and taken < limit:
+            round_ = []
+            for schedule_id in list(self._catch_up):
+                if taken == limit:
+                    break
+                task_id, runs = self._catch_up.pop(schedule_id)
+                round_.append((schedule_id, task_id))
+                taken += 1
+                if runs > 1:
+                    self._catch_up[schedule_id] = (task_id, runs - 1)
+            rounds.append(round_)
+        return rounds
+
+
+class TaskScheduleScheduler(beat.Scheduler):
+    def setup_schedule(self):
+        super().setup_schedule()
+        self.schedule_heap = ScheduleHeap(
+            catch_up_max=settings.TASK_SCHEDULER_CATCH_UP_MAX
+        )
+        self.synced_until = None
+        # updated_at of the schedules loaded within the overlap window.
+        self.synced = {}
+        self.last_sync = 0
+        self.sync_schedules()
+
+    def sync_schedules(self):
+        """Load the schedules created or updated since the last sync.
+
+        A row is stamped when it is saved but only seen once its
+        transaction commits, so the last ``TASK_SCHEDULER_SYNC_OVERLAP``
+        seconds before the newest row loaded are read again; rows already
+        loaded with the same ``updated_at`` are skipped.
+        """
+        overlap = timedelta(seconds=settings.TASK_SCHEDULER_SYNC_OVERLAP)
+        queryset = TaskSchedule.objects.filter(task__isnull=False)
+        if self.synced_until is not None:
+            queryset = queryset.filter(
+                updated_at__gte=self.synced_until - overlap
+            )
+        now = time.time()
+        initial = self.synced_until is None
+        loaded = 0
+        rows = (
+            queryset.order_by("updated_at")
+            .values_list(
+                "id",
+                "task__id",
+                "task__status",
+                "task__updated_at",
+                "scheduled_at",
+                "interval",
+                "misfire_policy",
+                "updated_at",
+            )
+            .iterator(chunk_size=settings.TASK_SCHEDULER_SYNC_CHUNK_SIZE)
+        )
+        for (
+            schedule_id,
+            task_id,
+            status,
+            last_run,
+            start,
+            interval,
+            misfire_policy,
+            updated_at,
+        ) in rows:
+            if self.synced.get(schedule_id) == updated_at:
+                continue
+            if status == Task.PENDING:
+                last_run = None
+            elif initial:
+                # A task is saved when it runs: runs after its updated_at
+                # were missed while beat was down.
+                last_run = last_run.timestamp()
+            else:
+                # Reloaded after an update, the schedule resumes.
+                last_run = now
+            next_run = first_run(start.timestamp(), interval, now, last_run)
+            self.schedule_heap.push(
+                schedule_id, task_id, next_run, interval, misfire_policy
+            )
+            self.synced_until = max(
+                self.synced_until or updated_at, updated_at
+            )
+            self.synced[schedule_id] = updated_at
+            loaded += 1
+        if self.synced_until is not None:
+            cutoff = self.synced_until - overlap
+            self.synced = {
+                schedule_id: updated_at
+                for schedule_id, updated_at in self.synced.items()
+                if updated_at >= cutoff
+            }
+        self.last_sync = now
+        logger.debug("Loaded %s task schedules", loaded)
+
+    def tick_schedules(self):
+        now = time.time()
+        if now - self.last_sync >= settings.TASK_SCHEDULER_SYNC_INTERVAL:
+            self.sync_schedules()
+        due = self.schedule_heap.pop_due(
+            now, limit=settings.TASK_SCHEDULER_MAX_BATCH
+        )
+        if due:
+            self.dispatch_due(due)
+        for round_ in self.schedule_heap.pop_catch_up(
+            settings.TASK_SCHEDULER_CATCH_UP_RATE
+        ):
+            self.dispatch_due(round_)
+        next_run = self.schedule_heap.next_run()
+        if next_run is None:
+            delay = self.max_interval
+        else:
+            delay = max(next_run - time.time(), 0)
+        if self.schedule_heap.catch_up_runs:
+            # Tick again in a second for the next batch of missed runs.
+            delay = min(delay, 1)
+        return delay
+
+    def dispatch_due(self, due):
+        # Schedules deleted since they were loaded no longer have a task.
+        priorities = dict(
+            Task.objects.filter(
+                schedule_id__in=[schedule_id for schedule_id, _ in due]
+            ).values_list("id", "priority")
+        )
+        by_queue = defaultdict(list)
+        for schedule_id, task_id in due:
+            if task_id not in priorities:
+                self.schedule_heap.remove(schedule_id)
+                continue
+            queue = settings.TASK_PRIORITY_QUEUES[priorities[task_id]]
+            # Runs still queued once misfired are dropped by the workers.
+            expires = self.schedule_heap.run_expires(schedule_id)
+            by_queue[queue, expires].append(str(task_id))
+        for (queue, expires), ids in by_queue.items():
+            dispatch_task_ids(ids, queue=queue, expires=expires)
+        logger.debug(
+            "Dispatched %s scheduled runs",
+            sum(len(ids) for ids in by_queue.values()),
+        )
+
+    def tick(self, *args, **kwargs):
+        return min(super().tick(*args, **kwargs), self.tick_schedules())
+
+    @property
+    def info(self):
+        return f"    . task schedules -> {len(self.schedule_heap)}"
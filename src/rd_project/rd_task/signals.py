@@ -0,0 +1,85 @@
+"""Celery signal handlers recording task and publish metrics."""
+
+import random
+import threading
+import time
+
+from billiard import current_process
+from celery.signals import after_task_publish
+from celery.signals import before_task_publish
+from celery.signals import task_postrun
+from celery.signals import task_prerun
+from celery.signals import worker_process_init
+from django.conf import settings
+from django.db import connection
+
+from rd_project import metrics
+
+_local = threading.local()
+
+
+def _running():
+    running = getattr(_local, "running", None)
+    if running is None:
+        running = _local.running = {}
+    return running
+
+
+@task_prerun.connect
+def start_task_timer(task_id=None, task=None, **kwargs):
+    queries = None
+    wrapper = None
+    if random.random() < settings.METRICS_SAMPLE_RATE:
+        queries = metrics.QueryCounter()
+        wrapper = connection.execute_wrapper(queries)
+        wrapper.__enter__()
+    _running()[task_id] = (time.perf_counter(), queries, wrapper)
+
+
+@task_postrun.connect
+def stop_task_timer(task_id=None, task=None, state=None, **kwargs):
+    started = _running().pop(task_id, None)
+    if started is None:
+        return
+    start, queries, wrapper = started
+    metrics.registry.observe(
+        metrics.celery_task_duration,
+        (task.name, state or "UNKNOWN"),
+        time.perf_counter() - start,
+    )
+    if wrapper is not None:
+        wrapper.__exit__(None, None, None)
+        metrics.registry.observe(
+            metrics.celery_task_queries, (task.name,), queries.count
+        )
+        metrics.registry.observe(
+            metrics.celery_task_query_duration, (task.name,), queries.seconds
+        )
+
+
+@before_task_publish.connect
+def start_publish_timer(headers=None, **kwargs):
+    if headers and "id" in headers:
+        _running()[("publish", headers["id"])] = time.perf_counter()
+
+
+@after_task_publish.connect
+def stop_publish_timer(sender=None, headers=None, **kwargs):
+    if not headers or "id" not in headers:
+        return
+    start = _running().pop(("publish", headers["id"]), None)
+    if start is not None:
+        metrics.registry.observe(
+            metrics.celery_publish_duration,
+            (sender,),
+            time.perf_counter() - start,
+        )
+
+
+@worker_process_init.connect
+def serve_worker_metrics(**kwargs):
+    if settings.METRICS_WORKER_PORT:
+        # Every pool process serves its own metrics on the next port.
+        metrics.start_http_server(
+            settings.METRICS_WORKER_PORT + (current_process().index or 0)
+        )
@@ -0,0 +1,124 @@
+"""Task status counters and per-minute throughput, kept in the cache.
+
+The number of tasks in every status is kept up to date by the code that
+changes it: creating tasks counts them as pending, and the worker moves a
+task from its previous status to its new one when it finishes. Every run
+also counts towards the minute it finished in. ``/api/stats/`` reads the
+counters and the last ``TASK_STATS_WINDOW`` minutes with one cache lookup
+instead of counting the table.
+
+Deleted tasks, rolled back transactions and concurrent updates make the
+counters drift, so ``reconcile`` resets them from a ``GROUP BY status``
+every ``TASK_STATS_RECONCILE_INTERVAL`` seconds.
+"""
+
+from collections import Counter
+from datetime import UTC
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+# Task statuses, as in ``Task.STATUS_CHOICES``.
+PENDING = "PENDING"
+SUCCESS = "SUCCESS"
+FAILED = "FAILED"
+STATUSES = (PENDING, SUCCESS, FAILED)
+
+COUNT_KEY = "task-stats:count:"
+FINISHED_KEY = "task-stats:finished:"
+RECONCILED_AT_KEY = "task-stats:reconciled-at"
+
+
+def _minute(now=None):
+    return int((now or timezone.now()).timestamp()) // 60
+
+
+def _incr(key, delta, timeout=None):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, 0, timeout=timeout)
+        cache.incr(key, delta)
+
+
+def _apply(deltas, timeout=None):
+    for key, delta in deltas.items():
+        if delta:
+            _incr(key, delta, timeout)
+
+
+def record_created(count=1, status=PENDING):
+    """Count ``count`` new tasks in ``status``."""
+    if count:
+        _incr(COUNT_KEY + status, count)
+
+
+def record_finished(status, previous):
+    """Count tasks that finished in ``status``.
+
+    ``previous`` holds the status of every task before it ran.
+    """
+    previous = Counter(previous)
+    runs = sum(previous.values())
+    if not runs:
+        return
+    deltas = {COUNT_KEY + old: -count for old, count in previous.items()}
+    deltas[COUNT_KEY + status] = deltas.get(COUNT_KEY + status, 0) + runs
+    _apply(deltas)
+    # Buckets outlive the window by a minute so the oldest one is complete.
+    _incr(
+        f"{FINISHED_KEY}{status}:{_minute()}",
+        runs,
+        timeout=(settings.TASK_STATS_WINDOW + 1) * 60,
+    )
+
+
+def reconcile(counts):
+    """Reset the counters to ``counts``, a ``{status: count}`` dict."""
+    cache.set_many(
+        {COUNT_KEY + status: counts.get(status, 0) for status in STATUSES},
+        timeout=None,
+    )
+    cache.set(RECONCILED_AT_KEY, timezone.now(), timeout=None)
+
+
+def is_reconciled():
+    return cache.get(RECONCILED_AT_KEY) is not None
+
+
+def stats(now=None):
+    """Counters and per-minute throughput, oldest minute first."""
+    current = _minute(now)
+    minutes = range(current - settings.TASK_STATS_WINDOW + 1, current + 1)
+    finished_keys = {
+        f"{FINISHED_KEY}{status}:{minute}": (status, minute)
+        for minute in minutes
+        for status in (SUCCESS, FAILED)
+    }
+    values = cache.get_many(
+        [
+            RECONCILED_AT_KEY,
+            *(COUNT_KEY + status for status in STATUSES),
+            *finished_keys,
+        ]
+    )
+    finished = Counter()
+    for key, value in values.items():
+        if key in finished_keys:
+            finished[finished_keys[key]] = value
+    return {
+        "counts": {
+            status: values.get(COUNT_KEY + status, 0) for status in STATUSES
+        },
+        "reconciled_at": values.get(RECONCILED_AT_KEY),
+        "throughput": [
+            {
+                "minute": datetime.fromtimestamp(minute * 60, tz=UTC),
+                SUCCESS: finished[SUCCESS, minute],
+                FAILED: finished[FAILED, minute],
+            }
+            for minute in minutes
+        ],
+    }
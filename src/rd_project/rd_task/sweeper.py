@@ -0,0 +1,110 @@
+"""Re-dispatch of pending tasks whose broker message was lost.
+
+A one-off task still ``PENDING`` ``TASK_SWEEP_AGE`` seconds after it was
+created, or last swept, is published again in an ``add_many`` message.
+Every message gets its own id, stamped on its tasks as ``celery_task_id``
+before it is published, and workers only run a stamped pending task from
+the message with that id: when the original message turns up after all,
+it skips the task instead of running it a second time.
+
+Candidates are read in ``created_at`` order from the partial index of
+pending one-off tasks, so a sweep costs the same however many finished
+rows the table holds.
+"""
+
+import logging
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists
+from django.db.models import OuterRef
+from django.db.models import Q
+from django.utils import timezone
+
+from rd_project.celery import app
+
+from .models import Task
+from .models import TaskOutbox
+
+logger = logging.getLogger(__name__)
+
+# Published by name: the tasks module runs the sweeper.
+TASK_ADD_MANY = "rd_project.rd_task.tasks.add_many"
+
+
+def stale_tasks(cutoff):
+    """Pending one-off tasks not created nor swept since ``cutoff``."""
+    return Task.objects.filter(
+        ~Exists(TaskOutbox.objects.filter(task=OuterRef("pk"))),
+        status=Task.PENDING,
+        schedule__isnull=True,
+        created_at__lt=cutoff,
+        updated_at__lt=cutoff,
+    )
+
+
+def redispatch(tasks, chunk_size=None):
+    """Stamp ``tasks`` with the id of a new message and publish it.
+
+    Returns the number of tasks published.
+    """
+    chunk_size = chunk_size or settings.TASK_DISPATCH_CHUNK_SIZE
+    by_queue = defaultdict(list)
+    for task in tasks:
+        by_queue[task.queue].append(str(task.id))
+    messages = [
+        (str(uuid.uuid4()), queue, task_ids[i : i + chunk_size])
+        for queue, task_ids in by_queue.items()
+        for i in range(0, len(task_ids), chunk_size)
+    ]
+    now = timezone.now()
+    with transaction.atomic():
+        for message_id, _, task_ids in messages:
+            Task.objects.filter(id__in=task_ids, status=Task.PENDING).update(
+                celery_task_id=message_id, updated_at=now
+            )
+    # A failed publish leaves the tasks stamped for a message that never
+    # comes; they are swept again once they are stale.
+    for message_id, queue, task_ids in messages:
+        app.send_task(
+            TASK_ADD_MANY,
+            (task_ids,),
+            task_id=message_id,
+            queue=queue,
+            compression=settings.TASK_BATCH_COMPRESSION,
+        )
+    return len(tasks)
+
+
+def sweep_stale_tasks(age=None, batch_size=None):
+    """Re-dispatch every stale pending task, a batch at a time.
+
+    Returns the number of tasks re-dispatched.
+    """
+    age = settings.TASK_SWEEP_AGE if age is None else age
+    batch_size = batch_size or settings.TASK_SWEEP_BATCH_SIZE
+    cutoff = timezone.now() - timedelta(seconds=age)
+    swept = 0
+    after = Q()
+    while True:
+        batch = list(
+            stale_tasks(cutoff)
+            .filter(after)
+            .order_by("created_at", "id")
+            .only("id", "priority", "created_at")[:batch_size]
+        )
+        if not batch:
+            break
+        swept += redispatch(batch)
+        last = batch[-1]
+        after = Q(created_at__gt=last.created_at) | Q(
+            created_at=last.created_at, id__gt=last.id
+        )
+        if len(batch) < batch_size:
+            break
+    if swept:
+        logger.warning("Re-dispatched %s stale pending tasks", swept)
+    return swept
@@ -1,21 +1,127 @@
+from collections import defaultdict
+
+from django.conf import settings
+
 from rd_project.celery import app
 
+from .cache import invalidate_task_detail
 from .models import Task
+from .notifications import publish_task_done
+from .notifications import publish_tasks_done
+from .operations import ADD
+from .operations import get_operation
+from .result_store import get_result
+from .result_store import set_result
+from .result_store import set_results
+from .retention import maintain_results
+from .stats import reconcile
+from .sweeper import sweep_stale_tasks as sweep
 
 
 class TaskException(Exception):
     pass
 
 
-@app.task(bind=True)
-def add(self, task_id, a, b):
+def _compute(operation, a, b):
+    result = get_result(operation, a, b)
+    if result is None:
+        result = get_operation(operation).compute(a, b)
+        set_result(operation, (a, b), result)
+    return result
+
+
+def _add_fast(task_id, a, b, operation, celery_task_id, scheduled):
+    try:
+        result = _compute(operation, a, b)
+        if not Task.complete(task_id, result, celery_task_id, scheduled):
+            # Deleted, or a redelivered message for a finished task.
+            return None
+    except Exception as error:
+        if Task.fail(task_id, error, celery_task_id, scheduled):
+            invalidate_task_detail(task_id)
+            publish_task_done(Task(id=task_id, status=Task.FAILED))
+        raise TaskException(error) from error
+    # Rebuilding the cached detail would cost more queries than the task
+    # itself, so it is dropped and rebuilt on the next read.
+    invalidate_task_detail(task_id)
+    publish_task_done(Task(id=task_id, status=Task.SUCCESS))
+    return result
+
+
+# ``add`` and ``add_many`` run every registered operation; they keep their
+# names so queued messages and existing periodic tasks still resolve.
+@app.task(bind=True, ignore_result=settings.TASK_IGNORE_RESULT)
+def add(self, task_id, a, b, operation=ADD, scheduled=False):
+    if settings.TASK_WORKER_FAST_PATH:
+        return _add_fast(
+            task_id, a, b, operation, self.request.id or "", scheduled
+        )
     task = Task.objects.get(id=task_id)
-    task.set_celery_task_id(self.request.id, commit=False)
+    if not task.is_runnable(self.request.id or ""):
+        # A redelivered message for a task that already finished.
+        return None
+    # Runs dispatched through ``add.chunks`` have no request id of their own.
+    task.set_celery_task_id(self.request.id or "", commit=False)
 
     try:
-        result = a + b
+        result = _compute(operation, a, b)
         task.mark_as_successfull(result=result)
+        invalidate_task_detail(task.id)
+        publish_task_done(task)
         return result
     except Exception as error:
         task.mark_as_failed(failed_message=error)
+        invalidate_task_detail(task.id)
+        publish_task_done(task)
         raise TaskException(error) from error
+
+
+@app.task(bind=True, ignore_result=settings.TASK_IGNORE_RESULT)
+def add_many(self, task_ids):
+    celery_task_id = self.request.id or ""
+    tasks = list(Task.objects.runnable(celery_task_id).filter(id__in=task_ids))
+    by_operation = defaultdict(list)
+    for task in tasks:
+        by_operation[task.operation].append(task)
+    done = set()
+
+    try:
+        for operation, batch in by_operation.items():
+            # One vectorized call per operation in the batch.
+            results = get_operation(operation).compute_many(
+                [task.a for task in batch], [task.b for task in batch]
+            )
+            Task.bulk_mark_as_successfull(batch, results, celery_task_id)
+            # Looking the batch up would cost more than the vectorized
+            # call, so add_many only feeds the store.
+            set_results(
+                operation, [(task.a, task.b) for task in batch], results
+            )
+            done.update(task.id for task in batch)
+        return len(tasks)
+    except Exception as error:
+        failed = [task for task in tasks if task.id not in done]
+        Task.bulk_mark_as_failed(failed, str(error)[:255], celery_task_id)
+        raise TaskException(error) from error
+    finally:
+        # Serializing every task here would cost a query per row, so the
+        # cached payloads are dropped and rebuilt on the next read.
+        invalidate_task_detail(*task_ids)
+        publish_tasks_done(tasks)
+
+
+@app.task
+def maintain_task_results():
+    return maintain_results()
+
+
+@app.task
+def reconcile_task_stats():
+    counts = Task.status_counts()
+    reconcile(counts)
+    return counts
+
+
+@app.task
+def sweep_stale_tasks():
+    return sweep()
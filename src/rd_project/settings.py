@@ -13,6 +13,9 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 import os
 from pathlib import Path
 
+from celery.schedules import crontab
+from kombu import Queue
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -29,8 +32,19 @@ DEBUG = bool(os.environ.get("DEBUG", default=0))
 ALLOWED_HOSTS = os.environ.get("DJANGO_ALLOWED_HOSTS", "127.0.0.1").split(",")
 
 REST_FRAMEWORK = {
-    "EXCEPTION_HANDLER": "rest_framework.views.exception_handler"
+    "EXCEPTION_HANDLER": "rest_framework.views.exception_handler",
+    "DEFAULT_PAGINATION_CLASS": (
+        "rd_project.api.pagination.CreatedAtCursorPagination"
+    ),
+    "PAGE_SIZE": int(os.getenv("API_PAGE_SIZE", 100)),
+    # Token buckets per client, see rd_project.api.throttling.
+    "DEFAULT_THROTTLE_RATES": {
+        "tasks": os.getenv("API_TASKS_RATE", "50/s"),
+        "tasks_bulk": os.getenv("API_TASKS_BULK_RATE", "10/min"),
+    },
 }
+# Upper bound for the ``page_size`` query parameter of paginated lists.
+API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", 1000))
 
 
 # Application definition
@@ -50,6 +64,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "rd_project.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -93,6 +108,11 @@ DATABASES = {
         "PASSWORD": os.getenv("DATABASE_PASSWORD", "password"),
         "HOST": os.getenv("DATABASE_HOST", "127.0.0.1"),
         "PORT": os.getenv("DATABASE_PORT", 5432),
+        # Seconds to keep a connection open between tasks; the celery
+        # workers set it in docker-compose.yml. 0 closes it after each
+        # request or task.
+        "CONN_MAX_AGE": int(os.getenv("DATABASE_CONN_MAX_AGE", 0)),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
@@ -140,12 +160,238 @@ STATIC_ROOT = f"/{BASE_DIR}/../static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 
-CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
-        "LOCATION": "players",
+# Redis when CACHE_URL is set (e.g. redis://redis:6379/1), otherwise a
+# local-memory cache, which is what the tests run against.
+CACHE_URL = os.getenv("CACHE_URL")
+
+# Memoized results of identical computations, see rd_task.result_store.
+RESULT_STORE_ENABLED = bool(int(os.getenv("RESULT_STORE_ENABLED", 0)))
+RESULT_STORE_CACHE = "results"
+RESULT_STORE_TIMEOUT = int(os.getenv("RESULT_STORE_TIMEOUT", 24 * 60 * 60))
+RESULT_STORE_MAX_ENTRIES = int(os.getenv("RESULT_STORE_MAX_ENTRIES", 100000))
+
+if CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        },
+        RESULT_STORE_CACHE: {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+            "KEY_PREFIX": RESULT_STORE_CACHE,
+            "TIMEOUT": RESULT_STORE_TIMEOUT,
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+        RESULT_STORE_CACHE: {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": RESULT_STORE_CACHE,
+            "TIMEOUT": RESULT_STORE_TIMEOUT,
+            "OPTIONS": {"MAX_ENTRIES": RESULT_STORE_MAX_ENTRIES},
+        },
     }
+
+
+# Rate limiting and admission control of task submissions.
+API_RATE_LIMIT_ENABLED = bool(int(os.getenv("API_RATE_LIMIT_ENABLED", 1)))
+# Redis holding the token buckets; per process buckets when unset.
+API_RATE_LIMIT_URL = os.getenv("API_RATE_LIMIT_URL", CACHE_URL)
+# Submissions are rejected with a 503 above this many pending tasks or
+# queued broker messages; 0 disables the check.
+API_ADMISSION_MAX_PENDING = int(os.getenv("API_ADMISSION_MAX_PENDING", 100000))
+API_ADMISSION_MAX_QUEUED = int(os.getenv("API_ADMISSION_MAX_QUEUED", 0))
+# Seconds a web process reuses its last measure of the backlog.
+API_ADMISSION_CHECK_INTERVAL = float(
+    os.getenv("API_ADMISSION_CHECK_INTERVAL", 2)
+)
+# Retry-After of the 503 responses, in seconds.
+API_ADMISSION_RETRY_AFTER = int(os.getenv("API_ADMISSION_RETRY_AFTER", 30))
+
+
+# Task processing
+
+# Upper bound for the number of tasks accepted by one bulk request.
+TASK_BULK_MAX_SIZE = int(os.getenv("TASK_BULK_MAX_SIZE", 50000))
+# Rows per INSERT statement when bulk creating tasks.
+TASK_BULK_BATCH_SIZE = int(os.getenv("TASK_BULK_BATCH_SIZE", 1000))
+# Tasks per Celery message when dispatching bulk submissions.
+TASK_DISPATCH_CHUNK_SIZE = int(os.getenv("TASK_DISPATCH_CHUNK_SIZE", 500))
+# How bulk submissions are published: "batch" (add_many) or "chunks".
+TASK_DISPATCH_MODE = os.getenv("TASK_DISPATCH_MODE", "batch")
+# "outbox" writes new tasks to the outbox for relay_outbox to publish,
+# "direct" publishes them once the transaction commits.
+TASK_DISPATCH_BACKEND = os.getenv("TASK_DISPATCH_BACKEND", "outbox")
+# Outbox rows published per relay transaction.
+TASK_OUTBOX_BATCH_SIZE = int(os.getenv("TASK_OUTBOX_BATCH_SIZE", 1000))
+# Seconds the relay sleeps when the outbox is drained.
+TASK_OUTBOX_POLL_INTERVAL = float(os.getenv("TASK_OUTBOX_POLL_INTERVAL", 0.2))
+# Let add update the task and insert its result without loading it first
+# and drop the cached detail instead of rebuilding it.
+TASK_WORKER_FAST_PATH = bool(int(os.getenv("TASK_WORKER_FAST_PATH", 1)))
+# Batch size from which add_many computes the sums with NumPy.
+TASK_VECTORIZE_THRESHOLD = int(os.getenv("TASK_VECTORIZE_THRESHOLD", 64))
+# Rows fetched per round trip when streaming task exports.
+TASK_EXPORT_CHUNK_SIZE = int(os.getenv("TASK_EXPORT_CHUNK_SIZE", 2000))
+# Seconds a serialized task detail payload stays in the cache.
+TASK_DETAIL_CACHE_TIMEOUT = int(os.getenv("TASK_DETAIL_CACHE_TIMEOUT", 300))
+# Latest results embedded in the task detail; the rest are paginated under
+# /api/tasks/<id>/results/.
+TASK_DETAIL_RESULTS_LIMIT = int(os.getenv("TASK_DETAIL_RESULTS_LIMIT", 10))
+# Redis used to notify waiting clients of finished tasks. Notifications are
+# delivered in-process when empty.
+TASK_NOTIFICATIONS_URL = os.getenv("TASK_NOTIFICATIONS_URL", CACHE_URL)
+# Longest wait, in seconds, of the long-poll and the event stream endpoints.
+TASK_WAIT_MAX_TIMEOUT = int(os.getenv("TASK_WAIT_MAX_TIMEOUT", 60))
+TASK_EVENTS_MAX_TIMEOUT = int(os.getenv("TASK_EVENTS_MAX_TIMEOUT", 300))
+# Most tasks a single event stream can wait for.
+TASK_EVENTS_MAX_IDS = int(os.getenv("TASK_EVENTS_MAX_IDS", 1000))
+# What runs the task schedules: "beat" creates a django_celery_beat
+# PeriodicTask per schedule, "engine" leaves them to
+# rd_project.rd_task.schedulers.TaskScheduleScheduler.
+TASK_SCHEDULER = os.getenv("TASK_SCHEDULER", "beat")
+# Seconds between two incremental loads of changed schedules by the engine.
+TASK_SCHEDULER_SYNC_INTERVAL = int(
+    os.getenv("TASK_SCHEDULER_SYNC_INTERVAL", 5)
+)
+# Seconds of changes the engine reads again at every load, so schedules
+# saved in a transaction that commits later are not missed. Keep it above
+# the longest transaction writing schedules, e.g. an import_schedules run.
+TASK_SCHEDULER_SYNC_OVERLAP = int(
+    os.getenv("TASK_SCHEDULER_SYNC_OVERLAP", 300)
+)
+TASK_SCHEDULER_SYNC_CHUNK_SIZE = int(
+    os.getenv("TASK_SCHEDULER_SYNC_CHUNK_SIZE", 2000)
+)
+# Most runs the engine dispatches in a single tick.
+TASK_SCHEDULER_MAX_BATCH = int(os.getenv("TASK_SCHEDULER_MAX_BATCH", 10000))
+# Seconds (or one interval if longer) after which a scheduled run that has
+# not started is misfired: workers drop it instead of running it late.
+TASK_SCHEDULER_MISFIRE_GRACE = int(
+    os.getenv("TASK_SCHEDULER_MISFIRE_GRACE", 60)
+)
+# Missed runs replayed per schedule with the catch_up misfire policy.
+TASK_SCHEDULER_CATCH_UP_MAX = int(os.getenv("TASK_SCHEDULER_CATCH_UP_MAX", 10))
+# Missed runs the engine dispatches per second while catching up.
+TASK_SCHEDULER_CATCH_UP_RATE = int(
+    os.getenv("TASK_SCHEDULER_CATCH_UP_RATE", 1000)
+)
+
+# Task queues
+
+# Celery queue each task priority is routed to. Run dedicated workers per
+# queue so a bulk backlog never delays high priority tasks.
+TASK_PRIORITY_QUEUES = {
+    "high": os.getenv("TASK_QUEUE_HIGH", "high"),
+    "normal": os.getenv("TASK_QUEUE_NORMAL", "normal"),
+    "low": os.getenv("TASK_QUEUE_LOW", "low"),
 }
+CELERY_TASK_QUEUES = [Queue(name) for name in TASK_PRIORITY_QUEUES.values()]
+CELERY_TASK_DEFAULT_QUEUE = TASK_PRIORITY_QUEUES["normal"]
+# Messages a worker process reserves ahead. 1 keeps a long add_many batch
+# from holding back messages another process could start on.
+CELERY_WORKER_PREFETCH_MULTIPLIER = int(
+    os.getenv("CELERY_WORKER_PREFETCH_MULTIPLIER", 1)
+)
+
+# Lean task messages. TASK_LEAN_MESSAGES=1 turns all three on; each can
+# also be set on its own.
+TASK_LEAN_MESSAGES = bool(int(os.getenv("TASK_LEAN_MESSAGES", 0)))
+# Keep add and add_many results out of the Celery result backend; they are
+# saved on the task rows anyway.
+TASK_IGNORE_RESULT = bool(
+    int(os.getenv("TASK_IGNORE_RESULT", int(TASK_LEAN_MESSAGES)))
+)
+# Serializer of task messages. Workers accept both, so it can be switched
+# without draining the queues.
+CELERY_TASK_SERIALIZER = os.getenv(
+    "CELERY_TASK_SERIALIZER", "msgpack" if TASK_LEAN_MESSAGES else "json"
+)
+CELERY_ACCEPT_CONTENT = ["json", "msgpack"]
+# Compression of batched messages (add_many and add.chunks), e.g. zlib.
+TASK_BATCH_COMPRESSION = (
+    os.getenv("TASK_BATCH_COMPRESSION", "zlib" if TASK_LEAN_MESSAGES else "")
+    or None
+)
+
+# Worker autoscaling, see rd_task.autoscale and the autoscale_workers command.
+
+# Bounds of the autoscaled pool, in processes.
+TASK_AUTOSCALE_MIN = int(os.getenv("TASK_AUTOSCALE_MIN", 1))
+TASK_AUTOSCALE_MAX = int(os.getenv("TASK_AUTOSCALE_MAX", 8))
+# Seconds a message may wait in the queue before the pool grows.
+TASK_AUTOSCALE_TARGET_LATENCY = float(
+    os.getenv("TASK_AUTOSCALE_TARGET_LATENCY", 5)
+)
+# Processes removed per shrink.
+TASK_AUTOSCALE_STEP = int(os.getenv("TASK_AUTOSCALE_STEP", 1))
+# Seconds between two samples of the worker.
+TASK_AUTOSCALE_INTERVAL = float(os.getenv("TASK_AUTOSCALE_INTERVAL", 10))
+# Seconds after a resize before the pool may shrink again.
+TASK_AUTOSCALE_COOLDOWN = float(os.getenv("TASK_AUTOSCALE_COOLDOWN", 60))
+
+# Task results
+
+# Results older than this many days are folded into per-task rollups. The
+# latest result of every task is kept; 0 keeps everything.
+TASK_RESULT_RETENTION_DAYS = int(os.getenv("TASK_RESULT_RETENTION_DAYS", 30))
+# Results compacted per transaction.
+TASK_RESULT_COMPACTION_BATCH_SIZE = int(
+    os.getenv("TASK_RESULT_COMPACTION_BATCH_SIZE", 10000)
+)
+# Monthly TaskResult partitions created ahead of time on PostgreSQL.
+TASK_RESULT_PARTITIONS_AHEAD = int(
+    os.getenv("TASK_RESULT_PARTITIONS_AHEAD", 3)
+)
+
+# Task statistics, see rd_task.stats and /api/stats/.
+
+# Minutes of throughput served by the stats endpoint.
+TASK_STATS_WINDOW = int(os.getenv("TASK_STATS_WINDOW", 60))
+# Seconds between two resets of the status counters from the table.
+TASK_STATS_RECONCILE_INTERVAL = int(
+    os.getenv("TASK_STATS_RECONCILE_INTERVAL", 300)
+)
+
+# Sweeper of pending tasks whose message was lost, see rd_task.sweeper.
+
+# Seconds a one-off task stays pending, since it was created or last swept,
+# before it is published again. Keep it above the longest expected wait in
+# the queues.
+TASK_SWEEP_AGE = int(os.getenv("TASK_SWEEP_AGE", 900))
+# Tasks read and re-dispatched per batch.
+TASK_SWEEP_BATCH_SIZE = int(os.getenv("TASK_SWEEP_BATCH_SIZE", 1000))
+# Seconds between two sweeps.
+TASK_SWEEP_INTERVAL = int(os.getenv("TASK_SWEEP_INTERVAL", 60))
+
+CELERY_BEAT_SCHEDULE = {
+    "maintain-task-results": {
+        "task": "rd_project.rd_task.tasks.maintain_task_results",
+        "schedule": crontab(hour=3, minute=0),
+        "options": {"queue": TASK_PRIORITY_QUEUES["low"]},
+    },
+    "reconcile-task-stats": {
+        "task": "rd_project.rd_task.tasks.reconcile_task_stats",
+        "schedule": TASK_STATS_RECONCILE_INTERVAL,
+        "options": {"queue": TASK_PRIORITY_QUEUES["low"]},
+    },
+    "sweep-stale-tasks": {
+        "task": "rd_project.rd_task.tasks.sweep_stale_tasks",
+        "schedule": TASK_SWEEP_INTERVAL,
+        "options": {"queue": TASK_PRIORITY_QUEUES["low"]},
+    },
+}
+
+# Metrics
+
+# Share of requests and task runs whose SQL queries are counted.
+METRICS_SAMPLE_RATE = float(os.getenv("METRICS_SAMPLE_RATE", 0.1))
+# First port the Celery pool processes serve their metrics on, if set.
+METRICS_WORKER_PORT = int(os.getenv("METRICS_WORKER_PORT", 0)) or None
 
 LOGGING = {
     "version": 1,
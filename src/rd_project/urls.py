@@ -4,8 +4,11 @@ from django.contrib import admin
 from django.urls import include
 from django.urls import path
 
+from .metrics import metrics_view
+
 urlpatterns = [
     path("", include("rd_project.api.urls")),
     path("admin/", admin.site.urls),
+    path("metrics", metrics_view, name="metrics"),
     *static(settings.STATIC_URL, document_root=settings.STATIC_ROOT),
 ]
@@ -0,0 +1,137 @@
+import json
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+
+from rd_project.rd_task.models import Task
+from rd_project.rd_task.models import TaskOutbox
+from rd_project.rd_task.notifications import publish_task_done
+from rd_project.rd_task.tasks import add
+
+
+@pytest.mark.django_db
+class TestAsyncTaskViews:
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+
+    @pytest.fixture
+    def task(self):
+        return Task.objects.create(a=5, b=6)
+
+    @pytest.fixture(autouse=True)
+    def local_notifications(self, settings):
+        settings.TASK_NOTIFICATIONS_URL = None
+
+    async def consume(self, response):
+        return b"".join([chunk async for chunk in response]).decode()
+
+    def complete_later(self, task, delay=0.2):
+        def complete():
+            task.status = Task.SUCCESS
+            publish_task_done(task)
+
+        timer = threading.Timer(delay, complete)
+        timer.start()
+        return timer
+
+    def test_create_task(self, client, mocker):
+        apply_async = mocker.patch.object(add, "apply_async")
+        response = client.post(
+            "/api/async/tasks/",
+            {"a": 5, "b": 6},
+            content_type="application/json",
+        )
+        assert response.status_code == 201
+        task = Task.objects.get()
+        assert response.json()["id"] == str(task.id)
+        assert TaskOutbox.objects.get().task_id == task.id
+        apply_async.assert_not_called()
+
+    def test_create_task_direct(self, client, mocker, settings):
+        settings.TASK_DISPATCH_BACKEND = "direct"
+        apply_async = mocker.patch.object(add, "apply_async")
+        response = client.post(
+            "/api/async/tasks/",
+            {"a": 5, "b": 6},
+            content_type="application/json",
+        )
+        assert response.status_code == 201
+        task = Task.objects.get()
+        assert response.json()["id"] == str(task.id)
+        apply_async.assert_called_once_with(
+            (str(task.id), 5, 6, "add"), queue="normal"
+        )
+
+    def test_create_task_invalid(self, client, mocker):
+        apply_async = mocker.patch.object(add, "apply_async")
+        response = client.post(
+            "/api/async/tasks/", {"a": 5}, content_type="application/json"
+        )
+        assert response.status_code == 400
+        assert "b" in response.json()
+        apply_async.assert_not_called()
+
+    def test_retrieve_task(self, client, task):
+        task.mark_as_successfull(result=11)
+        response = client.get(f"/api/async/tasks/{task.pk}/")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["url"] == f"http://testserver/api/tasks/{task.pk}/"
+        assert data["results"][0]["result"] == 11
+
+    def test_retrieve_missing_task(self, client):
+        response = client.get(
+            "/api/async/tasks/00000000-0000-0000-0000-000000000000/"
+        )
+        assert response.status_code == 404
+
+    def test_task_status(self, client, task):
+        response = client.get(f"/api/async/tasks/{task.pk}/status/")
+        assert response.status_code == 200
+        assert response.json() == {"id": str(task.id), "status": Task.PENDING}
+
+    def test_wait_for_finished_task(self, client, task):
+        task.mark_as_successfull(result=11)
+        response = client.get(f"/api/async/tasks/{task.pk}/wait/")
+        assert response.json()["status"] == Task.SUCCESS
+
+    def test_wait_is_woken_by_notification(self, client, task):
+        timer = self.complete_later(task)
+        response = client.get(f"/api/async/tasks/{task.pk}/wait/?timeout=5")
+        timer.join()
+        assert response.status_code == 200
+        assert response.json() == {"id": str(task.id), "status": Task.SUCCESS}
+
+    def test_wait_times_out(self, client, task):
+        response = client.get(f"/api/async/tasks/{task.pk}/wait/?timeout=0.1")
+        assert response.json()["status"] == Task.PENDING
+
+    def test_events(self, client, task):
+        done = Task.objects.create(a=1, b=1)
+        done.mark_as_successfull(result=2)
+        response = client.get(
+            f"/api/async/tasks/events/?ids={task.pk},{done.pk}&timeout=5"
+        )
+        assert response["Content-Type"] == "text/event-stream"
+        timer = self.complete_later(task)
+        body = async_to_sync(self.consume)(response)
+        timer.join()
+        events = [
+            json.loads(line.removeprefix("data: "))
+            for line in body.splitlines()
+            if line.startswith('data: {"')
+        ]
+        assert events == [
+            {"id": str(done.id), "status": Task.SUCCESS},
+            {"id": str(task.id), "status": Task.SUCCESS},
+        ]
+        assert body.endswith("event: end\ndata: {}\n\n")
+
+    def test_events_invalid_ids(self, client):
+        response = client.get("/api/async/tasks/events/?ids=nope")
+        assert response.status_code == 400
+        response = client.get("/api/async/tasks/events/")
+        assert response.status_code == 400
@@ -0,0 +1,159 @@
+import pytest
+import redis
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from rd_project.api import throttling
+from rd_project.rd_task.models import Task
+from rd_project.rd_task.models import TaskSchedule
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+class TestTokenBucket:
+    def test_parse_rate(self):
+        assert throttling.parse_rate("120/min") == (2.0, 120)
+        assert throttling.parse_rate("5/s") == (5.0, 5)
+
+    def test_local_bucket(self, settings):
+        settings.API_RATE_LIMIT_URL = None
+        assert throttling.take_token("key", 1.0, 2) == 0
+        assert throttling.take_token("key", 1.0, 2) == 0
+        assert 0 < throttling.take_token("key", 1.0, 2) <= 1
+        assert throttling.take_token("other", 1.0, 2) == 0
+
+    def test_redis_unavailable(self, settings, mocker):
+        settings.API_RATE_LIMIT_URL = "redis://localhost:6379/1"
+        mocker.patch.object(
+            throttling,
+            "_redis_take_token",
+            side_effect=redis.ConnectionError,
+        )
+        assert throttling.take_token("key", 1.0, 1) == 0
+
+
+@pytest.mark.django_db
+class TestRateLimiting:
+    @pytest.fixture(autouse=True)
+    def rates(self, settings):
+        settings.API_RATE_LIMIT_URL = None
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            "DEFAULT_THROTTLE_RATES": {
+                "tasks": "2/min",
+                "tasks_bulk": "1/min",
+            },
+        }
+
+    def test_create_throttled(self, api_client):
+        for _ in range(2):
+            response = api_client.post("/api/tasks/", {"a": 1, "b": 2})
+            assert response.status_code == status.HTTP_201_CREATED
+        response = api_client.post("/api/tasks/", {"a": 1, "b": 2})
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert int(response["Retry-After"]) == 30
+        assert Task.objects.count() == 2
+
+    def test_buckets_per_client_and_scope(self, api_client):
+        for _ in range(2):
+            api_client.post("/api/tasks/", {"a": 1, "b": 2})
+        response = api_client.post(
+            "/api/tasks/", {"a": 1, "b": 2}, REMOTE_ADDR="10.0.0.2"
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        response = api_client.post(
+            "/api/tasks/bulk/", [{"a": 1, "b": 2}], format="json"
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        response = api_client.post(
+            "/api/tasks/bulk/", [{"a": 1, "b": 2}], format="json"
+        )
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    def test_reads_not_throttled(self, api_client):
+        for _ in range(3):
+            api_client.post("/api/tasks/", {"a": 1, "b": 2})
+        assert api_client.get("/api/tasks/").status_code == status.HTTP_200_OK
+
+    def test_disabled(self, api_client, settings):
+        settings.API_RATE_LIMIT_ENABLED = False
+        for _ in range(3):
+            response = api_client.post("/api/tasks/", {"a": 1, "b": 2})
+            assert response.status_code == status.HTTP_201_CREATED
+
+    def test_async_create_throttled(self, client):
+        for _ in range(2):
+            client.post(
+                "/api/async/tasks/",
+                {"a": 1, "b": 2},
+                content_type="application/json",
+            )
+        response = client.post(
+            "/api/async/tasks/",
+            {"a": 1, "b": 2},
+            content_type="application/json",
+        )
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert int(response["Retry-After"]) == 30
+
+
+@pytest.mark.django_db
+class TestAdmissionControl:
+    @pytest.fixture(autouse=True)
+    def limits(self, settings):
+        settings.API_ADMISSION_MAX_PENDING = 2
+        settings.API_ADMISSION_RETRY_AFTER = 15
+
+    def test_rejects_over_pending_limit(self, api_client):
+        Task.objects.bulk_create(Task(a=i, b=i) for i in range(3))
+        response = api_client.post("/api/tasks/", {"a": 1, "b": 2})
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response["Retry-After"] == "15"
+        response = api_client.post(
+            "/api/tasks/bulk/", [{"a": 1, "b": 2}], format="json"
+        )
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert Task.objects.count() == 3
+
+    def test_ignores_finished_and_scheduled_tasks(self, api_client):
+        Task.objects.create(a=1, b=2, status=Task.SUCCESS)
+        schedule = TaskSchedule.objects.create(
+            scheduled_at="2022-02-22T14:14:14Z", interval=10
+        )
+        Task.objects.create(a=1, b=2, schedule=schedule)
+        response = api_client.post("/api/tasks/", {"a": 1, "b": 2})
+        assert response.status_code == status.HTTP_201_CREATED
+
+    def test_backlog_measured_once_per_interval(
+        self, django_assert_num_queries
+    ):
+        assert not throttling.is_overloaded()
+        Task.objects.bulk_create(Task(a=i, b=i) for i in range(3))
+        with django_assert_num_queries(0):
+            assert not throttling.is_overloaded()
+        throttling.reset_admission()
+        assert throttling.is_overloaded()
+
+    def test_queue_length_limit(self, settings, mocker):
+        settings.API_ADMISSION_MAX_PENDING = 0
+        settings.API_ADMISSION_MAX_QUEUED = 100
+        queue_length = mocker.patch.object(
+            throttling, "queue_length", return_value=101
+        )
+        assert throttling.is_overloaded()
+        throttling.reset_admission()
+        queue_length.side_effect = OSError
+        assert not throttling.is_overloaded()
+
+    def test_async_create_rejected(self, client):
+        Task.objects.bulk_create(Task(a=i, b=i) for i in range(3))
+        response = client.post(
+            "/api/async/tasks/",
+            {"a": 1, "b": 2},
+            content_type="application/json",
+        )
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response["Retry-After"] == "15"
@@ -1,11 +1,28 @@
+import json
+from datetime import timedelta
+
 import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django_celery_beat.models import IntervalSchedule
 from django_celery_beat.models import PeriodicTask
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from rd_project.api.cache import get_task_detail
+from rd_project.api.serializers import TaskSerializer
+from rd_project.celery import app as celery_app
+from rd_project.rd_task import dispatch
+from rd_project.rd_task.dispatch import relay_outbox
 from rd_project.rd_task.models import Task
+from rd_project.rd_task.models import TaskOutbox
+from rd_project.rd_task.models import TaskResult
+from rd_project.rd_task.models import TaskResultRollup
 from rd_project.rd_task.models import TaskSchedule
+from rd_project.rd_task.result_store import set_result
+from rd_project.rd_task.tasks import add
 
 
 @pytest.mark.django_db
@@ -38,6 +55,134 @@ class TestTaskScheduleViewSet:
         assert IntervalSchedule.objects.count() == 1
         assert PeriodicTask.objects.count() == 1
 
+    def test_create_task_schedule_priority(self, api_client):
+        data = {
+            "a": 5,
+            "b": 4,
+            "priority": "high",
+            "scheduled_at": "2022-02-22T14:14:14",
+            "interval": 50,
+        }
+        response = api_client.post("/api/task-schedules/", data)
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["task"]["priority"] == "high"
+        assert PeriodicTask.objects.get().queue == "high"
+
+    def test_create_task_schedule_operation(self, api_client):
+        data = {
+            "operation": "multiply",
+            "a": 5,
+            "b": 4,
+            "scheduled_at": "2022-02-22T14:14:14",
+            "interval": 50,
+        }
+        response = api_client.post("/api/task-schedules/", data)
+        assert response.status_code == status.HTTP_201_CREATED
+        task = Task.objects.get()
+        assert task.operation == "multiply"
+        assert json.loads(PeriodicTask.objects.get().args) == [
+            str(task.id),
+            5,
+            4,
+            "multiply",
+        ]
+
+    @pytest.mark.parametrize("misfire_policy", ["skip", "catch_up"])
+    def test_create_task_schedule_misfire_policy(
+        self, api_client, settings, misfire_policy
+    ):
+        settings.TASK_SCHEDULER = "engine"
+        data = {
+            "a": 5,
+            "b": 4,
+            "scheduled_at": "2022-02-22T14:14:14",
+            "interval": 50,
+            "misfire_policy": misfire_policy,
+        }
+        response = api_client.post("/api/task-schedules/", data)
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["misfire_policy"] == misfire_policy
+
+    @pytest.mark.parametrize("misfire_policy", ["skip", "catch_up"])
+    def test_beat_only_coalesces(self, api_client, misfire_policy):
+        data = {
+            "a": 5,
+            "b": 4,
+            "scheduled_at": "2022-02-22T14:14:14",
+            "interval": 50,
+            "misfire_policy": misfire_policy,
+        }
+        response = api_client.post("/api/task-schedules/", data)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "misfire_policy" in response.data
+        assert not TaskSchedule.objects.exists()
+
+    def test_create_task_schedule_unknown_misfire_policy(self, api_client):
+        data = {
+            "a": 5,
+            "b": 4,
+            "scheduled_at": "2022-02-22T14:14:14",
+            "interval": 50,
+            "misfire_policy": "later",
+        }
+        response = api_client.post("/api/task-schedules/", data)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "misfire_policy" in response.data
+
+    def test_bulk_create_task_schedules(self, api_client):
+        data = [
+            {
+                "a": i,
+                "b": 1,
+                "scheduled_at": "2022-02-22T14:14:14Z",
+                "interval": 50,
+            }
+            for i in range(3)
+        ]
+        response = api_client.post(
+            "/api/task-schedules/bulk/", data, format="json"
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["count"] == 3
+        assert set(response.data["ids"]) == {
+            str(pk) for pk in TaskSchedule.objects.values_list("pk", flat=True)
+        }
+        assert Task.objects.count() == 3
+        assert IntervalSchedule.objects.count() == 1
+        assert PeriodicTask.objects.count() == 3
+
+    def test_bulk_create_task_schedules_ndjson(self, api_client):
+        body = "\n".join(
+            json.dumps(
+                {
+                    "a": i,
+                    "b": 1,
+                    "scheduled_at": "2022-02-22T14:14:14Z",
+                    "interval": 10 * (i + 1),
+                }
+            )
+            for i in range(2)
+        )
+        response = api_client.post(
+            "/api/task-schedules/bulk/",
+            body,
+            content_type="application/x-ndjson",
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        assert IntervalSchedule.objects.count() == 2
+
+    def test_bulk_create_task_schedules_invalid(self, api_client):
+        data = [
+            {"a": 1, "b": 1, "scheduled_at": "2022-02-22", "interval": 5},
+            {"a": 1, "scheduled_at": "2022-02-22", "interval": 5},
+        ]
+        response = api_client.post(
+            "/api/task-schedules/bulk/", data, format="json"
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "b" in response.data[1]
+        assert not TaskSchedule.objects.exists()
+
     def test_update_task_schedule(self, api_client, task_schedule):
         task_schedule.schedule_celery_beat_task()
         data = {
@@ -57,6 +202,23 @@ class TestTaskScheduleViewSet:
         assert IntervalSchedule.objects.count() == 1
         assert PeriodicTask.objects.count() == 1
 
+    def test_update_task_schedule_invalidates_task_cache(
+        self, api_client, task_schedule
+    ):
+        task_schedule.schedule_celery_beat_task()
+        api_client.get(f"/api/tasks/{task_schedule.task.pk}/")
+        assert get_task_detail(task_schedule.task.pk) is not None
+        data = {
+            "a": 6,
+            "b": 6,
+            "scheduled_at": "2022-02-22T14:14:14",
+            "interval": 10,
+        }
+        api_client.put(f"/api/task-schedules/{task_schedule.pk}/", data)
+        assert get_task_detail(task_schedule.task.pk) is None
+        response = api_client.get(f"/api/tasks/{task_schedule.task.pk}/")
+        assert response.data["a"] == 6
+
     def test_delete_task_schedule(self, api_client, task_schedule):
         task_schedule.schedule_celery_beat_task()
         response = api_client.delete(
@@ -68,6 +230,31 @@ class TestTaskScheduleViewSet:
         assert IntervalSchedule.objects.count() == 0
         assert PeriodicTask.objects.count() == 0
 
+    def test_list_task_schedules(self, api_client, task_schedule):
+        response = api_client.get("/api/task-schedules/")
+        assert response.status_code == status.HTTP_200_OK
+        assert "next" in response.data
+        assert len(response.data["results"]) == 1
+
+    @pytest.mark.parametrize("size", [1, 20])
+    def test_list_task_schedules_query_count(self, api_client, size):
+        for _ in range(size):
+            schedule = TaskSchedule.objects.create(
+                scheduled_at="2022-02-20T14:24:34Z", interval=30
+            )
+            Task.objects.create(a=1, b=2, schedule=schedule)
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get("/api/task-schedules/")
+        assert len(response.data["results"]) == size
+        assert len(queries) == 1
+
+    def test_list_task_schedules_matches_detail(
+        self, api_client, task_schedule
+    ):
+        listed = api_client.get("/api/task-schedules/").data["results"][0]
+        detail = api_client.get(f"/api/task-schedules/{task_schedule.pk}/")
+        assert listed == detail.data
+
     def test_retrieve_task_schedule(self, api_client, task_schedule):
         response = api_client.get(f"/api/task-schedules/{task_schedule.pk}/")
         assert response.status_code == status.HTTP_200_OK
@@ -84,6 +271,16 @@ class TestTaskViewSet:
     def task(self):
         return Task.objects.create(a=5, b=6)
 
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+
+    @pytest.fixture
+    def eager_celery(self):
+        celery_app.conf.task_always_eager = True
+        yield
+        celery_app.conf.task_always_eager = False
+
     def test_create_task(self, api_client):
         data = {"a": 5, "b": 6}
         response = api_client.post("/api/tasks/", data)
@@ -92,13 +289,363 @@ class TestTaskViewSet:
         assert Task.objects.get().a == 5
         assert Task.objects.get().b == 6
 
+    def test_create_task_operation(self, api_client):
+        data = {"operation": "multiply", "a": 5, "b": 6}
+        response = api_client.post("/api/tasks/", data)
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["operation"] == "multiply"
+        assert Task.objects.get().operation == "multiply"
+
+    def test_create_task_unknown_operation(self, api_client):
+        data = {"operation": "divide", "a": 5, "b": 6}
+        response = api_client.post("/api/tasks/", data)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "operation" in response.data
+        assert not Task.objects.exists()
+
+    def test_create_task_from_result_store(self, api_client, mocker, settings):
+        settings.RESULT_STORE_ENABLED = True
+        apply_async = mocker.patch.object(add, "apply_async")
+        set_result("add", (5, 6), 11)
+        response = api_client.post("/api/tasks/", {"a": 5, "b": 6})
+        assert response.status_code == status.HTTP_201_CREATED
+        relay_outbox()
+        apply_async.assert_not_called()
+        assert Task.objects.get().status == Task.SUCCESS
+
+    def test_relayed_result_store_hit_refreshes_readers(
+        self, api_client, mocker, settings
+    ):
+        settings.RESULT_STORE_ENABLED = True
+        mocker.patch.object(add, "apply_async")
+        publish = mocker.spy(dispatch, "publish_tasks_done")
+        set_result("add", (5, 6), 11)
+        task_id = api_client.post("/api/tasks/", {"a": 5, "b": 6}).data["id"]
+        response = api_client.get(f"/api/tasks/{task_id}/")
+        assert response.data["status"] == Task.PENDING
+        relay_outbox()
+        response = api_client.get(f"/api/tasks/{task_id}/")
+        assert response.data["status"] == Task.SUCCESS
+        (done,) = publish.call_args.args
+        assert [str(task.id) for task in done] == [task_id]
+
+    def test_result_store_stats(self, api_client):
+        response = api_client.get("/api/result-store/")
+        assert response.status_code == status.HTTP_200_OK
+        assert set(response.data) == {"enabled", "hits", "misses", "hit_ratio"}
+
+    def test_task_stats(
+        self, api_client, settings, task, django_assert_num_queries
+    ):
+        settings.TASK_STATS_WINDOW = 10
+        task.mark_as_successfull(result=11)
+        Task.objects.create(a=1, b=1)
+        # The first read counts the table, later ones only hit the cache.
+        response = api_client.get("/api/stats/")
+        assert response.status_code == status.HTTP_200_OK
+        with django_assert_num_queries(0):
+            response = api_client.get("/api/stats/")
+        assert response.data["counts"] == {
+            "PENDING": 1,
+            "SUCCESS": 1,
+            "FAILED": 0,
+        }
+        assert response.data["reconciled_at"] is not None
+        assert len(response.data["throughput"]) == 10
+        assert response.data["throughput"][-1]["SUCCESS"] == 1
+
     def test_retrieve_task(self, api_client, task):
         response = api_client.get(f"/api/tasks/{task.pk}/")
         assert response.status_code == status.HTTP_200_OK
         assert response.data["a"] == task.a
         assert response.data["b"] == task.b
 
+    def create_results(self, task, values):
+        start = timezone.now() - timedelta(minutes=1)
+        for seconds, value in enumerate(values):
+            result = TaskResult.objects.create(task=task, result=value)
+            TaskResult.objects.filter(id=result.id).update(
+                created_at=start + timedelta(seconds=seconds)
+            )
+
+    def test_retrieve_task_latest_results_and_summary(
+        self, api_client, task, settings
+    ):
+        settings.TASK_DETAIL_RESULTS_LIMIT = 2
+        self.create_results(task, [4, 9, 1])
+        TaskResultRollup.objects.create(
+            task=task, count=5, total=50, minimum=0, maximum=20
+        )
+        response = api_client.get(f"/api/tasks/{task.pk}/")
+        assert [item["result"] for item in response.data["results"]] == [1, 9]
+        summary = response.data["results_summary"]
+        assert summary["count"] == 8
+        assert (summary["minimum"], summary["maximum"]) == (0, 20)
+        assert summary["last_result"] == 1
+        assert (
+            summary["last_run_at"] == response.data["results"][0]["created_at"]
+        )
+
+    def test_retrieve_task_without_results(self, api_client, task):
+        response = api_client.get(f"/api/tasks/{task.pk}/")
+        assert response.data["results"] == []
+        assert response.data["results_summary"] == {
+            "count": 0,
+            "minimum": None,
+            "maximum": None,
+            "last_result": None,
+            "last_run_at": None,
+        }
+
+    def test_list_task_results(self, api_client, task):
+        self.create_results(task, range(5))
+        other = Task.objects.create(a=1, b=1)
+        other.mark_as_successfull(result=2)
+        url = f"/api/tasks/{task.pk}/results/?page_size=2"
+        results = []
+        while url:
+            response = api_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            results += [item["result"] for item in response.data["results"]]
+            url = response.data["next"]
+        assert results == [4, 3, 2, 1, 0]
+
+    def test_list_task_results_missing_task(self, api_client):
+        response = api_client.get(
+            "/api/tasks/00000000-0000-0000-0000-000000000000/results/"
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_retrieve_task_is_cached(self, api_client, task):
+        url = f"/api/tasks/{task.pk}/"
+        first = api_client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            second = api_client.get(url)
+        assert len(queries) == 0
+        assert second.data == first.data
+        assert second.data["url"] == f"http://testserver{url}"
+
+    def test_retrieve_task_populated_by_worker(self, api_client, task):
+        api_client.get(f"/api/tasks/{task.pk}/")
+        add.apply(args=(str(task.id), task.a, task.b))
+        response = api_client.get(f"/api/tasks/{task.pk}/")
+        assert response.data["status"] == Task.SUCCESS
+        assert response.data["results"][0]["result"] == 11
+
+    def test_retrieve_missing_task(self, api_client):
+        response = api_client.get("/api/tasks/not-a-uuid/")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
     def test_list_tasks(self, api_client, task):
         response = api_client.get("/api/tasks/")
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == 1
+        assert len(response.data["results"]) == 1
+
+    def test_list_tasks_matches_serializer(self, api_client, task):
+        listed = api_client.get("/api/tasks/").data["results"][0]
+        request = api_client.get("/api/tasks/").wsgi_request
+        expected = TaskSerializer(task, context={"request": request}).data
+        assert listed == expected
+
+    def test_list_tasks_query_count(self, api_client):
+        schedule = TaskSchedule.objects.create(
+            scheduled_at="2022-02-20T14:24:34Z", interval=30
+        )
+        Task.objects.create(a=1, b=2, schedule=schedule)
+        for task in Task.objects.bulk_create(Task(a=i, b=i) for i in range(5)):
+            task.mark_as_successfull(result=1)
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get("/api/tasks/")
+        assert len(response.data["results"]) == 6
+        assert len(queries) == 1
+
+    def test_list_tasks_cursor_pagination(self, api_client):
+        Task.objects.bulk_create(Task(a=i, b=i) for i in range(5))
+        ids = []
+        url = "/api/tasks/?page_size=2"
+        while url:
+            response = api_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            assert len(response.data["results"]) <= 2
+            ids += [item["id"] for item in response.data["results"]]
+            url = response.data["next"]
+        expected = Task.objects.order_by("-created_at", "-id")
+        assert ids == [str(pk) for pk in expected.values_list("id", flat=True)]
+
+    def test_list_tasks_same_created_at(self, api_client):
+        tasks = Task.objects.bulk_create(Task(a=i, b=i) for i in range(7))
+        Task.objects.update(created_at=tasks[0].created_at)
+        expected = [
+            str(pk)
+            for pk in Task.objects.order_by("-created_at", "-id").values_list(
+                "id", flat=True
+            )
+        ]
+        pages = []
+        url = "/api/tasks/?page_size=3"
+        while url:
+            response = api_client.get(url)
+            pages.append([item["id"] for item in response.data["results"]])
+            url = response.data["next"]
+        assert [pk for page in pages for pk in page] == expected
+        # Walking back from the last page returns the same pages.
+        url = response.data["previous"]
+        for page in reversed(pages[:-1]):
+            response = api_client.get(url)
+            assert [item["id"] for item in response.data["results"]] == page
+            url = response.data["previous"]
+        assert url is None
+
+    def test_list_tasks_invalid_cursor(self, api_client):
+        response = api_client.get("/api/tasks/?cursor=cD1ub3BlfA%3D%3D")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_list_tasks_max_page_size(self, api_client, settings):
+        settings.API_MAX_PAGE_SIZE = 2
+        Task.objects.bulk_create(Task(a=i, b=i) for i in range(5))
+        response = api_client.get("/api/tasks/?page_size=100")
+        assert len(response.data["results"]) == 2
+
+    def test_create_task_writes_outbox(self, api_client, mocker):
+        apply_async = mocker.patch.object(add, "apply_async")
+        response = api_client.post("/api/tasks/", {"a": 5, "b": 6})
+        assert response.status_code == status.HTTP_201_CREATED
+        assert TaskOutbox.objects.get().task_id == Task.objects.get().id
+        apply_async.assert_not_called()
+
+    def test_create_task_priority(self, api_client):
+        response = api_client.post(
+            "/api/tasks/", {"a": 5, "b": 6, "priority": "high"}
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["priority"] == Task.HIGH
+        assert Task.objects.get().priority == Task.HIGH
+
+    def test_create_task_invalid_priority(self, api_client):
+        response = api_client.post(
+            "/api/tasks/", {"a": 5, "b": 6, "priority": "urgent"}
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "priority" in response.data
+
+    def test_create_task_direct_dispatch_on_commit(
+        self, api_client, mocker, settings, django_capture_on_commit_callbacks
+    ):
+        settings.TASK_DISPATCH_BACKEND = "direct"
+        apply_async = mocker.patch.object(add, "apply_async")
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            response = api_client.post("/api/tasks/", {"a": 5, "b": 6})
+            apply_async.assert_not_called()
+        assert response.status_code == status.HTTP_201_CREATED
+        assert len(callbacks) == 1
+        apply_async.assert_called_once_with(
+            (response.data["id"], 5, 6, "add"), queue="normal"
+        )
+        assert not TaskOutbox.objects.exists()
+
+    def test_bulk_create_tasks(self, api_client, eager_celery):
+        data = [{"a": i, "b": i} for i in range(10)]
+        response = api_client.post("/api/tasks/bulk/", data, format="json")
+        assert response.status_code == status.HTTP_201_CREATED
+        assert relay_outbox() == 10
+        assert response.data["count"] == 10
+        assert Task.objects.count() == 10
+        assert set(response.data["ids"]) == {
+            str(pk) for pk in Task.objects.values_list("id", flat=True)
+        }
+        assert all(
+            task.status == Task.SUCCESS
+            and task.results.get().result == task.a + task.b
+            for task in Task.objects.all()
+        )
+
+    def test_bulk_create_tasks_default_to_low_priority(self, api_client):
+        data = [{"a": 1, "b": 1}, {"a": 2, "b": 2, "priority": "high"}]
+        response = api_client.post("/api/tasks/bulk/", data, format="json")
+        assert response.status_code == status.HTTP_201_CREATED
+        priorities = Task.objects.order_by("a").values_list(
+            "priority", flat=True
+        )
+        assert list(priorities) == [Task.LOW, Task.HIGH]
+
+    def test_bulk_create_tasks_chunks_dispatch(self, api_client, eager_celery):
+        data = [{"a": i, "b": 2} for i in range(5)]
+        response = api_client.post(
+            "/api/tasks/bulk/?dispatch=chunks", data, format="json"
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        assert set(TaskOutbox.objects.values_list("mode", flat=True)) == {
+            "chunks"
+        }
+        relay_outbox()
+        assert not Task.objects.exclude(status=Task.SUCCESS).exists()
+
+    def test_bulk_create_tasks_unknown_dispatch(self, api_client):
+        response = api_client.post(
+            "/api/tasks/bulk/?dispatch=nope", [{"a": 1, "b": 2}], format="json"
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert Task.objects.count() == 0
+
+    def test_bulk_create_tasks_ndjson(self, api_client):
+        body = "\n".join(json.dumps({"a": i, "b": 1}) for i in range(3))
+        response = api_client.post(
+            "/api/tasks/bulk/", body, content_type="application/x-ndjson"
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Task.objects.count() == 3
+        assert TaskOutbox.objects.count() == 3
+
+    def test_bulk_create_tasks_invalid(self, api_client):
+        data = [{"a": 1, "b": 2}, {"a": "x"}]
+        response = api_client.post("/api/tasks/bulk/", data, format="json")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert Task.objects.count() == 0
+        assert not TaskOutbox.objects.exists()
+
+    def test_bulk_create_tasks_batches_inserts(self, api_client, settings):
+        settings.TASK_BULK_BATCH_SIZE = 50
+        data = [{"a": i, "b": i} for i in range(200)]
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.post("/api/tasks/bulk/", data, format="json")
+        assert response.status_code == status.HTTP_201_CREATED
+        inserts = [
+            q
+            for q in queries
+            if q["sql"].startswith('INSERT INTO "rd_task_task"')
+        ]
+        assert len(inserts) == 4
+
+    def test_export_tasks_ndjson(self, api_client, task):
+        task.mark_as_successfull(result=11)
+        Task.objects.create(a=1, b=1)
+        response = api_client.get("/api/tasks/export/")
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "application/x-ndjson"
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).splitlines()
+        ]
+        assert len(rows) == 2
+        assert rows[0]["id"] == str(task.id)
+        assert rows[0]["result"] == 11
+        assert rows[1]["result"] is None
+
+    def test_export_tasks_csv_with_filters(self, api_client, task):
+        task.mark_as_successfull(result=11)
+        Task.objects.create(a=1, b=1)
+        response = api_client.get(
+            "/api/tasks/export/",
+            {"export_format": "csv", "status": Task.SUCCESS},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        assert lines[0].startswith("id,operation,a,b,status")
+        assert len(lines) == 2
+        assert lines[1].startswith(f"{task.id},add,5,6,SUCCESS")
+
+    def test_export_tasks_invalid_filter(self, api_client):
+        response = api_client.get(
+            "/api/tasks/export/", {"created_after": "yesterday"}
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
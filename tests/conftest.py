@@ -0,0 +1,11 @@
+import pytest
+
+from rd_project.api.throttling import reset_admission
+from rd_project.api.throttling import reset_local_buckets
+
+
+@pytest.fixture(autouse=True)
+def _reset_throttling():
+    # Token buckets and the backlog measure are kept per process.
+    reset_local_buckets()
+    reset_admission()
@@ -0,0 +1,162 @@
+import json
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from rd_project.rd_task.autoscale import AutoscalePolicy
+from rd_project.rd_task.autoscale import Autoscaler
+from rd_project.rd_task.autoscale import CeleryPool
+from rd_project.rd_task.autoscale import Sample
+from rd_project.rd_task.autoscale import bursty_workload
+from rd_project.rd_task.autoscale import simulate
+from rd_project.rd_task.models import Task
+
+
+def sample(queue_length=0, age=0.0, throughput=0.0, busy=0, size=2):
+    return Sample(queue_length, age, throughput, busy, size)
+
+
+class TestAutoscalePolicy:
+    @pytest.fixture
+    def policy(self):
+        return AutoscalePolicy(min_size=1, max_size=10, target_latency=5)
+
+    def test_grows_to_drain_backlog(self, policy):
+        # 2 processes complete 4 messages/s: 20 waiting need 2 more.
+        assert policy.desired_size(sample(20, 1, 4.0, 2, 2)) == 4
+
+    def test_grows_without_throughput(self, policy):
+        assert policy.desired_size(sample(5, 1, 0.0, 2, 2)) == 3
+
+    def test_grows_when_tasks_wait_too_long(self, policy):
+        assert policy.desired_size(sample(1, 30, 100.0, 2, 2)) == 3
+
+    def test_keeps_busy_pool(self, policy):
+        assert policy.desired_size(sample(0, 0, 4.0, 2, 2)) == 2
+
+    def test_shrinks_idle_pool(self, policy):
+        assert policy.desired_size(sample(0, 0, 1.0, 1, 3)) == 2
+
+    def test_bounds(self, policy):
+        assert policy.desired_size(sample(1000, 60, 1.0, 1, 1)) == 10
+        assert policy.desired_size(sample(0, 0, 0.0, 0, 1)) == 1
+
+
+class FakePool:
+    def __init__(self, samples):
+        self.samples = iter(samples)
+        self.resizes = []
+
+    def sample(self):
+        return next(self.samples)
+
+    def resize(self, current, target):
+        self.resizes.append((current, target))
+
+
+class TestAutoscaler:
+    def test_shrink_waits_for_cooldown(self):
+        policy = AutoscalePolicy(min_size=1, max_size=10, target_latency=5)
+        now = [0]
+        pool = FakePool([sample(5, size=2), sample(size=3), sample(size=3)])
+        autoscaler = Autoscaler(policy, pool, 60, clock=lambda: now[0])
+        assert autoscaler.tick() == 3
+        now[0] = 30
+        assert autoscaler.tick() == 3
+        now[0] = 60
+        assert autoscaler.tick() == 2
+        assert pool.resizes == [(2, 3), (3, 2)]
+
+    def test_skips_missing_sample(self):
+        policy = AutoscalePolicy(min_size=1, max_size=10, target_latency=5)
+        pool = FakePool([None])
+        assert Autoscaler(policy, pool, 60).tick() is None
+        assert pool.resizes == []
+
+
+@pytest.mark.django_db
+class TestCeleryPool:
+    @pytest.fixture
+    def app(self, mocker):
+        app = mocker.MagicMock()
+        inspect = app.control.inspect.return_value
+        inspect.stats.return_value = {
+            "w@host": {
+                "total": {"add": 10, "add_many": 5},
+                "pool": {"processes": [1, 2, 3]},
+            }
+        }
+        inspect.active.return_value = {"w@host": [{}, {}]}
+        return app
+
+    def test_sample(self, app, mocker):
+        now = [0]
+        pool = CeleryPool(app, "w@host", ["high"], clock=lambda: now[0])
+        mocker.patch.object(pool, "queue_length", return_value=7)
+        first = pool.sample()
+        assert first == Sample(7, 0.0, 0.0, 2, 3)
+        app.control.inspect.return_value.stats.return_value["w@host"]["total"][
+            "add"
+        ] = 40
+        now[0] = 10
+        assert pool.sample().throughput == 3.0
+
+    def test_sample_without_reply(self, app):
+        app.control.inspect.return_value.stats.return_value = None
+        assert CeleryPool(app, "w@host", ["high"]).sample() is None
+
+    def test_oldest_pending_age(self, app):
+        old = Task.objects.create(a=1, b=2, priority=Task.HIGH)
+        Task.objects.filter(id=old.id).update(
+            created_at=timezone.now() - timedelta(seconds=90)
+        )
+        Task.objects.create(a=1, b=2, priority=Task.HIGH)
+        low = Task.objects.create(a=1, b=2, priority=Task.LOW)
+        Task.objects.filter(id=low.id).update(
+            created_at=timezone.now() - timedelta(seconds=900)
+        )
+        age = CeleryPool(app, "w@host", ["high"]).oldest_pending_age()
+        assert 90 <= age < 100
+
+    def test_resize(self, app):
+        pool = CeleryPool(app, "w@host", ["high"])
+        pool.resize(2, 5)
+        app.control.pool_grow.assert_called_once_with(
+            3, destination=["w@host"]
+        )
+        pool.resize(5, 4)
+        app.control.pool_shrink.assert_called_once_with(
+            1, destination=["w@host"]
+        )
+
+
+class TestSimulation:
+    def test_autoscaled_pool(self):
+        workload = bursty_workload(1200, 2, 12, 300, 30)
+        policy = AutoscalePolicy(min_size=1, max_size=8, target_latency=5)
+        autoscaled = simulate(policy, workload, 0.5, 10, 60)
+        small = simulate(AutoscalePolicy(1, 1, 5), workload, 0.5, 10, 60)
+        large = simulate(AutoscalePolicy(8, 8, 5), workload, 0.5, 10, 60)
+        assert autoscaled["backlog"] == 0
+        assert autoscaled["p95_latency"] < small["p95_latency"]
+        assert autoscaled["process_seconds"] < large["process_seconds"]
+
+    def test_command(self):
+        out = StringIO()
+        call_command(
+            "autoscale_workers", "--simulate", "--duration=600", stdout=out
+        )
+        reports = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert [report["pool"] for report in reports] == [
+            "autoscaled",
+            "fixed-1",
+            "fixed-8",
+        ]
+
+    def test_command_requires_worker(self):
+        with pytest.raises(CommandError):
+            call_command("autoscale_workers", "--once")
@@ -0,0 +1,130 @@
+import json
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils import timezone
+from django_celery_beat.models import PeriodicTask
+
+from rd_project.rd_task.dispatch import enqueue_tasks
+from rd_project.rd_task.models import Task
+from rd_project.rd_task.models import TaskOutbox
+from rd_project.rd_task.models import TaskResult
+from rd_project.rd_task.models import TaskSchedule
+
+
+@pytest.mark.django_db
+class TestExportTasksCommand:
+    def test_export_ndjson(self):
+        task = Task.objects.create(a=1, b=2)
+        task.mark_as_successfull(result=3)
+        Task.objects.create(a=4, b=5)
+        out = StringIO()
+        call_command("export_tasks", stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert [row["result"] for row in rows] == [3, None]
+
+    def test_export_csv_status_filter(self, tmp_path):
+        Task.objects.create(a=1, b=2).mark_as_failed("boom")
+        Task.objects.create(a=4, b=5)
+        output = tmp_path / "tasks.csv"
+        call_command(
+            "export_tasks",
+            "--format=csv",
+            "--status=FAILED",
+            f"--output={output}",
+        )
+        lines = output.read_text().splitlines()
+        assert len(lines) == 2
+        assert "FAILED" in lines[1]
+        assert "boom" in lines[1]
+
+
+@pytest.mark.django_db
+class TestRelayOutboxCommand:
+    def test_relay_once(self, mocker):
+        dispatch_tasks = mocker.patch(
+            "rd_project.rd_task.dispatch.dispatch_tasks"
+        )
+        enqueue_tasks(
+            Task.objects.bulk_create(Task(a=i, b=i) for i in range(5))
+        )
+        out = StringIO()
+        call_command("relay_outbox", "--once", "--batch-size=2", stdout=out)
+        assert out.getvalue().strip() == "Relayed 5 tasks."
+        assert dispatch_tasks.call_count == 3
+        assert not TaskOutbox.objects.exists()
+
+
+@pytest.mark.django_db
+class TestCompactResultsCommand:
+    def test_compact(self):
+        task = Task.objects.create(a=1, b=1)
+        TaskResult.objects.bulk_create(
+            TaskResult(task=task, result=2) for _ in range(3)
+        )
+        TaskResult.objects.update(
+            created_at=timezone.now() - timedelta(days=10)
+        )
+        TaskResult.objects.create(task=task, result=2)
+        out = StringIO()
+        call_command("compact_results", "--days=5", stdout=out)
+        assert out.getvalue().strip() == "Compacted 3 results."
+        assert task.rollup.count == 3
+
+
+@pytest.mark.django_db
+class TestImportSchedulesCommand:
+    def test_import_ndjson(self, tmp_path):
+        source = tmp_path / "schedules.ndjson"
+        source.write_text(
+            "\n".join(
+                json.dumps(
+                    {
+                        "a": i,
+                        "b": i,
+                        "operation": "multiply",
+                        "scheduled_at": "2022-02-22T14:14:14Z",
+                        "interval": 60,
+                    }
+                )
+                for i in range(5)
+            )
+        )
+        out = StringIO()
+        call_command(
+            "import_schedules", str(source), "--batch-size=2", stdout=out
+        )
+        assert out.getvalue().startswith("Imported 5 schedules in")
+        assert TaskSchedule.objects.count() == 5
+        assert Task.objects.filter(operation="multiply").count() == 5
+        assert PeriodicTask.objects.count() == 5
+
+    def test_import_csv(self, tmp_path):
+        source = tmp_path / "schedules.csv"
+        source.write_text(
+            "scheduled_at,interval,a,b,priority\n"
+            "2022-02-22T14:14:14Z,60,1,2,high\n"
+            "2022-02-22T14:14:14Z,30,3,4,low\n"
+        )
+        call_command(
+            "import_schedules", str(source), "--format=csv", stdout=StringIO()
+        )
+        assert sorted(Task.objects.values_list("priority", flat=True)) == [
+            "high",
+            "low",
+        ]
+
+    def test_invalid_row_imports_nothing(self, tmp_path):
+        source = tmp_path / "schedules.ndjson"
+        rows = [
+            {"a": 1, "b": 2, "scheduled_at": "2022-02-22", "interval": 5},
+            {"a": 1, "b": 2, "scheduled_at": "2022-02-22", "interval": 5},
+            {"a": 1, "scheduled_at": "2022-02-22", "interval": 5},
+        ]
+        source.write_text("\n".join(json.dumps(row) for row in rows))
+        with pytest.raises(CommandError, match="Row 3 is invalid"):
+            call_command("import_schedules", str(source), "--batch-size=2")
+        assert not TaskSchedule.objects.exists()
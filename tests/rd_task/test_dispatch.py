@@ -0,0 +1,82 @@
+import pytest
+from kombu.serialization import dumps
+from kombu.serialization import loads
+from kombu.serialization import prepare_accept_content
+
+from rd_project.celery import app
+from rd_project.rd_task import dispatch
+from rd_project.rd_task.dispatch import dispatch_task
+from rd_project.rd_task.dispatch import dispatch_task_ids
+from rd_project.rd_task.dispatch import dispatch_tasks
+from rd_project.rd_task.dispatch import task_args
+from rd_project.rd_task.models import Task
+from rd_project.rd_task.tasks import add
+
+
+@pytest.mark.django_db
+class TestQueueRouting:
+    def test_dispatch_task_uses_priority_queue(self, mocker):
+        apply_async = mocker.patch.object(add, "apply_async")
+        task = Task.objects.create(a=1, b=2, priority=Task.HIGH)
+        dispatch_task(task)
+        apply_async.assert_called_once_with(
+            (str(task.id), 1, 2, "add"), queue="high"
+        )
+
+    def test_dispatch_tasks_publishes_per_queue(self, mocker):
+        dispatch_task_ids = mocker.patch.object(dispatch, "dispatch_task_ids")
+        high = Task.objects.create(a=1, b=1, priority=Task.HIGH)
+        low = Task.objects.bulk_create(
+            Task(a=i, b=i, priority=Task.LOW) for i in range(3)
+        )
+        results = dispatch_tasks([high, *low])
+        assert len(results) == 2
+        calls = {
+            call.kwargs["queue"]: call.args[0]
+            for call in dispatch_task_ids.call_args_list
+        }
+        assert calls == {
+            "high": [str(high.id)],
+            "low": [str(task.id) for task in low],
+        }
+
+    def test_queue_names_come_from_settings(self, settings):
+        settings.TASK_PRIORITY_QUEUES = {
+            **settings.TASK_PRIORITY_QUEUES,
+            Task.LOW: "bulk",
+        }
+        assert Task(a=1, b=1, priority=Task.LOW).queue == "bulk"
+
+    def test_unknown_mode(self):
+        with pytest.raises(ValueError, match="dispatch mode"):
+            dispatch_tasks([Task.objects.create(a=1, b=1)], mode="nope")
+
+
+@pytest.mark.django_db
+class TestLeanMessages:
+    @pytest.fixture
+    def send_task_message(self, mocker):
+        mocker.patch.object(app, "producer_or_acquire")
+        return mocker.patch.object(app.amqp, "send_task_message")
+
+    def test_batches_are_compressed(self, send_task_message, settings):
+        settings.TASK_BATCH_COMPRESSION = "zlib"
+        dispatch_task_ids(["1", "2", "3"], chunk_size=2, queue="low")
+        assert [
+            call.kwargs["compression"]
+            for call in send_task_message.call_args_list
+        ] == ["zlib", "zlib"]
+
+    def test_batches_are_not_compressed_by_default(self, send_task_message):
+        dispatch_task_ids(["1"], queue="low")
+        assert send_task_message.call_args.kwargs["compression"] is None
+
+    def test_task_args_round_trip_through_msgpack(self):
+        task = Task.objects.create(a=-1, b=2**31 - 1, operation="multiply")
+        content_type, encoding, body = dumps(task_args(task), "msgpack")
+        assert loads(
+            body,
+            content_type,
+            encoding,
+            accept=prepare_accept_content(app.conf.accept_content),
+        ) == list(task_args(task))
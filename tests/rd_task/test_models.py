@@ -1,7 +1,10 @@
+import json
+
 import pytest
 from django.utils import timezone
 from django_celery_beat.models import IntervalSchedule
 from django_celery_beat.models import PeriodicTask
+from django_celery_beat.models import PeriodicTasks
 
 from rd_project.rd_task.models import Task
 from rd_project.rd_task.models import TaskSchedule
@@ -77,3 +80,115 @@ class TestTaskScheduleModel:
         assert PeriodicTask.objects.count() == 1
         schedule.delete_celery_beat_task()
         assert PeriodicTask.objects.count() == 0
+
+    def create_scheduled(self, interval):
+        schedule = TaskSchedule.objects.create(
+            scheduled_at=timezone.now(), interval=interval
+        )
+        Task.objects.create(schedule=schedule, a=1, b=2)
+        schedule.schedule_celery_beat_task()
+        return schedule
+
+    def test_periodic_task_expires_misfired_runs(self, settings):
+        settings.TASK_SCHEDULER_MISFIRE_GRACE = 60
+        settings.TASK_SCHEDULER_CATCH_UP_MAX = 5
+        schedule = self.create_scheduled(10)
+        assert schedule.periodic_task.expire_seconds == 60
+        schedule.interval = 300
+        schedule.update_celery_beat_task()
+        assert schedule.periodic_task.expire_seconds == 300
+        schedule.misfire_policy = TaskSchedule.CATCH_UP
+        schedule.update_celery_beat_task()
+        assert schedule.periodic_task.expire_seconds == 1500
+
+    def test_schedules_share_interval(self):
+        first = self.create_scheduled(10)
+        second = self.create_scheduled(10)
+        assert first.interval_schedule == second.interval_schedule
+        assert IntervalSchedule.objects.count() == 1
+
+    def test_update_shared_interval(self):
+        first = self.create_scheduled(10)
+        second = self.create_scheduled(10)
+        first.interval = 20
+        first.update_celery_beat_task()
+        second.refresh_from_db()
+        assert second.interval_schedule.every == 10
+        assert (
+            PeriodicTask.objects.get(id=first.periodic_task_id).interval.every
+            == 20
+        )
+        assert IntervalSchedule.objects.count() == 2
+
+    def test_update_releases_unused_interval(self):
+        schedule = self.create_scheduled(10)
+        schedule.interval = 20
+        schedule.update_celery_beat_task()
+        assert list(
+            IntervalSchedule.objects.values_list("every", flat=True)
+        ) == [20]
+
+    def test_delete_keeps_shared_interval(self):
+        first = self.create_scheduled(10)
+        second = self.create_scheduled(10)
+        first.delete_celery_beat_task()
+        assert TaskSchedule.objects.filter(pk=second.pk).exists()
+        assert PeriodicTask.objects.count() == 1
+        second.delete_celery_beat_task()
+        assert not IntervalSchedule.objects.exists()
+
+
+@pytest.mark.django_db
+class TestBulkCreateSchedules:
+    def items(self, size):
+        return [
+            {
+                "scheduled_at": timezone.now(),
+                "interval": 10 + i % 3,
+                "operation": "multiply",
+                "a": i,
+                "b": 2,
+                "priority": Task.HIGH,
+            }
+            for i in range(size)
+        ]
+
+    def test_bulk_create(self):
+        schedules = TaskSchedule.bulk_create_schedules(self.items(10))
+        assert TaskSchedule.objects.count() == 10
+        assert Task.objects.filter(operation="multiply").count() == 10
+        assert IntervalSchedule.objects.count() == 3
+        assert PeriodicTask.objects.count() == 10
+        schedule = TaskSchedule.objects.select_related(
+            "task", "periodic_task", "interval_schedule"
+        ).get(pk=schedules[4].pk)
+        assert schedule.interval_schedule.every == 11
+        assert schedule.periodic_task.interval_id == (
+            schedule.interval_schedule_id
+        )
+        assert schedule.periodic_task.queue == "high"
+        assert json.loads(schedule.periodic_task.args) == [
+            str(schedule.task.id),
+            4,
+            2,
+            "multiply",
+        ]
+        assert json.loads(schedule.periodic_task.kwargs) == {"scheduled": True}
+
+    def test_reuses_intervals(self, django_assert_max_num_queries):
+        TaskSchedule.bulk_create_schedules(self.items(3))
+        # A handful of batched INSERTs, not five queries per schedule.
+        with django_assert_max_num_queries(15):
+            TaskSchedule.bulk_create_schedules(self.items(100))
+        assert IntervalSchedule.objects.count() == 3
+
+    def test_reloads_beat_once(self, mocker):
+        update_changed = mocker.spy(PeriodicTasks, "update_changed")
+        TaskSchedule.bulk_create_schedules(self.items(50))
+        update_changed.assert_called_once()
+
+    def test_engine_scheduler(self, settings):
+        settings.TASK_SCHEDULER = "engine"
+        TaskSchedule.bulk_create_schedules(self.items(5))
+        assert TaskSchedule.objects.count() == 5
+        assert not PeriodicTask.objects.exists()
@@ -0,0 +1,26 @@
+import pytest
+
+from rd_project.rd_task.operations import OPERATIONS
+from rd_project.rd_task.operations import get_operation
+
+
+class TestOperations:
+    @pytest.mark.parametrize("name", list(OPERATIONS))
+    def test_vectorized_matches_scalar(self, name, settings):
+        operation = get_operation(name)
+        a = [-(2**31), -5, 0, 7, 2**31 - 1]
+        b = [2**31 - 1, 3, 0, -7, 2]
+        settings.TASK_VECTORIZE_THRESHOLD = len(a) + 1
+        scalar = operation.compute_many(a, b)
+        settings.TASK_VECTORIZE_THRESHOLD = 1
+        vectorized = operation.compute_many(a, b)
+        assert vectorized == scalar
+        assert all(type(value) is int for value in vectorized)
+        assert scalar == [operation.compute(x, y) for x, y in zip(a, b)]
+
+    def test_add(self):
+        assert get_operation("add").compute_many([1, 2], [3, 4]) == [4, 6]
+
+    def test_unknown_operation(self):
+        with pytest.raises(ValueError, match="Unknown operation"):
+            get_operation("nope")
@@ -0,0 +1,48 @@
+import pytest
+
+from rd_project.rd_task import dispatch
+from rd_project.rd_task.dispatch import enqueue_tasks
+from rd_project.rd_task.dispatch import relay_outbox
+from rd_project.rd_task.models import Task
+from rd_project.rd_task.models import TaskOutbox
+
+
+@pytest.mark.django_db
+class TestOutbox:
+    @pytest.fixture
+    def dispatch_tasks(self, mocker):
+        return mocker.patch.object(dispatch, "dispatch_tasks")
+
+    def test_relay_publishes_and_deletes(self, dispatch_tasks):
+        tasks = Task.objects.bulk_create(Task(a=i, b=i) for i in range(5))
+        enqueue_tasks(tasks)
+        assert relay_outbox() == 5
+        dispatch_tasks.assert_called_once_with(tasks, mode=None)
+        assert not TaskOutbox.objects.exists()
+        assert relay_outbox() == 0
+
+    def test_relay_batches(self, dispatch_tasks):
+        enqueue_tasks(
+            Task.objects.bulk_create(Task(a=i, b=i) for i in range(5))
+        )
+        assert relay_outbox(batch_size=2) == 2
+        assert TaskOutbox.objects.count() == 3
+
+    def test_relay_groups_by_mode(self, dispatch_tasks):
+        enqueue_tasks([Task.objects.create(a=1, b=1)])
+        enqueue_tasks([Task.objects.create(a=2, b=2)], mode="chunks")
+        relay_outbox()
+        modes = {call.kwargs["mode"] for call in dispatch_tasks.call_args_list}
+        assert modes == {"chunks", None}
+
+    def test_failed_publish_keeps_rows(self, dispatch_tasks):
+        dispatch_tasks.side_effect = ConnectionError("broker down")
+        enqueue_tasks([Task.objects.create(a=1, b=1)])
+        with pytest.raises(ConnectionError):
+            relay_outbox()
+        assert TaskOutbox.objects.count() == 1
+
+    def test_unknown_backend(self, settings):
+        settings.TASK_DISPATCH_BACKEND = "nope"
+        with pytest.raises(ValueError, match="dispatch backend"):
+            enqueue_tasks([Task.objects.create(a=1, b=1)])
@@ -0,0 +1,89 @@
+import pytest
+from django.core.cache import caches
+
+from rd_project.api.cache import add_task_detail
+from rd_project.api.cache import get_task_detail
+from rd_project.rd_task import dispatch
+from rd_project.rd_task import result_store
+from rd_project.rd_task.dispatch import dispatch_task
+from rd_project.rd_task.dispatch import dispatch_tasks
+from rd_project.rd_task.models import Task
+from rd_project.rd_task.tasks import add
+
+
+@pytest.fixture(autouse=True)
+def enabled_store(settings):
+    settings.RESULT_STORE_ENABLED = True
+    caches[settings.RESULT_STORE_CACHE].clear()
+
+
+class TestResultStore:
+    def test_get_and_set(self):
+        assert result_store.get_result("add", 1, 2) is None
+        result_store.set_result("add", (1, 2), 3)
+        assert result_store.get_result("add", 1, 2) == 3
+        assert result_store.stats() == {
+            "enabled": True,
+            "hits": 1,
+            "misses": 1,
+            "hit_ratio": 0.5,
+        }
+
+    def test_keyed_by_operation(self):
+        result_store.set_result("add", (2, 3), 5)
+        assert result_store.get_result("multiply", 2, 3) is None
+        result_store.set_result("multiply", (2, 3), 6)
+        assert result_store.get_result("add", 2, 3) == 5
+        assert result_store.get_result("multiply", 2, 3) == 6
+
+    def test_get_many(self):
+        result_store.set_results("add", [(1, 1), (2, 2)], [2, 4])
+        found = result_store.get_results("add", [(1, 1), (2, 2), (3, 3)])
+        assert found == {(1, 1): 2, (2, 2): 4}
+        stats = result_store.stats()
+        assert stats["hits"] == 2
+        assert stats["misses"] == 1
+
+    def test_disabled(self, settings):
+        settings.RESULT_STORE_ENABLED = False
+        result_store.set_result("add", (1, 2), 3)
+        assert result_store.get_result("add", 1, 2) is None
+
+
+@pytest.mark.django_db
+class TestResultStoreDispatch:
+    def test_dispatch_task_from_store(self, mocker):
+        apply_async = mocker.patch.object(add, "apply_async")
+        result_store.set_result("add", (1, 2), 3)
+        task = Task.objects.create(a=1, b=2)
+        dispatch_task(task)
+        apply_async.assert_not_called()
+        task.refresh_from_db()
+        assert task.status == Task.SUCCESS
+        assert task.results.get().result == 3
+
+    def test_dispatch_task_from_store_notifies(self, mocker):
+        mocker.patch.object(add, "apply_async")
+        publish = mocker.spy(dispatch, "publish_task_done")
+        result_store.set_result("add", (1, 2), 3)
+        task = Task.objects.create(a=1, b=2)
+        add_task_detail(task)
+        dispatch_task(task)
+        assert get_task_detail(task.id) is None
+        assert publish.call_args.args[0].status == Task.SUCCESS
+
+    def test_dispatch_tasks_only_publishes_misses(self, mocker):
+        group = mocker.patch("rd_project.rd_task.dispatch.group")
+        result_store.set_result("add", (1, 2), 3)
+        hit = Task.objects.create(a=1, b=2)
+        miss = Task.objects.create(a=2, b=2)
+        dispatch_tasks([hit, miss])
+        (signatures,) = group.call_args.args
+        assert [sig.args for sig in signatures] == [([str(miss.id)],)]
+        hit.refresh_from_db()
+        assert hit.status == Task.SUCCESS
+
+    def test_worker_feeds_store(self):
+        task = Task.objects.create(a=4, b=5)
+        add.apply(args=(str(task.id), task.a, task.b))
+        assert result_store.get_result("add", 4, 5) == 9
@@ -0,0 +1,160 @@
+import importlib
+from datetime import UTC
+from datetime import datetime
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+
+from rd_project.rd_task.models import Task
+from rd_project.rd_task.models import TaskResult
+from rd_project.rd_task.models import TaskResultRollup
+from rd_project.rd_task.partitions import add_months
+from rd_project.rd_task.partitions import drop_empty_partitions
+from rd_project.rd_task.partitions import is_partitioned
+from rd_project.rd_task.partitions import month_start
+from rd_project.rd_task.partitions import partition_name
+from rd_project.rd_task.retention import compact_results
+from rd_project.rd_task.retention import maintain_results
+
+
+def create_results(task, values, days_ago):
+    created_at = timezone.now() - timedelta(days=days_ago)
+    results = TaskResult.objects.bulk_create(
+        TaskResult(task=task, result=value) for value in values
+    )
+    TaskResult.objects.filter(id__in=[r.id for r in results]).update(
+        created_at=created_at
+    )
+    return created_at
+
+
+@pytest.mark.django_db
+class TestCompactResults:
+    def test_compacts_old_results_and_keeps_latest(self):
+        task = Task.objects.create(a=1, b=1)
+        old = create_results(task, [1, 5, 3], days_ago=60)
+        latest = TaskResult.objects.create(task=task, result=2)
+        TaskResult.objects.filter(id=latest.id).update(
+            created_at=old + timedelta(days=1)
+        )
+        cutoff = timezone.now() - timedelta(days=30)
+        assert compact_results(cutoff) == 3
+        assert list(task.results.values_list("result", flat=True)) == [2]
+        rollup = task.rollup
+        assert (rollup.count, rollup.total) == (3, 9)
+        assert (rollup.minimum, rollup.maximum) == (1, 5)
+        assert rollup.first_result_at == rollup.last_result_at == old
+
+    def test_keeps_recent_results(self):
+        task = Task.objects.create(a=1, b=1)
+        create_results(task, [1, 2], days_ago=1)
+        assert compact_results(timezone.now() - timedelta(days=30)) == 0
+        assert task.results.count() == 2
+
+    def test_merges_into_existing_rollup(self):
+        task = Task.objects.create(a=1, b=1)
+        create_results(task, [1, 2], days_ago=90)
+        create_results(task, [3], days_ago=1)
+        compact_results(timezone.now() - timedelta(days=30))
+        create_results(task, [4, None], days_ago=60)
+        TaskResult.objects.create(task=task, result=5)
+        compact_results(timezone.now() - timedelta(days=30))
+        rollup = TaskResultRollup.objects.get(task=task)
+        assert (rollup.count, rollup.total) == (4, 7)
+        assert (rollup.minimum, rollup.maximum) == (1, 4)
+        assert task.results.count() == 2
+
+    def test_batches(self):
+        tasks = Task.objects.bulk_create(Task(a=i, b=i) for i in range(3))
+        for task in tasks:
+            create_results(task, [1, 1, 1], days_ago=60)
+            TaskResult.objects.create(task=task, result=1)
+        cutoff = timezone.now() - timedelta(days=30)
+        assert compact_results(cutoff, batch_size=2) == 9
+        assert TaskResultRollup.objects.count() == 3
+        assert TaskResult.objects.count() == 3
+
+    def test_retention_disabled(self, settings):
+        settings.TASK_RESULT_RETENTION_DAYS = 0
+        task = Task.objects.create(a=1, b=1)
+        create_results(task, [1, 2], days_ago=400)
+        assert maintain_results() == 0
+        assert task.results.count() == 2
+
+
+class TestPartitions:
+    def test_months(self):
+        value = datetime(2024, 12, 31, 23, 59, tzinfo=UTC)
+        assert month_start(value) == datetime(2024, 12, 1, tzinfo=UTC)
+        assert add_months(month_start(value), 1) == datetime(
+            2025, 1, 1, tzinfo=UTC
+        )
+        assert add_months(month_start(value), -12) == datetime(
+            2023, 12, 1, tzinfo=UTC
+        )
+        assert partition_name(value) == "rd_task_taskresult_202412"
+
+    @pytest.mark.django_db
+    def test_noop_without_postgresql(self):
+        assert not is_partitioned()
+        assert drop_empty_partitions(timezone.now()) == []
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="Needs PostgreSQL."
+)
+class TestPartitionMigration:
+    """Run against PostgreSQL, e.g. the compose ``db`` service."""
+
+    migration = importlib.import_module(
+        "rd_project.rd_task.migrations.0006_partition_taskresult"
+    )
+
+    def run(self, name):
+        # Check the deferred foreign keys of the rows created by the test,
+        # as a commit would, so the old table can be dropped.
+        with connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        with connection.schema_editor() as schema_editor:
+            getattr(self.migration, name)(None, schema_editor)
+
+    def primary_key(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = 'rd_task_taskresult'::regclass "
+                "AND contype = 'p'"
+            )
+            return cursor.fetchone()[0]
+
+    def test_forwards_and_backwards(self):
+        task = Task.objects.create(a=1, b=1)
+        create_results(task, [1, 2], days_ago=400)
+        create_results(task, [3], days_ago=0)
+        self.run("partition")
+        assert is_partitioned()
+        assert self.primary_key() == "PRIMARY KEY (id, created_at)"
+        assert sorted(task.results.values_list("result", flat=True)) == [
+            1,
+            2,
+            3,
+        ]
+        # Results are written to the partitioned table.
+        TaskResult.objects.create(task=task, result=4)
+        assert task.results.count() == 4
+        self.run("unpartition")
+        assert not is_partitioned()
+        assert self.primary_key() == "PRIMARY KEY (id)"
+        assert task.results.count() == 4
+
+    def test_drops_emptied_months(self):
+        task = Task.objects.create(a=1, b=1)
+        old = create_results(task, [1, 2], days_ago=400)
+        TaskResult.objects.create(task=task, result=3)
+        self.run("partition")
+        cutoff = timezone.now() - timedelta(days=30)
+        assert compact_results(cutoff) == 2
+        assert partition_name(old) in drop_empty_partitions(cutoff)
@@ -0,0 +1,203 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from django_celery_beat.models import PeriodicTask
+
+from rd_project.celery import app as celery_app
+from rd_project.rd_task.models import Task
+from rd_project.rd_task.models import TaskSchedule
+from rd_project.rd_task.schedulers import ScheduleHeap
+from rd_project.rd_task.schedulers import TaskScheduleScheduler
+from rd_project.rd_task.schedulers import first_run
+from rd_project.rd_task.schedulers import next_run_after
+
+
+class TestScheduleHeap:
+    def test_next_run_after(self):
+        assert next_run_after(100, 10, 50) == 100
+        assert next_run_after(100, 10, 100) == 110
+        assert next_run_after(100, 10, 101) == 110
+        assert next_run_after(100, 10, 130) == 140
+
+    def test_first_run(self):
+        assert first_run(100, 10, 50) == 100
+        assert first_run(100, 10, 135) == 130
+        assert first_run(100, 10, 135, last_run=131) == 140
+        # Runs missed since the last one are left to the misfire policy.
+        assert first_run(100, 10, 135, last_run=112) == 120
+
+    def test_pop_due_in_order_and_reschedules(self):
+        heap = ScheduleHeap()
+        heap.push("s1", "t1", next_run=20, interval=10)
+        heap.push("s2", "t2", next_run=10, interval=5)
+        assert heap.pop_due(9) == []
+        assert heap.pop_due(10) == [("s2", "t2")]
+        assert heap.next_run() == 15
+        assert heap.pop_due(20) == [("s2", "t2"), ("s1", "t1")]
+        assert len(heap) == 2
+
+    def test_missed_runs_are_coalesced(self):
+        heap = ScheduleHeap()
+        heap.push("s1", "t1", next_run=10, interval=10)
+        assert heap.pop_due(55) == [("s1", "t1")]
+        assert heap.next_run() == 60
+
+    def test_missed_runs_are_skipped(self):
+        heap = ScheduleHeap()
+        heap.push("s1", "t1", next_run=10, interval=10, misfire_policy="skip")
+        assert heap.pop_due(15) == [("s1", "t1")]
+        assert heap.pop_due(55) == []
+        assert heap.next_run() == 60
+        assert heap.pop_due(60) == [("s1", "t1")]
+
+    def test_missed_runs_are_caught_up(self):
+        heap = ScheduleHeap(catch_up_max=3)
+        heap.push("s1", "t1", 10, 10, misfire_policy="catch_up")
+        heap.push("s2", "t2", 10, 30, misfire_policy="catch_up")
+        assert heap.pop_due(55) == [("s1", "t1"), ("s2", "t2")]
+        assert heap.next_run() == 60
+        # s1 missed 4 runs, capped to 3, s2 missed 1.
+        assert heap.catch_up_runs == 4
+        assert heap.pop_catch_up(3) == [
+            [("s1", "t1"), ("s2", "t2")],
+            [("s1", "t1")],
+        ]
+        assert heap.pop_catch_up(3) == [[("s1", "t1")]]
+        assert heap.catch_up_runs == 0
+
+    def test_remove_drops_catch_up(self):
+        heap = ScheduleHeap(catch_up_max=3)
+        heap.push("s1", "t1", 10, 10, misfire_policy="catch_up")
+        heap.pop_due(55)
+        heap.remove("s1")
+        assert heap.pop_catch_up(10) == []
+
+    def test_pop_due_limit(self):
+        heap = ScheduleHeap()
+        for i in range(5):
+            heap.push(f"s{i}", f"t{i}", next_run=i, interval=100)
+        assert len(heap.pop_due(10, limit=3)) == 3
+        assert len(heap.pop_due(10)) == 2
+
+    def test_push_replaces_and_remove(self):
+        heap = ScheduleHeap()
+        heap.push("s1", "t1", next_run=10, interval=10)
+        heap.push("s1", "t1", next_run=30, interval=10)
+        assert heap.pop_due(20) == []
+        heap.remove("s1")
+        assert len(heap) == 0
+        assert heap.next_run() is None
+
+
+@pytest.mark.django_db
+class TestTaskScheduleScheduler:
+    @pytest.fixture(autouse=True)
+    def engine(self, settings):
+        settings.TASK_SCHEDULER = "engine"
+        settings.TASK_SCHEDULER_SYNC_INTERVAL = 0
+
+    @pytest.fixture
+    def dispatch(self, mocker):
+        return mocker.patch("rd_project.rd_task.schedulers.dispatch_task_ids")
+
+    def create_schedule(
+        self, scheduled_at, interval=60, misfire_policy="coalesce"
+    ):
+        schedule = TaskSchedule.objects.create(
+            scheduled_at=scheduled_at,
+            interval=interval,
+            misfire_policy=misfire_policy,
+        )
+        task = Task.objects.create(schedule=schedule, a=1, b=2)
+        schedule.schedule_celery_beat_task()
+        return schedule, task
+
+    def test_schedule_does_not_create_periodic_task(self):
+        schedule, _ = self.create_schedule(timezone.now())
+        assert PeriodicTask.objects.count() == 0
+        schedule.update_celery_beat_task()
+        schedule.delete_celery_beat_task()
+
+    def test_tick_dispatches_due_runs(self, dispatch):
+        now = timezone.now()
+        _, due = self.create_schedule(now - timedelta(seconds=1))
+        self.create_schedule(now + timedelta(hours=1))
+        scheduler = TaskScheduleScheduler(app=celery_app)
+        assert len(scheduler.schedule_heap) == 2
+        scheduler.tick()
+        dispatch.assert_called_once_with(
+            [str(due.id)], queue="normal", expires=60
+        )
+
+    def test_sync_loads_new_and_drops_deleted(self, dispatch):
+        scheduler = TaskScheduleScheduler(app=celery_app)
+        assert len(scheduler.schedule_heap) == 0
+        schedule, task = self.create_schedule(timezone.now())
+        scheduler.tick()
+        assert len(scheduler.schedule_heap) == 1
+        dispatch.assert_called_once()
+        schedule_id, task_id = schedule.id, task.id
+        schedule.delete()
+        # Make the deleted schedule due again.
+        scheduler.schedule_heap.push(schedule_id, task_id, 0, 60)
+        scheduler.tick()
+        assert len(scheduler.schedule_heap) == 0
+
+    def test_sync_loads_rows_committed_late(self, dispatch):
+        later = timezone.now() + timedelta(hours=1)
+        loaded, _ = self.create_schedule(later)
+        scheduler = TaskScheduleScheduler(app=celery_app)
+        entry = scheduler.schedule_heap._entries[loaded.id]
+        # Saved before the last sync, committed after it.
+        late, _ = self.create_schedule(later)
+        TaskSchedule.objects.filter(id=late.id).update(
+            updated_at=scheduler.synced_until - timedelta(seconds=60)
+        )
+        scheduler.sync_schedules()
+        assert len(scheduler.schedule_heap) == 2
+        assert scheduler.schedule_heap._entries[loaded.id] is entry
+
+    def create_ran_schedule(self, misfire_policy, missed):
+        now = timezone.now()
+        _, task = self.create_schedule(
+            now - timedelta(hours=1), 60, misfire_policy
+        )
+        Task.objects.filter(id=task.id).update(
+            status=Task.SUCCESS,
+            updated_at=now - timedelta(seconds=60 * missed + 30),
+        )
+        return task
+
+    def dispatched_runs(self, dispatch):
+        return [
+            task_id
+            for call in dispatch.call_args_list
+            for task_id in call[0][0]
+        ]
+
+    def test_outage_coalesced(self, dispatch):
+        task = self.create_ran_schedule("coalesce", missed=5)
+        TaskScheduleScheduler(app=celery_app).tick()
+        assert self.dispatched_runs(dispatch) == [str(task.id)]
+
+    def test_outage_skipped(self, dispatch):
+        self.create_ran_schedule("skip", missed=5)
+        TaskScheduleScheduler(app=celery_app).tick()
+        dispatch.assert_not_called()
+
+    def test_outage_caught_up_in_batches(self, dispatch, settings):
+        settings.TASK_SCHEDULER_CATCH_UP_MAX = 3
+        settings.TASK_SCHEDULER_CATCH_UP_RATE = 2
+        task = self.create_ran_schedule("catch_up", missed=5)
+        scheduler = TaskScheduleScheduler(app=celery_app)
+        assert scheduler.tick_schedules() <= 1
+        assert self.dispatched_runs(dispatch) == [str(task.id)] * 3
+        assert dispatch.call_args.kwargs == {
+            "queue": "normal",
+            "expires": 180,
+        }
+        dispatch.reset_mock()
+        scheduler.tick_schedules()
+        assert self.dispatched_runs(dispatch) == [str(task.id)]
+        assert scheduler.schedule_heap.catch_up_runs == 0
@@ -0,0 +1,119 @@
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+
+from rd_project.rd_task import stats
+from rd_project.rd_task.models import Task
+from rd_project.rd_task.models import TaskSchedule
+from rd_project.rd_task.tasks import add
+from rd_project.rd_task.tasks import add_many
+from rd_project.rd_task.tasks import reconcile_task_stats
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+def finished(status):
+    return sum(minute[status] for minute in stats.stats()["throughput"])
+
+
+@pytest.mark.django_db
+class TestStatusCounters:
+    def test_created_tasks_are_pending(self):
+        Task.objects.create(a=1, b=1)
+        Task.objects.bulk_create(Task(a=i, b=i) for i in range(3))
+        assert stats.stats()["counts"] == {
+            "PENDING": 4,
+            "SUCCESS": 0,
+            "FAILED": 0,
+        }
+
+    @pytest.mark.parametrize("fast_path", [False, True])
+    def test_add_moves_the_task(self, settings, fast_path):
+        settings.TASK_WORKER_FAST_PATH = fast_path
+        done = Task.objects.create(a=1, b=2)
+        failed = Task.objects.create(a=1, b=2, operation="nope")
+        Task.objects.create(a=1, b=2)
+        add.apply(args=(str(done.id), 1, 2))
+        add.apply(args=(str(failed.id), 1, 2, "nope"))
+        assert stats.stats()["counts"] == Task.status_counts()
+        assert (finished("SUCCESS"), finished("FAILED")) == (1, 1)
+
+    def test_add_many_moves_the_batch(self):
+        ids = [
+            str(task.id)
+            for task in Task.objects.bulk_create(
+                Task(a=i, b=i) for i in range(5)
+            )
+        ]
+        add_many.apply(args=(ids,))
+        assert stats.stats()["counts"] == {
+            "PENDING": 0,
+            "SUCCESS": 5,
+            "FAILED": 0,
+        }
+        assert finished("SUCCESS") == 5
+
+    @pytest.mark.parametrize("fast_path", [False, True])
+    def test_scheduled_reruns_keep_the_counters(self, settings, fast_path):
+        settings.TASK_WORKER_FAST_PATH = fast_path
+        schedule = TaskSchedule.objects.create(
+            scheduled_at="2022-02-20T14:24:34Z", interval=30
+        )
+        task = Task.objects.create(a=2, b=3, schedule=schedule)
+        add.apply(args=(str(task.id), 2, 3), kwargs={"scheduled": True})
+        # The fast path leaves the first run to the reconciliation.
+        reconcile_task_stats.apply()
+        add.apply(args=(str(task.id), 2, 3), kwargs={"scheduled": True})
+        assert stats.stats()["counts"] == {
+            "PENDING": 0,
+            "SUCCESS": 1,
+            "FAILED": 0,
+        }
+        assert finished("SUCCESS") == 2
+
+    def test_redelivered_failure_keeps_the_counters(self):
+        task = Task.objects.create(a=1, b=2)
+        add.apply(args=(str(task.id), 1, 2))
+        add.apply(args=(str(task.id), 1, 2, "nope"))
+        task.refresh_from_db()
+        assert task.status == Task.SUCCESS
+        assert stats.stats()["counts"] == {
+            "PENDING": 0,
+            "SUCCESS": 1,
+            "FAILED": 0,
+        }
+        assert finished("FAILED") == 0
+
+    def test_reconcile_fixes_drift(self):
+        Task.objects.bulk_create(Task(a=i, b=i) for i in range(3))
+        Task.objects.first().delete()
+        assert stats.stats()["counts"]["PENDING"] == 3
+        assert not stats.is_reconciled()
+        assert reconcile_task_stats.apply().get() == {"PENDING": 2}
+        assert stats.stats()["counts"]["PENDING"] == 2
+        assert stats.is_reconciled()
+
+
+class TestThroughput:
+    def test_window(self, settings):
+        settings.TASK_STATS_WINDOW = 5
+        stats.record_finished("SUCCESS", ["PENDING", "PENDING"])
+        stats.record_finished("FAILED", ["PENDING"])
+        throughput = stats.stats()["throughput"]
+        assert len(throughput) == 5
+        assert throughput[-1]["SUCCESS"] == 2
+        assert throughput[-1]["FAILED"] == 1
+        assert throughput[-1]["minute"] > timezone.now() - timedelta(minutes=1)
+
+    def test_old_minutes_leave_the_window(self, settings):
+        settings.TASK_STATS_WINDOW = 5
+        stats.record_finished("SUCCESS", ["PENDING"])
+        later = timezone.now() + timedelta(minutes=5)
+        assert not any(
+            minute["SUCCESS"] for minute in stats.stats(later)["throughput"]
+        )
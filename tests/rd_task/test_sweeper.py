@@ -0,0 +1,108 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from rd_project.celery import app
+from rd_project.rd_task.models import Task
+from rd_project.rd_task.models import TaskOutbox
+from rd_project.rd_task.models import TaskSchedule
+from rd_project.rd_task.sweeper import sweep_stale_tasks
+from rd_project.rd_task.tasks import add
+from rd_project.rd_task.tasks import add_many
+
+
+def create_tasks(count, age=3600, **kwargs):
+    tasks = Task.objects.bulk_create(
+        Task(a=i, b=i, **kwargs) for i in range(count)
+    )
+    then = timezone.now() - timedelta(seconds=age)
+    Task.objects.filter(id__in=[task.id for task in tasks]).update(
+        created_at=then, updated_at=then
+    )
+    return tasks
+
+
+def published(send_task):
+    return {
+        call.kwargs["task_id"]: (call.kwargs["queue"], call.args[1][0])
+        for call in send_task.call_args_list
+    }
+
+
+@pytest.mark.django_db
+class TestSweepStaleTasks:
+    @pytest.fixture
+    def send_task(self, mocker):
+        return mocker.patch.object(app, "send_task")
+
+    def test_redispatches_stale_tasks(self, send_task, settings):
+        settings.TASK_SWEEP_AGE = 600
+        stale = create_tasks(2, priority=Task.LOW)
+        create_tasks(1, age=60)
+        assert sweep_stale_tasks() == 2
+        ((message_id, (queue, task_ids)),) = published(send_task).items()
+        assert queue == "low"
+        assert sorted(task_ids) == sorted(str(task.id) for task in stale)
+        assert set(
+            Task.objects.filter(id__in=task_ids).values_list(
+                "celery_task_id", flat=True
+            )
+        ) == {message_id}
+
+    def test_skips_tasks_that_are_not_lost(self, send_task):
+        create_tasks(1, status=Task.SUCCESS)
+        (queued,) = create_tasks(1)
+        TaskOutbox.objects.create(task=queued)
+        schedule = TaskSchedule.objects.create(
+            scheduled_at="2022-02-20T14:24:34Z", interval=30
+        )
+        create_tasks(1, schedule=schedule)
+        assert sweep_stale_tasks() == 0
+        send_task.assert_not_called()
+
+    def test_swept_tasks_wait_another_age(self, send_task):
+        create_tasks(3)
+        assert sweep_stale_tasks(age=600) == 3
+        assert sweep_stale_tasks(age=600) == 0
+        assert sweep_stale_tasks(age=0) == 3
+
+    def test_batches(self, send_task, settings):
+        settings.TASK_DISPATCH_CHUNK_SIZE = 2
+        create_tasks(5, priority=Task.HIGH)
+        create_tasks(2, priority=Task.LOW)
+        assert sweep_stale_tasks(batch_size=3) == 7
+        messages = published(send_task).values()
+        assert sorted(len(task_ids) for _, task_ids in messages) == [
+            1,
+            1,
+            1,
+            2,
+            2,
+        ]
+        assert not sweep_stale_tasks(age=600)
+
+
+@pytest.mark.django_db
+class TestStampedTasks:
+    @pytest.fixture
+    def stamped(self):
+        return Task.objects.create(a=2, b=3, celery_task_id="sweep-id")
+
+    def test_add_many_runs_only_from_the_stamped_message(self, stamped):
+        ids = [str(stamped.id)]
+        assert add_many.apply(args=(ids,), task_id="lost-id").get() == 0
+        assert add_many.apply(args=(ids,), task_id="sweep-id").get() == 1
+        stamped.refresh_from_db()
+        assert stamped.status == Task.SUCCESS
+
+    @pytest.mark.parametrize("fast_path", [False, True])
+    def test_add_runs_only_from_the_stamped_message(
+        self, stamped, settings, fast_path
+    ):
+        settings.TASK_WORKER_FAST_PATH = fast_path
+        args = (str(stamped.id), 2, 3)
+        assert add.apply(args=args, task_id="lost-id").get() is None
+        assert not stamped.results.exists()
+        assert add.apply(args=args, task_id="sweep-id").get() == 5
+        assert stamped.results.get().result == 5
@@ -0,0 +1,210 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from rd_project.api.cache import add_task_detail
+from rd_project.api.cache import get_task_detail
+from rd_project.rd_task.models import Task
+from rd_project.rd_task.models import TaskResult
+from rd_project.rd_task.models import TaskSchedule
+from rd_project.rd_task.tasks import add
+from rd_project.rd_task.tasks import add_many
+
+
+@pytest.mark.django_db
+class TestAddTask:
+    @pytest.fixture(autouse=True, params=[True, False], ids=["fast", "orm"])
+    def fast_path(self, request, settings):
+        settings.TASK_WORKER_FAST_PATH = request.param
+        return request.param
+
+    def test_add(self):
+        task = Task.objects.create(a=2, b=3)
+        assert add.apply(args=(str(task.id), task.a, task.b)).get() == 5
+        task.refresh_from_db()
+        assert task.status == Task.SUCCESS
+        assert task.celery_task_id
+        assert task.results.get().result == 5
+
+    def test_add_drops_cached_detail(self):
+        task = Task.objects.create(a=2, b=3)
+        add_task_detail(task)
+        add.apply(args=(str(task.id), task.a, task.b))
+        assert get_task_detail(task.id) is None
+
+    def test_stale_read_is_not_cached(self):
+        task = Task.objects.create(a=2, b=3)
+        stale = Task.objects.get(id=task.id)
+        add.apply(args=(str(task.id), task.a, task.b))
+        # A request that read the row before the worker committed.
+        add_task_detail(stale)
+        assert get_task_detail(task.id) is None
+
+    def test_add_operation(self):
+        task = Task.objects.create(operation="multiply", a=2**20, b=2**20)
+        args = (str(task.id), task.a, task.b, task.operation)
+        assert add.apply(args=args).get() == 2**40
+        assert task.results.get().result == 2**40
+
+    def test_add_unknown_operation(self):
+        task = Task.objects.create(a=2, b=3)
+        result = add.apply(args=(str(task.id), 2, 3, "nope"))
+        assert result.failed()
+        task.refresh_from_db()
+        assert task.status == Task.FAILED
+
+    def test_add_missing_task(self, fast_path):
+        task_id = "00000000-0000-0000-0000-000000000000"
+        result = add.apply(args=(task_id, 1, 2))
+        if fast_path:
+            assert result.get() is None
+        else:
+            assert result.failed()
+
+    def test_add_skips_finished_task(self):
+        task = Task.objects.create(a=2, b=3)
+        task.mark_as_successfull(result=5)
+        assert add.apply(args=(str(task.id), task.a, task.b)).get() is None
+        assert task.results.count() == 1
+
+    def test_add_runs_scheduled_task_again(self):
+        schedule = TaskSchedule.objects.create(
+            scheduled_at="2022-02-20T14:24:34Z", interval=30
+        )
+        task = Task.objects.create(a=2, b=3, schedule=schedule)
+        add.apply(args=(str(task.id), task.a, task.b))
+        add.apply(args=(str(task.id), task.a, task.b))
+        assert task.results.count() == 2
+
+
+@pytest.mark.django_db
+class TestCompleteTask:
+    def test_complete_writes_only_worker_fields(self):
+        task = Task.objects.create(a=2, b=3)
+        with CaptureQueriesContext(connection) as queries:
+            assert Task.complete(task.id, 5, "celery-id")
+        statements = [q["sql"] for q in queries]
+        assert not any(sql.startswith("SELECT") for sql in statements)
+        (update,) = [sql for sql in statements if sql.startswith("UPDATE")]
+        assert '"a"' not in update
+        task.refresh_from_db()
+        assert (task.status, task.celery_task_id) == (
+            Task.SUCCESS,
+            "celery-id",
+        )
+        assert task.results.get().result == 5
+
+    def test_complete_pending_task_in_two_statements(self):
+        task = Task.objects.create(a=2, b=3)
+        with CaptureQueriesContext(connection) as queries:
+            Task.complete(task.id, 5, "celery-id")
+        assert [q["sql"].split()[0] for q in queries] == ["UPDATE", "INSERT"]
+
+    def test_redelivery_stores_no_second_result(self):
+        task = Task.objects.create(a=2, b=3)
+        assert Task.complete(task.id, 5, "celery-id")
+        assert not Task.complete(task.id, 5, "celery-id")
+        assert task.results.count() == 1
+
+    def test_complete_skips_finished_task(self):
+        task = Task.objects.create(a=2, b=3, status=Task.FAILED)
+        assert not Task.complete(task.id, 5)
+        assert not task.results.exists()
+
+    def test_fail(self):
+        task = Task.objects.create(a=2, b=3)
+        assert Task.fail(task.id, "x" * 300, "celery-id") == 1
+        task.refresh_from_db()
+        assert task.status == Task.FAILED
+        assert len(task.failed_message) == 255
+
+    @pytest.mark.parametrize("status", [Task.SUCCESS, Task.FAILED])
+    def test_fail_skips_finished_task(self, status):
+        task = Task.objects.create(a=2, b=3, status=status)
+        assert not Task.fail(task.id, "late", "celery-id")
+        task.refresh_from_db()
+        assert (task.status, task.failed_message) == (status, "")
+
+    def test_fail_skips_task_stamped_for_another_message(self):
+        task = Task.objects.create(a=2, b=3, celery_task_id="sweep-id")
+        assert not Task.fail(task.id, "late", "lost-id")
+
+    @pytest.mark.parametrize("method", ["complete", "fail"])
+    def test_scheduled_task_in_one_update(self, method):
+        schedule = TaskSchedule.objects.create(
+            scheduled_at="2022-02-20T14:24:34Z", interval=30
+        )
+        task = Task.objects.create(
+            a=2, b=3, schedule=schedule, status=Task.SUCCESS
+        )
+        with CaptureQueriesContext(connection) as queries:
+            assert getattr(Task, method)(task.id, 5, scheduled=True)
+        updates = [q for q in queries if q["sql"].startswith("UPDATE")]
+        assert len(updates) == 1
+
+    def test_mark_as_successfull_updates_only_worker_fields(self):
+        task = Task.objects.create(a=2, b=3)
+        with CaptureQueriesContext(connection) as queries:
+            task.mark_as_successfull(result=5)
+        (update,) = [
+            q["sql"] for q in queries if q["sql"].startswith("UPDATE")
+        ]
+        assert '"a"' not in update
+
+
+@pytest.mark.django_db
+class TestAddManyTask:
+    def test_add_many_invalidates_cached_detail(self):
+        task = Task.objects.create(a=1, b=1)
+        add_task_detail(task)
+        add_many.apply(args=([str(task.id)],))
+        assert get_task_detail(task.id) is None
+
+    def test_add_many(self):
+        tasks = [Task.objects.create(a=i, b=10) for i in range(5)]
+        result = add_many.apply(args=([str(task.id) for task in tasks],))
+        assert result.get() == 5
+        for task in tasks:
+            task.refresh_from_db()
+            assert task.status == Task.SUCCESS
+            assert task.celery_task_id == result.id
+            assert task.results.get().result == task.a + 10
+
+    def test_add_many_mixed_operations(self, settings):
+        settings.TASK_VECTORIZE_THRESHOLD = 2
+        tasks = [
+            Task.objects.create(operation=operation, a=a, b=3)
+            for operation in ["add", "multiply", "subtract"]
+            for a in range(3)
+        ]
+        add_many.apply(args=([str(task.id) for task in tasks],))
+        results = {
+            (task.operation, task.a): task.results.get().result
+            for task in tasks
+        }
+        assert results[("add", 2)] == 5
+        assert results[("multiply", 2)] == 6
+        assert results[("subtract", 0)] == -3
+
+    def test_add_many_skips_finished_tasks(self):
+        done = Task.objects.create(a=1, b=1)
+        done.mark_as_successfull(result=2)
+        pending = Task.objects.create(a=2, b=2)
+        result = add_many.apply(args=([str(done.id), str(pending.id)],))
+        assert result.get() == 1
+        assert done.results.count() == 1
+
+    @pytest.mark.parametrize("size", [10, 50])
+    def test_add_many_query_count_is_constant(self, size, settings):
+        settings.TASK_BULK_BATCH_SIZE = 1000
+        ids = [
+            str(task.id)
+            for task in Task.objects.bulk_create(
+                Task(a=i, b=i) for i in range(size)
+            )
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            add_many.apply(args=(ids,))
+        # SELECT, SAVEPOINT, INSERT results, UPDATE tasks, RELEASE
+        assert len(queries) == 5
+        assert TaskResult.objects.count() == size
@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+from rest_framework.test import APIClient
+
+from rd_project import metrics
+from rd_project.rd_task.models import Task
+from rd_project.rd_task.tasks import add
+
+
+class TestRegistry:
+    @pytest.fixture
+    def registry(self):
+        registry = metrics.Registry()
+        registry.register(metrics.http_requests)
+        registry.register(metrics.http_request_duration)
+        return registry
+
+    def test_counter(self, registry):
+        labels = ("api:tasks-list", "GET", "200")
+        registry.inc(metrics.http_requests, labels)
+        thread = threading.Thread(
+            target=registry.inc, args=(metrics.http_requests, labels, 2)
+        )
+        thread.start()
+        thread.join()
+        assert registry.collect(metrics.http_requests) == {labels: 3}
+        assert (
+            'http_requests_total{view="api:tasks-list",method="GET",'
+            'status="200"} 3' in registry.render()
+        )
+
+    def test_histogram(self, registry):
+        labels = ("api:tasks-list", "GET")
+        for value in (0.002, 0.002, 20):
+            registry.observe(metrics.http_request_duration, labels, value)
+        output = registry.render()
+        prefix = 'http_request_duration_seconds_bucket{view="api:tasks-list",method="GET"'
+        assert f'{prefix},le="0.001"}} 0' in output
+        assert f'{prefix},le="0.005"}} 2' in output
+        assert f'{prefix},le="10"}} 2' in output
+        assert f'{prefix},le="+Inf"}} 3' in output
+        assert "http_request_duration_seconds_count" in output
+        assert "# TYPE http_request_duration_seconds histogram" in output
+
+    def test_label_escaping(self, registry):
+        registry.inc(metrics.http_requests, ('a"b', "GET", "200"))
+        assert 'view="a\\"b"' in registry.render()
+
+
+@pytest.mark.django_db
+class TestMetricsCollection:
+    @pytest.fixture(autouse=True)
+    def clear(self, settings):
+        settings.METRICS_SAMPLE_RATE = 1
+        metrics.registry.clear()
+
+    def test_requests_are_recorded(self):
+        Task.objects.create(a=1, b=2)
+        client = APIClient()
+        client.get("/api/tasks/")
+        output = client.get("/metrics").content.decode()
+        assert (
+            'http_requests_total{view="api:tasks-list",method="GET",'
+            'status="200"} 1' in output
+        )
+        assert (
+            'http_request_db_queries_count{view="api:tasks-list"} 1' in output
+        )
+
+    def test_tasks_are_recorded(self):
+        task = Task.objects.create(a=1, b=2)
+        add.apply(args=(str(task.id), task.a, task.b))
+        output = metrics.registry.render()
+        assert (
+            'celery_task_duration_seconds_count{task="rd_project.rd_task.'
+            'tasks.add",state="SUCCESS"} 1' in output
+        )
+        assert (
+            'celery_task_db_queries_count{task="rd_project.rd_task.tasks.add"} 1'
+            in output
+        )